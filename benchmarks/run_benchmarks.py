@@ -0,0 +1,306 @@
+"""
+Benchmark harness for the training and reporting pipeline.
+
+For every scenario of scenarios.yaml a seeded synthetic dataset is
+generated, then the pipeline stages are run and profiled:
+  - data:   load_config_and_data (cold CSV parse, then warm Arrow cache), compute_data_hash
+  - train:  build_model_and_sample (ESS/second from the posterior)
+  - report: Meridian summarizer report, posterior metrics and custom report page
+Meridian/TensorFlow are imported once before the first scenario and timed
+separately ("import_s"), so the first scenario's stages do not pay for it.
+Results (wall/CPU time, peak RSS, throughput, ESS/s per stage) are stored as
+benchmarks/results/<date>_<commit>.json so runs can be compared across commits.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+import yaml
+
+BENCH_DIR = Path(__file__).parent.absolute()
+POC_DIR = BENCH_DIR.parent.absolute()
+sys.path.insert(0, str(POC_DIR / "scripts"))
+
+from synthetic import write_dataset
+from profiling import StageProfiler
+
+SCENARIOS_FILE = BENCH_DIR / "scenarios.yaml"
+RESULTS_DIR = BENCH_DIR / "results"
+ALL_STAGES = ["data", "train", "report"]
+
+
+def load_scenarios(scenarios_file=SCENARIOS_FILE):
+    """Scenario name -> parameters, with the defaults block merged in"""
+    with open(scenarios_file, "r") as f:
+        spec = yaml.safe_load(f) or {}
+    defaults = spec.get("defaults", {})
+    scenarios = {}
+    for name, params in (spec.get("scenarios") or {}).items():
+        merged = {**defaults, **(params or {})}
+        merged["sampling"] = {**defaults.get("sampling", {}), **(params or {}).get("sampling", {})}
+        scenarios[name] = merged
+    return scenarios
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=POC_DIR, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def environment():
+    env = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    for module in ["numpy", "pandas", "pyarrow", "tensorflow", "meridian"]:
+        if module in sys.modules:
+            env[module] = getattr(sys.modules[module], "__version__", "unknown")
+    return env
+
+
+def import_dependencies(stages):
+    """
+    Import what the stages load lazily (meridian.data in load_config_and_data, meridian.model
+    when training) and return the seconds it took: a one-time cost that would otherwise be
+    charged to the first profiled stage of the first scenario.
+    """
+    start = time.perf_counter()
+    import run  # noqa: F401
+    from meridian.data import load  # noqa: F401
+    if "train" in stages or "report" in stages:
+        from meridian.model import model, spec  # noqa: F401
+    return time.perf_counter() - start
+
+
+def _stage_wall(profiler, name):
+    return next((s["wall_s"] for s in profiler.stages if s["name"] == name), None)
+
+
+def _min_ess_bulk(mmm):
+    import arviz as az
+    import numpy as np
+
+    ess = az.ess(mmm.inference_data.posterior, method="bulk")
+    values = [np.nanmin(np.asarray(var.values)) for var in ess.data_vars.values() if var.size]
+    return float(np.nanmin(values)) if values else None
+
+
+def run_scenario(name, params, stages, work_dir):
+    """Generate the scenario's dataset, run the requested stages and return the result record"""
+    from run import load_config_and_data, compute_data_hash
+
+    profiler = StageProfiler()
+    print(f"\n🧪 Scenario {name}: {params['geos']} geos × {params['weeks']} weeks × {params['channels']} channels")
+
+    with profiler.stage("generate"):
+        paths = write_dataset(
+            name, params["geos"], params["weeks"], params["channels"],
+            n_controls=params.get("controls", 0), seed=params.get("seed", 0),
+            sampling=params["sampling"], out_dir=work_dir,
+        )
+    rows = paths["rows"]
+    result = {
+        "scenario": name,
+        "params": params,
+        "rows": rows,
+        "throughput": {},
+    }
+
+    if "data" in stages:
+        with profiler.stage("load_data_cold"):
+            config_data = load_config_and_data(config_file=paths["config"])
+        with profiler.stage("load_data_warm"):
+            config_data = load_config_and_data(config_file=paths["config"])
+        with profiler.stage("data_hash"):
+            compute_data_hash(config_data["df"], config_data)
+        for stage in ["load_data_cold", "load_data_warm", "data_hash"]:
+            wall = _stage_wall(profiler, stage)
+            result["throughput"][f"{stage}_rows_per_s"] = round(rows / wall, 1) if wall else None
+    else:
+        config_data = load_config_and_data(config_file=paths["config"])
+
+    mmm = None
+    if "train" in stages or "report" in stages:
+        from run import setup_seed, build_model_and_sample
+
+        setup_seed()
+        mmm, model_config = build_model_and_sample(config_data, profiler=profiler)
+        sampling = params["sampling"]
+        n_draws = sampling["n_chains"] * (sampling["n_adapt"] + sampling["n_burnin"] + sampling["n_keep"])
+        wall = _stage_wall(profiler, "sample_posterior")
+        min_ess = _min_ess_bulk(mmm)
+        result["throughput"]["draws_per_s"] = round(n_draws / wall, 2) if wall else None
+        result["throughput"]["min_ess_bulk"] = min_ess
+        result["throughput"]["ess_per_s"] = round(min_ess / wall, 3) if wall and min_ess else None
+
+    if "report" in stages and mmm is not None:
+        from run import generate_html_report
+        from metrics import compute_model_metrics, save_metrics
+        from custom_report import generate_html_template
+
+        model_dir = os.path.join(work_dir, f"{name}_model")
+        os.makedirs(model_dir, exist_ok=True)
+        with profiler.stage("report"):
+            generate_html_report(mmm, model_config, output_dir=model_dir)
+        with profiler.stage("metrics"):
+            save_metrics(compute_model_metrics(mmm), model_dir)
+        with profiler.stage("custom_report"):
+            model_info = {"folder": f"{name}_model", "path": model_dir, "metadata": {"created_at": name}}
+            generate_html_template(model_info, model=mmm)
+
+    summary = profiler.summary()
+    result["peak_rss_mb"] = summary["peak_rss_mb"]
+    result["stages"] = summary["stages"]
+    profiler.print_summary()
+    return result
+
+
+def save_results(results, results_dir=RESULTS_DIR, import_s=None):
+    os.makedirs(results_dir, exist_ok=True)
+    env = environment()
+    stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    path = os.path.join(results_dir, f"{stamp}_{env['commit']}.json")
+    with open(path, "w") as f:
+        json.dump({"created_at": datetime.now().isoformat(), "environment": env, "import_s": import_s,
+                   "results": results}, f, indent=2)
+    return path
+
+
+def latest_results(results_dir=RESULTS_DIR, exclude=None):
+    """Most recent stored results file (other than `exclude`), or None"""
+    if not os.path.exists(results_dir):
+        return None
+    files = sorted(
+        os.path.join(results_dir, f) for f in os.listdir(results_dir) if f.endswith(".json")
+    )
+    files = [f for f in files if not exclude or os.path.abspath(f) != os.path.abspath(exclude)]
+    return files[-1] if files else None
+
+
+def compare_results(baseline_path, current_path):
+    """Print per-scenario, per-stage wall time and peak RSS of current relative to baseline"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(current_path) as f:
+        current = json.load(f)
+    baseline_by_name = {r["scenario"]: r for r in baseline["results"]}
+
+    print(f"\n📊 {os.path.basename(current_path)} vs {os.path.basename(baseline_path)}")
+    print(f"   ({current['environment']['commit']} vs {baseline['environment']['commit']}; ratio < 1.00 is faster)")
+    if baseline.get("import_s") and current.get("import_s"):
+        print(f"   Imports: {baseline['import_s']:.2f}s → {current['import_s']:.2f}s")
+    for result in current["results"]:
+        old = baseline_by_name.get(result["scenario"])
+        if old is None:
+            print(f"\n   {result['scenario']}: no baseline")
+            continue
+        old_stages = {s["name"]: s for s in old["stages"]}
+        print(f"\n   {result['scenario']}")
+        print(f"   {'stage':<20} {'baseline (s)':>13} {'current (s)':>12} {'ratio':>7} {'peak RSS (MB)':>14}")
+        for stage in result["stages"]:
+            before = old_stages.get(stage["name"])
+            if before is None or not before["wall_s"]:
+                continue
+            ratio = stage["wall_s"] / before["wall_s"]
+            flag = " ⚠️" if ratio > 1.2 else ""
+            print(f"   {stage['name']:<20} {before['wall_s']:>13.2f} {stage['wall_s']:>12.2f} "
+                  f"{ratio:>7.2f} {stage['peak_rss_mb']:>14.1f}{flag}")
+        old_ess, new_ess = old["throughput"].get("ess_per_s"), result["throughput"].get("ess_per_s")
+        if old_ess and new_ess:
+            print(f"   ESS/s: {old_ess:.3f} → {new_ess:.3f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the MMM pipeline on seeded synthetic datasets",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # List tracked scenarios
+  python benchmarks/run_benchmarks.py --list
+
+  # Data stages only (no sampling), every scenario
+  python benchmarks/run_benchmarks.py --stages data
+
+  # Full pipeline on the small scenarios, compared with the previous results file
+  python benchmarks/run_benchmarks.py --scenarios geo1_ch3 geo50_ch3 --compare
+
+  # Compare two stored result files
+  python benchmarks/run_benchmarks.py --compare results/A.json results/B.json
+        """
+    )
+    parser.add_argument("--list", action="store_true", help="List the scenarios of scenarios.yaml")
+    parser.add_argument("--scenarios", nargs="+", default=None, help="Scenario names to run. Default: all")
+    parser.add_argument("--stages", type=str, default=",".join(ALL_STAGES),
+                        help=f"Comma-separated stages among {', '.join(ALL_STAGES)}. Default: all")
+    parser.add_argument("--compare", nargs="*", default=None, metavar="RESULTS",
+                        help="Compare with the previous results file, or compare two given result files")
+    parser.add_argument("--no-save", action="store_true", help="Do not store the results in benchmarks/results/")
+    parser.add_argument("--keep-data", action="store_true", help="Keep generated datasets in benchmarks/data/")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    scenarios = load_scenarios()
+
+    if args.list:
+        for name, params in scenarios.items():
+            print(f"  - {name}: {params['geos']} geos × {params['weeks']} weeks × {params['channels']} channels, "
+                  f"{params.get('controls', 0)} controls")
+        exit(0)
+
+    if args.compare is not None and len(args.compare) == 2:
+        compare_results(args.compare[0], args.compare[1])
+        exit(0)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in ALL_STAGES]
+    if unknown:
+        print(f"❌ Unknown stage(s): {', '.join(unknown)} (choose among {', '.join(ALL_STAGES)})")
+        exit(1)
+    names = args.scenarios or list(scenarios)
+    missing = [n for n in names if n not in scenarios]
+    if missing:
+        print(f"❌ Unknown scenario(s): {', '.join(missing)}")
+        exit(1)
+
+    import_s = import_dependencies(stages)
+    print(f"📦 Imports (Meridian, TensorFlow): {import_s:.2f}s, not counted in the stages")
+
+    work_dir = str(BENCH_DIR / "data") if args.keep_data else tempfile.mkdtemp(prefix="mmm_bench_")
+    started = time.perf_counter()
+    results = []
+    try:
+        for name in names:
+            results.append(run_scenario(name, scenarios[name], stages, work_dir))
+    finally:
+        if not args.keep_data:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    print(f"\n✅ {len(results)} scenario(s) in {time.perf_counter() - started:.1f}s")
+
+    if not args.no_save:
+        path = save_results(results, import_s=round(import_s, 3))
+        print(f"   💾 Results: {path}")
+        if args.compare is not None:
+            baseline = args.compare[0] if args.compare else latest_results(exclude=path)
+            if baseline:
+                compare_results(baseline, path)
+            else:
+                print("   (no previous results to compare with)")
@@ -0,0 +1,196 @@
+"""
+Seeded synthetic MMM datasets with known ground truth.
+
+Each geo gets a population, a trend + yearly seasonality baseline and
+control variables; each channel gets weekly spend (bursty, with dark
+weeks) that goes through geometric adstock and a Hill saturation curve
+before contributing to the KPI. The CSV uses the same layout as
+data/processed/data_processed.csv (Date, Geo, one column per channel,
+Sales) plus `population` and control columns, and comes with a config
+file that run.load_config_and_data can read directly.
+"""
+
+import os
+import json
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+BENCH_DIR = Path(__file__).parent.absolute()
+POC_DIR = BENCH_DIR.parent.absolute()
+DATA_DIR = BENCH_DIR / "data"
+
+START_DATE = "2021-01-03"
+
+
+def geometric_adstock(x, alpha, max_lag):
+    """Adstock along the last (time) axis: sum_l alpha^l x[t-l], normalized by sum_l alpha^l"""
+    weights = alpha ** np.arange(max_lag + 1)
+    out = np.zeros_like(x)
+    for lag, w in enumerate(weights):
+        out[..., lag:] += w * x[..., : x.shape[-1] - lag]
+    return out / weights.sum()
+
+
+def hill(x, ec, slope):
+    return x ** slope / (x ** slope + ec ** slope)
+
+
+def generate_dataset(n_geos=1, n_weeks=156, n_channels=3, n_controls=0, seed=0, max_lag=8):
+    """Return (df, ground_truth) for a synthetic panel of n_geos × n_weeks rows"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(START_DATE, periods=n_weeks, freq="W-SUN")
+    geos = [f"Geo_{g:03d}" for g in range(n_geos)]
+    channels = [f"Channel_{c:02d}" for c in range(n_channels)]
+    controls = [f"Control_{k:02d}" for k in range(n_controls)]
+
+    population = rng.lognormal(mean=12.0, sigma=1.0, size=n_geos).round()
+    pop_share = population / population.sum()
+
+    # Spend: per-channel level, split across geos by population, with dark weeks
+    channel_level = rng.uniform(2_000, 20_000, size=n_channels)
+    active = rng.random((n_geos, n_channels, n_weeks)) > 0.3
+    spend = (
+        channel_level[None, :, None]
+        * pop_share[:, None, None] * n_geos
+        * rng.lognormal(0.0, 0.5, size=(n_geos, n_channels, n_weeks))
+        * active
+    )
+
+    # Ground-truth media response
+    alpha = rng.uniform(0.2, 0.8, size=n_channels)
+    ec = rng.uniform(0.5, 1.5, size=n_channels)
+    slope = rng.uniform(1.0, 3.0, size=n_channels)
+    roi = rng.uniform(0.5, 3.0, size=n_channels)
+    scaled = spend / spend.mean(axis=(0, 2), keepdims=True).clip(min=1e-9)
+    effect = np.stack(
+        [hill(geometric_adstock(scaled[:, c], alpha[c], max_lag), ec[c], slope[c]) for c in range(n_channels)],
+        axis=1,
+    )
+    # Scale each channel so its total contribution matches its ROI on total spend
+    contribution = effect * (roi * spend.sum(axis=(0, 2)) / effect.sum(axis=(0, 2)).clip(min=1e-9))[None, :, None]
+
+    # Baseline: geo level × (trend + yearly seasonality), controls, noise
+    t = np.arange(n_weeks)
+    seasonality = 1.0 + 0.15 * np.sin(2 * np.pi * t / 52.18) + 0.05 * np.cos(4 * np.pi * t / 52.18)
+    trend = 1.0 + 0.002 * t
+    baseline = 3.0 * channel_level.sum() * pop_share[:, None] * n_geos * (trend * seasonality)[None, :]
+    control_values = rng.normal(0.0, 1.0, size=(n_geos, n_controls, n_weeks))
+    control_coef = rng.normal(0.0, 0.05, size=n_controls)
+    control_effect = (control_coef[None, :, None] * control_values).sum(axis=1) * baseline
+    noise = rng.normal(0.0, 0.05, size=(n_geos, n_weeks)) * baseline
+    sales = (baseline + contribution.sum(axis=1) + control_effect + noise).clip(min=0.0)
+
+    frame = {
+        "Date": np.tile(dates, n_geos),
+        "Geo": np.repeat(geos, n_weeks),
+        "population": np.repeat(population, n_weeks),
+    }
+    for c, channel in enumerate(channels):
+        frame[channel] = spend[:, c, :].ravel().round(2)
+    for k, control in enumerate(controls):
+        frame[control] = control_values[:, k, :].ravel().round(4)
+    frame["Sales"] = sales.ravel().round(2)
+    df = pd.DataFrame(frame)
+
+    ground_truth = {
+        "seed": seed,
+        "n_geos": n_geos,
+        "n_weeks": n_weeks,
+        "n_channels": n_channels,
+        "n_controls": n_controls,
+        "max_lag": max_lag,
+        "channels": {
+            channel: {
+                "adstock_alpha": float(alpha[c]),
+                "hill_ec": float(ec[c]),
+                "hill_slope": float(slope[c]),
+                "roi": float(roi[c]),
+                "contribution": float(contribution[:, c].sum()),
+                "spend": float(spend[:, c].sum()),
+            }
+            for c, channel in enumerate(channels)
+        },
+        "controls": {control: float(control_coef[k]) for k, control in enumerate(controls)},
+    }
+    return df, ground_truth
+
+
+def build_config(name, csv_path, df, ground_truth, sampling):
+    """Config in the configs/config_v1.yaml layout for a generated dataset"""
+    channels = list(ground_truth["channels"])
+    return {
+        "default_dataset": name,
+        name: {
+            "csv_path": csv_path,
+            "kpi_type": "revenue",
+            "columns": {
+                "time": "Date",
+                "geo": "Geo",
+                "kpi": "Sales",
+                "population": "population",
+                "media": channels,
+                "media_spend": channels,
+                "controls": list(ground_truth["controls"]),
+            },
+            "media_to_channel": {c: c for c in channels},
+            "media_spend_to_channel": {c: c for c in channels},
+            "model": {"max_lag": ground_truth["max_lag"]},
+            "sampling": sampling,
+            "report": {
+                "start_date": str(df["Date"].min().date()),
+                "end_date": str(df["Date"].max().date()),
+                "output_html": f"outputs/{name}_report_data.html",
+            },
+        },
+    }
+
+
+def write_dataset(name, n_geos, n_weeks, n_channels, n_controls=0, seed=0, sampling=None, out_dir=DATA_DIR):
+    """Generate a dataset and write <name>.csv, <name>.yaml and <name>.truth.json; return the paths"""
+    os.makedirs(out_dir, exist_ok=True)
+    df, ground_truth = generate_dataset(n_geos, n_weeks, n_channels, n_controls, seed)
+    csv_path = os.path.join(out_dir, f"{name}.csv")
+    config_path = os.path.join(out_dir, f"{name}.yaml")
+    truth_path = os.path.join(out_dir, f"{name}.truth.json")
+
+    df.to_csv(csv_path, index=False)
+    sampling = sampling or {"n_chains": 2, "n_adapt": 200, "n_burnin": 100, "n_keep": 200}
+    with open(config_path, "w") as f:
+        yaml.safe_dump(build_config(name, csv_path, df, ground_truth, sampling), f, sort_keys=False)
+    with open(truth_path, "w") as f:
+        json.dump(ground_truth, f, indent=2)
+    return {"csv": csv_path, "config": config_path, "truth": truth_path, "rows": len(df)}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Generate a seeded synthetic MMM dataset with known adstock/saturation ground truth",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # 50 geos × 156 weeks × 10 channels
+  python benchmarks/synthetic.py --name geo50 --geos 50 --weeks 156 --channels 10
+
+  # Train on it
+  python scripts/run.py --config ../benchmarks/data/geo50.yaml
+        """
+    )
+    parser.add_argument("--name", type=str, required=True, help="Dataset name (file stem and config key)")
+    parser.add_argument("--geos", type=int, default=1, help="Number of geos. Default: 1")
+    parser.add_argument("--weeks", type=int, default=156, help="Number of weekly periods. Default: 156")
+    parser.add_argument("--channels", type=int, default=3, help="Number of paid media channels. Default: 3")
+    parser.add_argument("--controls", type=int, default=0, help="Number of control variables. Default: 0")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed. Default: 0")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    paths = write_dataset(args.name, args.geos, args.weeks, args.channels, args.controls, args.seed)
+    print(f"✓ {paths['rows']} rows written to {paths['csv']}")
+    print(f"   📋 Config: {paths['config']}")
+    print(f"   🎯 Ground truth: {paths['truth']}")
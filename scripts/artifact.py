@@ -0,0 +1,319 @@
+"""
+Compact posterior artifact for trained models.
+
+Instead of pickling the whole `Meridian` object, a model folder stores:
+  - inference_data.nc: every InferenceData group (posterior, prior,
+    sample_stats, trace, ...) as an HDF5 group of a netCDF file, with
+    zlib-compressed arrays chunked along the draw axis;
+  - manifest.json: format version, groups, variables (dims, shape, dtype)
+    and file size, readable without opening the netCDF file.
+
+Readers open only the group and variables they ask for; array data is read
+lazily from disk when accessed. The Meridian object itself is rebuilt from the
+config recorded in metadata.yaml when a consumer really needs it.
+
+`compact_inference_data` trades precision for size before saving (the
+dataset's `storage` config block): it thins the MCMC draws (always keeping
+the last draw of each chain, which warm starts use), casts the posterior to
+float32/float16 (float16 only where it keeps ~3 significant digits) and can drop
+mu_t, which is stored as knot weights and recomputed from knot_values when
+the posterior is opened. float16 variables are read back as float32.
+"""
+
+import os
+import json
+
+import numpy as np
+import yaml
+
+ARTIFACT_VERSION = 1
+INFERENCE_DATA_FILE = "inference_data.nc"
+MANIFEST_FILE = "manifest.json"
+PICKLE_FILE = "model.pkl"
+DEFAULT_CHUNK_DRAWS = 250
+COMPRESSION_LEVEL = 4
+DERIVED_GROUP = "derived"
+THINNED_GROUPS = ("posterior", "sample_stats", "trace")
+STORAGE_DTYPES = ("float64", "float32", "float16")
+_FLOAT16_MAX = 65504.0
+_FLOAT16_RELATIVE_ERROR = 1e-3  # Max rounding error, relative to the largest magnitude of a variable
+
+
+def has_saved_model(model_dir):
+    """True if the folder holds a posterior artifact or a legacy model.pkl"""
+    return (
+        os.path.exists(os.path.join(model_dir, MANIFEST_FILE))
+        or os.path.exists(os.path.join(model_dir, PICKLE_FILE))
+    )
+
+
+def _encoding(dataset, chunk_draws):
+    """zlib + shuffle, chunked by (1 chain, chunk_draws draws, full trailing dims)"""
+    encoding = {}
+    for name, var in dataset.data_vars.items():
+        if var.ndim == 0 or var.dtype.kind not in "biuf":
+            continue
+        chunks = []
+        for dim, size in zip(var.dims, var.shape):
+            if dim == "chain":
+                chunks.append(1)
+            elif dim == "draw":
+                chunks.append(max(1, min(chunk_draws, size)))
+            else:
+                chunks.append(max(1, size))
+        encoding[name] = {
+            "zlib": True,
+            "complevel": COMPRESSION_LEVEL,
+            "shuffle": True,
+            "chunksizes": tuple(chunks),
+        }
+    return encoding
+
+
+def thin_draw_indices(n_draws, thin):
+    """Every thin-th draw, counted back from the last one (which is always kept)"""
+    return np.arange(n_draws - 1, -1, -max(1, int(thin)))[::-1]
+
+
+def _fits_float16(values):
+    """In range, and rounding errors within float16 precision of the variable's scale"""
+    values = values[np.isfinite(values)]
+    scale = np.abs(values).max() if values.size else 0.0
+    if scale == 0.0:
+        return True
+    if scale > _FLOAT16_MAX:
+        return False
+    error = np.abs(values.astype(np.float16).astype(values.dtype) - values).max()
+    return error <= _FLOAT16_RELATIVE_ERROR * scale
+
+
+def compact_inference_data(inference_data, thin=1, dtype=None, drop_derived=False, knot_weights=None):
+    """
+    Thinned / down-cast copy of inference_data for storage. Returns
+    (inference_data, derived, info): `derived` ({"mu_t": knot weights DataArray} or None)
+    goes to save_posterior_artifact, `info` describes what was done (recorded in the manifest).
+    float16 falls back to float32 for variables it cannot hold to ~3 significant digits.
+    mu_t is only dropped when knot_weights (mmm.knot_info.weights) are given.
+    """
+    import arviz as az
+    import xarray as xr
+
+    if dtype is not None and dtype not in STORAGE_DTYPES:
+        raise ValueError(f"storage dtype must be one of {', '.join(STORAGE_DTYPES)}, got {dtype!r}")
+    posterior = inference_data.posterior
+    n_draws = posterior.sizes["draw"]
+    keep = thin_draw_indices(n_draws, thin)
+    info = {
+        "thin": max(1, int(thin)),
+        "dtype": dtype,
+        "n_draws_full": int(posterior.sizes["chain"] * n_draws),
+        "n_draws": int(posterior.sizes["chain"] * len(keep)),
+        "nbytes_full": int(sum(inference_data[g].nbytes for g in inference_data.groups())),
+        "dropped": [],
+        "kept_float32": [],
+    }
+
+    groups = {}
+    for group in inference_data.groups():
+        dataset = inference_data[group]
+        if group in THINNED_GROUPS and dataset.sizes.get("draw") == n_draws:
+            dataset = dataset.isel(draw=keep)
+        groups[group] = dataset
+
+    derived = None
+    posterior = groups["posterior"]
+    if drop_derived and knot_weights is not None and {"mu_t", "knot_values"} <= set(posterior.data_vars):
+        knots_dim = posterior["knot_values"].dims[-1]
+        time_dim = posterior["mu_t"].dims[-1]
+        derived = {"mu_t": xr.DataArray(
+            np.asarray(knot_weights, dtype=np.float32), dims=(knots_dim, time_dim),
+            coords={time_dim: posterior[time_dim].values} if time_dim in posterior.coords else None,
+        )}
+        posterior = posterior.drop_vars("mu_t")
+        info["dropped"].append("mu_t")
+
+    if dtype is not None:
+        cast = {}
+        for name, var in posterior.data_vars.items():
+            if var.dtype.kind != "f":
+                continue
+            target = dtype
+            if dtype == "float16" and not _fits_float16(var.values):
+                target = "float32"
+                info["kept_float32"].append(name)
+            cast[name] = var.astype(target)
+        posterior = posterior.assign(cast)
+    groups["posterior"] = posterior
+
+    compact = az.InferenceData(**groups)
+    info["nbytes"] = int(sum(compact[g].nbytes for g in compact.groups()))
+    return compact, derived, info
+
+
+def save_posterior_artifact(inference_data, output_dir, chunk_draws=DEFAULT_CHUNK_DRAWS, extra=None, derived=None):
+    """
+    Write inference_data.nc + manifest.json into output_dir and return the manifest.
+    `derived` ({variable: weights}, from compact_inference_data) is stored in its own group.
+    """
+    nc_path = os.path.join(output_dir, INFERENCE_DATA_FILE)
+    tmp_path = nc_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    manifest = {
+        "version": ARTIFACT_VERSION,
+        "file": INFERENCE_DATA_FILE,
+        "groups": {},
+    }
+    try:
+        import meridian
+        manifest["meridian_version"] = meridian.__version__
+    except ImportError:
+        pass
+
+    mode = "w"
+    for group in inference_data.groups():
+        dataset = inference_data[group]
+        dataset.to_netcdf(
+            tmp_path,
+            mode=mode,
+            group=group,
+            engine="h5netcdf",
+            encoding=_encoding(dataset, chunk_draws),
+        )
+        mode = "a"
+        manifest["groups"][group] = {
+            name: {
+                "dims": list(var.dims),
+                "shape": list(var.shape),
+                "dtype": str(var.dtype),
+            }
+            for name, var in dataset.data_vars.items()
+        }
+    if derived:
+        import xarray as xr
+
+        # Only mu_t = knot_values · weights is supported (see compact_inference_data)
+        xr.Dataset({f"{name}_weights": weights for name, weights in derived.items()}).to_netcdf(
+            tmp_path, mode=mode, group=DERIVED_GROUP, engine="h5netcdf",
+        )
+        manifest["derived"] = {
+            name: {"group": "posterior", "source": "knot_values", "weights": f"{name}_weights"}
+            for name in derived
+        }
+    os.replace(tmp_path, nc_path)
+
+    manifest["size_bytes"] = os.path.getsize(nc_path)
+    if extra:
+        manifest.update(extra)
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(model_dir):
+    manifest_path = os.path.join(model_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"No posterior artifact ({MANIFEST_FILE}) in {model_dir}")
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+
+def open_group(model_dir, group="posterior", variables=None):
+    """
+    Lazily open one InferenceData group as an xarray Dataset.
+    Only the requested variables are kept; values are read from disk on access.
+    Variables dropped at save time (mu_t) are recomputed, float16 ones are cast to float32.
+    """
+    import xarray as xr
+
+    manifest = load_manifest(model_dir)
+    if group not in manifest["groups"]:
+        raise KeyError(f"Group '{group}' not in artifact (available: {', '.join(manifest['groups'])})")
+    nc_path = os.path.join(model_dir, manifest["file"])
+    dataset = xr.open_dataset(nc_path, group=group, engine="h5netcdf")
+
+    derived = {
+        name: spec for name, spec in (manifest.get("derived") or {}).items()
+        if spec["group"] == group and (variables is None or name in variables)
+    }
+    if derived:
+        weights = xr.open_dataset(nc_path, group=DERIVED_GROUP, engine="h5netcdf")
+        for name, spec in derived.items():
+            source = dataset[spec["source"]]
+            dataset[name] = xr.dot(source.astype("float32"), weights[spec["weights"]], dim=source.dims[-1])
+    for name, var in list(dataset.data_vars.items()):
+        if var.dtype == np.float16:
+            dataset[name] = var.astype("float32")
+    if variables is not None:
+        missing = [v for v in variables if v not in dataset.data_vars]
+        if missing:
+            raise KeyError(f"Variables not in group '{group}': {', '.join(missing)}")
+        dataset = dataset[list(variables)]
+    return dataset
+
+
+def load_inference_data(model_dir, groups=None):
+    """Rebuild an arviz InferenceData from (a subset of) the stored groups, lazily"""
+    import arviz as az
+
+    manifest = load_manifest(model_dir)
+    groups = groups or list(manifest["groups"])
+    return az.InferenceData(**{group: open_group(model_dir, group) for group in groups})
+
+
+def load_model_config_data(model_dir, verify=True):
+    """
+    Config and data a model folder was trained on (as recorded in its metadata.yaml).
+    With verify, the data and config are re-hashed and a ValueError is raised when they
+    no longer match the model's data_hash (CSV regenerated or appended, config edited):
+    the posterior would otherwise be paired with data it was not trained on.
+    """
+    from run import load_config_and_data
+    from fingerprint import compute_data_hash, legacy_data_hashes, load_fingerprint
+
+    with open(os.path.join(model_dir, "metadata.yaml"), "r") as f:
+        metadata = yaml.load(f, Loader=yaml.FullLoader) or {}
+    config_data = load_config_and_data(
+        config_file=metadata["config_file"],
+        data_file=metadata.get("data_file"),
+        dataset_name=metadata.get("dataset_name"),
+    )
+
+    expected = metadata.get("data_hash")
+    if verify and expected:
+        df = config_data["df"]
+        if load_fingerprint(model_dir) is not None:
+            matches = compute_data_hash(df, config_data) == expected
+        else:
+            # Saved before fingerprints: data_hash uses the previous formula
+            matches = expected in legacy_data_hashes(df, config_data["model_config"])
+        if not matches:
+            raise ValueError(
+                f"The data or configuration of {os.path.basename(os.path.normpath(model_dir))} changed since it "
+                f"was trained ({metadata['config_file']}, data hash {expected}): restore them or retrain the model"
+            )
+    return config_data
+
+
+def load_model(model_dir, config_data=None):
+    """
+    Return a Meridian model for a model folder.
+    The model is rebuilt from its recorded config and data (or config_data,
+    when the caller already loaded them) plus the stored posterior; folders
+    saved before the artifact existed fall back to model.pkl.
+    """
+    if not os.path.exists(os.path.join(model_dir, MANIFEST_FILE)):
+        import pickle
+        with open(os.path.join(model_dir, PICKLE_FILE), "rb") as f:
+            return pickle.load(f)
+
+    from run import build_model
+
+    if config_data is None:
+        config_data = load_model_config_data(model_dir)
+    # Materialize: Meridian validates coords and reads the arrays repeatedly
+    inference_data = load_inference_data(model_dir)
+    for group in inference_data.groups():
+        inference_data[group].load()
+    return build_model(config_data, inference_data=inference_data)
@@ -0,0 +1,167 @@
+"""
+Compact posterior storage (the dataset's `storage` config block) and its
+error report (storage_report.json).
+
+    storage:
+      thin: 4              # keep every 4th draw (the last draw of each chain is always kept)
+      dtype: float16       # float64, float32 or float16 (float16 only where it keeps ~3 digits)
+      drop_derived: true   # mu_t is recomputed from knot_values when the posterior is opened
+
+The training run saves the compacted posterior. It then rebuilds the model from
+the saved artifact, timing the load, recomputes the metrics and compares
+ROI, contribution share and incremental outcome (mean and credible interval
+bounds) with the metrics of the full posterior. The sizes, load time and
+errors are written to storage_report.json.
+Existing model folders are compacted in place with this script's CLI.
+"""
+
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime
+
+from artifact import (
+    compact_inference_data, save_posterior_artifact, load_inference_data, load_manifest, load_model,
+    load_model_config_data, INFERENCE_DATA_FILE, MANIFEST_FILE, STORAGE_DTYPES,
+)
+from metrics import compute_model_metrics, compare_metrics, load_metrics
+
+STORAGE_REPORT_FILE = "storage_report.json"
+
+
+def storage_options(storage):
+    """compact_inference_data keyword arguments of a `storage` config block"""
+    return {
+        "thin": int(storage.get("thin", 1)),
+        "dtype": storage.get("dtype"),
+        "drop_derived": bool(storage.get("drop_derived", False)),
+    }
+
+
+def compact_posterior(mmm, storage):
+    """(inference_data, derived, info) of a sampled model, compacted per its `storage` block"""
+    return compact_inference_data(mmm.inference_data, knot_weights=mmm.knot_info.weights, **storage_options(storage))
+
+
+def time_posterior_load(model_dir):
+    """Seconds to read every group of a model folder's artifact into memory"""
+    start = time.perf_counter()
+    inference_data = load_inference_data(model_dir)
+    for group in inference_data.groups():
+        inference_data[group].load()
+    return time.perf_counter() - start
+
+
+def storage_error_report(model_dir, reference_metrics, config_data):
+    """
+    Rebuild the model from the compacted artifact of model_dir and compare its metrics
+    with reference_metrics (computed on the full posterior).
+    """
+    manifest = load_manifest(model_dir)
+    load_seconds = time_posterior_load(model_dir)
+    mmm = load_model(model_dir, config_data=config_data)
+    metrics = compute_model_metrics(mmm, reference_metrics["confidence_level"])
+    return {
+        "created_at": datetime.now().isoformat(),
+        "storage": manifest.get("storage"),
+        "file_bytes": manifest["size_bytes"],
+        "load_seconds": load_seconds,
+        "errors": compare_metrics(reference_metrics, metrics),
+    }
+
+
+def save_storage_report(report, model_dir):
+    path = os.path.join(model_dir, STORAGE_REPORT_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def print_storage_report(report):
+    storage = report["storage"] or {}
+    print(f"🗜️  Stored {storage.get('n_draws')} of {storage.get('n_draws_full')} draws "
+          f"(thin {storage.get('thin')}, {storage.get('dtype') or 'original dtype'}"
+          + (f", dropped {', '.join(storage['dropped'])}" if storage.get("dropped") else "") + ")")
+    if storage.get("kept_float32"):
+        print(f"   Kept float32 (outside float16 precision): {', '.join(storage['kept_float32'])}")
+    if storage.get("nbytes_full"):
+        print(f"   In memory: {storage['nbytes_full'] / 1024 / 1024:.1f} MB → {storage['nbytes'] / 1024 / 1024:.1f} MB "
+              f"(÷{storage['nbytes_full'] / max(storage['nbytes'], 1):.1f})")
+    if report.get("full_file_bytes"):
+        print(f"   On disk: {report['full_file_bytes'] / 1024 / 1024:.1f} MB → {report['file_bytes'] / 1024 / 1024:.1f} MB, "
+              f"load {report['full_load_seconds']:.2f}s → {report['load_seconds']:.2f}s")
+    else:
+        print(f"   On disk: {report['file_bytes'] / 1024 / 1024:.1f} MB, load {report['load_seconds']:.2f}s")
+    for metric, error in report["errors"]["max_rel_error"].items():
+        print(f"   Max relative error of {metric} (mean / CI bounds): {error:.2%}")
+
+
+def compact_model_folder(model_dir, storage, dry_run=False):
+    """
+    Compact the artifact of an existing model folder, measure the error against its full
+    posterior and, unless dry_run, replace inference_data.nc / manifest.json. Returns the report.
+    """
+    config_data = load_model_config_data(model_dir)
+    full_manifest = load_manifest(model_dir)
+    full_load_seconds = time_posterior_load(model_dir)
+    mmm = load_model(model_dir, config_data=config_data)
+    # metrics.json was computed on the full posterior at training time
+    reference = load_metrics(model_dir) or compute_model_metrics(mmm)
+
+    with tempfile.TemporaryDirectory(dir=model_dir) as tmp_dir:
+        inference_data, derived, info = compact_posterior(mmm, storage)
+        save_posterior_artifact(inference_data, tmp_dir, derived=derived, extra={"storage": info})
+        report = storage_error_report(tmp_dir, reference, config_data)
+        report["full_file_bytes"] = full_manifest["size_bytes"]
+        report["full_load_seconds"] = full_load_seconds
+        if not dry_run:
+            for name in [INFERENCE_DATA_FILE, MANIFEST_FILE]:
+                shutil.move(os.path.join(tmp_dir, name), os.path.join(model_dir, name))
+            save_storage_report(report, model_dir)
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compact the stored posterior of a trained model and report the effect on its metrics",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Measure first: thin 4x and cast to float16, without touching the folder
+  python scripts/compact.py --model 2025-11-21_11-24-58 --thin 4 --dtype float16 --drop-derived --dry-run
+
+  # Compact in place (writes storage_report.json)
+  python scripts/compact.py --model 2025-11-21_11-24-58 --thin 4 --dtype float16 --drop-derived
+
+New runs compact at save time with a `storage:` block in the dataset config.
+        """
+    )
+    parser.add_argument("--model", type=str, required=True, help="Model folder name (in outputs/models/) or path")
+    parser.add_argument("--thin", type=int, default=1, help="Keep every n-th draw. Default: 1")
+    parser.add_argument("--dtype", type=str, default=None, choices=STORAGE_DTYPES,
+                        help="Posterior precision. Default: unchanged")
+    parser.add_argument("--drop-derived", action="store_true", help="Drop mu_t (recomputed from knot_values on load)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report, keep the stored posterior as is")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from registry import MODELS_DIR
+
+    args = parse_args()
+    model_dir = args.model if os.path.isdir(args.model) else os.path.join(MODELS_DIR, args.model)
+    if not os.path.exists(os.path.join(model_dir, MANIFEST_FILE)):
+        print(f"❌ Error: no posterior artifact in '{args.model}'")
+        exit(1)
+
+    report = compact_model_folder(
+        model_dir, {"thin": args.thin, "dtype": args.dtype, "drop_derived": args.drop_derived}, dry_run=args.dry_run
+    )
+    print_storage_report(report)
+    print("\nℹ️  Dry run: the stored posterior was not changed" if args.dry_run
+          else f"\n✅ Compacted: {model_dir} (report: {STORAGE_REPORT_FILE})")
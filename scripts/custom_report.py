@@ -1,70 +1,62 @@
 import os
-import pickle
-import yaml
 import re
+import copy
 import json
+import time
+import argparse
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from artifact import has_saved_model, load_model, INFERENCE_DATA_FILE, PICKLE_FILE
+from registry import query_models
+from report_parser import parse_report_html, chart_records, encode_spec_literal
+from report_parser import chart_section as chart_section_html
+from metrics import load_metrics, save_metrics, compute_model_metrics
+from metrics import roi_by_channel as roi_by_channel_from_metrics
+from report_bundle import bundle_offline, load_vendor_scripts, write_gzip
 
 # Get POC directory (parent of scripts directory)
 SCRIPT_DIR = Path(__file__).parent.absolute()
 POC_DIR = SCRIPT_DIR.parent.absolute()
 
+# Charts whose inline dataset carries a per-channel "roi" field, in order of preference
+ROI_CHART_IDS = ["roi-channel-chart", "spend-outcome-chart", "roi-marginal-chart"]
+
+# Bump whenever generate_html_template changes its output, so batch mode rebuilds every report
+TEMPLATE_VERSION = 2
+REPORT_FILE = "custom_report.html"
+STAMP_FILE = "custom_report.stamp.json"
+# Files a custom report is built from (a change in any of them makes the report stale)
+REPORT_INPUTS = ["report_data.html", "metadata.yaml", "metrics.json"]
+
 
 def list_saved_models():
-    """List all saved models in outputs/models/"""
-    models_dir = os.path.join(POC_DIR, "outputs", "models")
-    
-    if not os.path.exists(models_dir):
-        return []
-    
-    models = []
-    for model_folder in os.listdir(models_dir):
-        model_path = os.path.join(models_dir, model_folder)
-        if os.path.isdir(model_path):
-            metadata_path = os.path.join(model_path, "metadata.yaml")
-            model_pkl_path = os.path.join(model_path, "model.pkl")
-            
-            # Check that model.pkl exists
-            if not os.path.exists(model_pkl_path):
-                continue
-                
-            if os.path.exists(metadata_path):
-                with open(metadata_path, 'r') as f:
-                    # Use FullLoader to support Python types like tuples
-                    metadata = yaml.load(f, Loader=yaml.FullLoader)
-                models.append({
-                    "folder": model_folder,
-                    "path": model_path,
-                    "metadata": metadata,
-                })
-            else:
-                # If no metadata, use the folder name as creation date
-                models.append({
-                    "folder": model_folder,
-                    "path": model_path,
-                    "metadata": {"created_at": model_folder},
-                })
-    
-    # Sort by creation date (most recent first)
-    return sorted(models, key=lambda x: x["folder"], reverse=True)
+    """List all saved models (posterior artifact or model.pkl) from the model registry"""
+    return query_models(with_model=True)
 
 
-def load_model_from_pkl(model_path):
-    """Load the model from the model.pkl file"""
-    model_pkl_path = os.path.join(model_path, "model.pkl")
-    
-    if not os.path.exists(model_pkl_path):
-        raise FileNotFoundError(f"model.pkl file does not exist in {model_path}")
+def load_saved_model(model_path):
+    """Load the model from its posterior artifact (or a legacy model.pkl file)"""
+    if not has_saved_model(model_path):
+        raise FileNotFoundError(f"No posterior artifact or model.pkl in {model_path}")
     
-    print(f"📂 Loading model from: {model_pkl_path}")
-    with open(model_pkl_path, 'rb') as f:
-        model = pickle.load(f)
+    print(f"📂 Loading model from: {model_path}")
+    model = load_model(model_path)
     print("✓ Model loaded successfully")
     
     return model
 
 
+def saved_model_size(model_path):
+    """Bytes a model load would read (posterior artifact, else legacy model.pkl)"""
+    for name in (INFERENCE_DATA_FILE, PICKLE_FILE):
+        path = os.path.join(model_path, name)
+        if os.path.exists(path):
+            return os.path.getsize(path)
+    return 0
+
+
 def interactive_select_model():
     """Interactive menu to select a model"""
     models = list_saved_models()
@@ -113,37 +105,34 @@ def interactive_select_model():
             exit(1)
 
 
-def extract_r2_from_html(report_html_path):
-    """Extract R² score from report_data.html file"""
+def _as_report(report):
+    """Accept a parsed report or, for older callers, a report_data.html path"""
+    if report is None or isinstance(report, dict):
+        return report
+    return parse_report_html(report)
+
+
+def extract_r2_from_html(report):
+    """Extract R² score from the model fit statistics table of report_data.html"""
     try:
-        if not os.path.exists(report_html_path):
+        report = _as_report(report)
+        if report is None:
             return None
         
-        with open(report_html_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        # Search for R² in the metrics table
-        # Pattern: after <th>R-squared</th>, get value in next <td>
-        pattern = r'<th>R-squared</th>.*?<td[^>]*>([0-9.]+)</td>'
-        match = re.search(pattern, html_content, re.DOTALL)
+        table = report["tables"].get("model-fit-statistics-table-chart")
+        if table and "R-squared" in table["headers"]:
+            col = table["headers"].index("R-squared")
+            for row in table["rows"]:
+                try:
+                    return float(row[col])
+                except (IndexError, ValueError):
+                    continue
         
+        # Fallback for layouts without the statistics table id
+        match = re.search(r'R-squared.*?<td[^>]*>([0-9.]+)</td>', report["html"], re.IGNORECASE | re.DOTALL)
         if match:
-            r2_str = match.group(1)
             try:
-                r2 = float(r2_str)
-                return r2
-            except ValueError:
-                pass
-        
-        # Alternative pattern
-        pattern2 = r'R-squared.*?<td[^>]*>([0-9.]+)</td>'
-        match2 = re.search(pattern2, html_content, re.IGNORECASE | re.DOTALL)
-        
-        if match2:
-            r2_str = match2.group(1)
-            try:
-                r2 = float(r2_str)
-                return r2
+                return float(match.group(1))
             except ValueError:
                 pass
         
@@ -153,68 +142,30 @@ def extract_r2_from_html(report_html_path):
         return None
 
 
-def extract_roi_by_channel(report_html_path):
-    """Extract ROI by channel from report_data.html file"""
+def extract_roi_by_channel(report):
+    """Extract ROI by channel from the ROI chart datasets of report_data.html"""
     try:
-        if not os.path.exists(report_html_path):
+        report = _as_report(report)
+        if report is None:
             return {}
         
-        with open(report_html_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
         roi_data = {}
-        all_channels = set()
+        for chart_id in ROI_CHART_IDS:
+            for record in chart_records(report, chart_id):
+                channel = record.get("channel")
+                roi_value = record.get("roi")
+                if not channel or channel.upper() == "BASELINE" or channel == "All Channels":
+                    continue
+                if channel not in roi_data or roi_data[channel] is None:
+                    roi_data[channel] = float(roi_value) if roi_value is not None else None
+            if roi_data:
+                return roi_data
         
-        # Patterns for finding channel and roi (escaped or not)
-        patterns = [
-            r'\\"channel\\":\s*\\"([^\\"]+)\\"[^}]*\\"roi\\":\s*([0-9.]+)',
-            r'"channel":\s*"([^"]+)"[^}]*"roi":\s*([0-9.]+)',
-            r'\\"roi\\":\s*([0-9.]+)[^}]*\\"channel\\":\s*\\"([^\\"]+)\\"',
-            r'"roi":\s*([0-9.]+)[^}]*"channel":\s*"([^"]+)"',
-        ]
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, html_content, re.DOTALL)
-            for match in matches:
-                # Determine which group is channel and which is roi
-                if len(match.groups()) == 2:
-                    if re.match(r'[A-Za-z]', match.group(1)):
-                        channel = match.group(1).strip()
-                        roi_str = match.group(2).strip()
-                    else:
-                        roi_str = match.group(1).strip()
-                        channel = match.group(2).strip()
-                    
-                    roi_str = roi_str.rstrip('.').rstrip(',')
-                    roi_str = re.sub(r'[^0-9.]', '', roi_str)
-                    
-                    try:
-                        roi_value = float(roi_str)
-                        if channel.upper() != "BASELINE":
-                            if channel not in roi_data:
-                                roi_data[channel] = roi_value
-                            all_channels.add(channel)
-                    except ValueError:
-                        if channel.upper() != "BASELINE":
-                            all_channels.add(channel)
-                        continue
-        
-        # Find all unique channels (even if no ROI)
-        channel_patterns = [
-            r'\\"channel\\":\s*\\"([^\\"]+)\\"',
-            r'"channel":\s*"([^"]+)"',
-        ]
-        for pattern in channel_patterns:
-            channel_matches = re.finditer(pattern, html_content)
-            for match in channel_matches:
-                channel = match.group(1).strip()
-                if channel.upper() != "BASELINE":
-                    all_channels.add(channel)
-        
-        # Ensure all channels in roi_data, set None if no ROI
-        for channel in all_channels:
-            if channel not in roi_data:
-                roi_data[channel] = None
+        # Fallback for reports without the ROI charts: scan the escaped specs
+        for match in re.finditer(r'\\"channel\\":\s*\\"([^\\"]+)\\"[^}]*\\"roi\\":\s*([0-9.]+)', report["html"]):
+            channel = match.group(1).strip()
+            if channel.upper() != "BASELINE" and channel not in roi_data:
+                roi_data[channel] = float(match.group(2).rstrip('.'))
         
         return roi_data
     except Exception as e:
@@ -224,8 +175,8 @@ def extract_roi_by_channel(report_html_path):
         return {}
 
 
-def generate_roi_html(roi_by_channel):
-    """Generates HTML for ROI visualization by channel"""
+def generate_roi_html(roi_by_channel, channel_metrics=None):
+    """Generates HTML for ROI visualization by channel (with credible intervals when metrics are available)"""
     if not roi_by_channel:
         return '<div class="placeholder">Results will be displayed here</div>'
     
@@ -238,13 +189,22 @@ def generate_roi_html(roi_by_channel):
     
     roi_items = []
     for channel, roi in channels_with_roi:
+        interval_html = ""
+        if channel_metrics and channel in channel_metrics:
+            values = channel_metrics[channel]
+            interval_html = f'''
+                    <div class="roi-description">
+                      Credible interval: <strong>{values["roi"]["ci_lo"]:.2f} – {values["roi"]["ci_hi"]:.2f}</strong>
+                      · mROI <strong>{values["mroi"]["mean"]:.2f}</strong>
+                      · Contribution <strong>{values["contribution_share"]["mean"] * 100:.1f}%</strong>
+                    </div>'''
         roi_items.append(f'''
                 <div class="roi-item">
                   <div class="roi-item-content">
                     <div class="roi-channel-name">{channel}</div>
                     <div class="roi-description">
                       For <strong>$1 invested</strong> in {channel} → ROI = <strong>${roi:.2f}</strong>
-                    </div>
+                    </div>{interval_html}
                   </div>
                   <div class="roi-value-container">
                     <div class="roi-value">{roi:.2f}</div>
@@ -259,45 +219,19 @@ def generate_roi_html(roi_by_channel):
               '''
 
 
-def extract_contribution_channel_chart_html(report_html_path):
+def extract_contribution_channel_chart_html(report):
     """Extract the full HTML section of the Contribution Channel chart from report_data.html (including baseline)"""
     try:
-        if not os.path.exists(report_html_path):
+        report = _as_report(report)
+        if report is None or "channel-drivers-chart" not in report["charts"]:
             return None
         
-        with open(report_html_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        pos = html_content.find('channel-drivers-chart')
-        if pos == -1:
-            return None
-        
-        start = html_content.rfind('<chart>', 0, pos)
-        if start == -1:
-            start = html_content.rfind('<chart-embed', 0, pos)
-        if start == -1:
-            return None
-        
-        end = html_content.find('</script>', pos)
-        if end == -1:
-            return None
-        end += len('</script>')
-        
-        chart_section = html_content[start:end]
+        chart = report["charts"]["channel-drivers-chart"]
+        chart_section = chart_section_html(report, "channel-drivers-chart")
         
         # Edit JSON to remove the title and update chart palette
-        json_pattern = r'const spec = JSON\.parse\("(.*?)"\);'
-        match = re.search(json_pattern, chart_section, re.DOTALL)
-        
-        if match:
-            json_str_escaped = match.group(1)
-            import codecs
-            try:
-                json_str = codecs.decode(json_str_escaped, 'unicode_escape')
-            except:
-                json_str = json_str_escaped.replace('\\\\"', '"').replace('\\\\n', '\n').replace('\\\\\\\\', '\\')
-            
-            spec = json.loads(json_str)
+        if chart["spec"] is not None:
+            spec = copy.deepcopy(chart["spec"])
             
             # Color palette updates
             if 'layer' in spec:
@@ -329,13 +263,11 @@ def extract_contribution_channel_chart_html(report_html_path):
                                     new_range.append('#6366f1')
                             if new_range:
                                 color_encoding['scale']['range'] = new_range
-            
+        
             if 'title' in spec:
                 spec['title'] = None
-            
-            new_json_str = json.dumps(spec)
-            new_json_str_escaped = new_json_str.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
-            chart_section = chart_section.replace(json_str_escaped, new_json_str_escaped)
+        
+            chart_section = chart_section.replace(chart["spec_literal"], encode_spec_literal(spec))
         
         chart_section = re.sub(r'<chart-description>.*?</chart-description>', '', chart_section, flags=re.DOTALL)
         chart_section = chart_section.replace('id="channel-drivers-chart"', 'id="contribution-channel-chart"')
@@ -351,44 +283,18 @@ def extract_contribution_channel_chart_html(report_html_path):
         return None
 
 
-def extract_model_fit_chart_html(report_html_path):
+def extract_model_fit_chart_html(report):
     """Extract the full HTML section of the Model Fit chart from report_data.html and remove the baseline"""
     try:
-        if not os.path.exists(report_html_path):
-            return None
-        
-        with open(report_html_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        pos = html_content.find('expected-actual-outcome-chart')
-        if pos == -1:
-            return None
-        
-        start = html_content.rfind('<chart>', 0, pos)
-        if start == -1:
-            start = html_content.rfind('<chart-embed', 0, pos)
-        if start == -1:
-            return None
-        
-        end = html_content.find('</script>', pos)
-        if end == -1:
+        report = _as_report(report)
+        if report is None or "expected-actual-outcome-chart" not in report["charts"]:
             return None
-        end += len('</script>')
-        
-        chart_section = html_content[start:end]
         
-        json_pattern = r'const spec = JSON\.parse\("(.*?)"\);'
-        match = re.search(json_pattern, chart_section, re.DOTALL)
+        chart = report["charts"]["expected-actual-outcome-chart"]
+        chart_section = chart_section_html(report, "expected-actual-outcome-chart")
         
-        if match:
-            json_str_escaped = match.group(1)
-            import codecs
-            try:
-                json_str = codecs.decode(json_str_escaped, 'unicode_escape')
-            except:
-                json_str = json_str_escaped.replace('\\\\"', '"').replace('\\\\n', '\n').replace('\\\\\\\\', '\\')
-            
-            spec = json.loads(json_str)
+        if chart["spec"] is not None:
+            spec = copy.deepcopy(chart["spec"])
             
             # Filter out baseline
             if 'datasets' in spec:
@@ -397,7 +303,7 @@ def extract_model_fit_chart_html(report_html_path):
                         item for item in dataset_data 
                         if item.get('type') != 'baseline'
                     ]
-            
+        
             # Update color palettes and remove baseline from domain
             if 'layer' in spec:
                 for layer in spec['layer']:
@@ -428,13 +334,11 @@ def extract_model_fit_chart_html(report_html_path):
                                     color_encoding['condition']['value'] = '#6366f1'
                                 elif 'actual' in test.lower():
                                     color_encoding['condition']['value'] = '#10b981'
-            
+        
             if 'title' in spec:
                 spec['title'] = None
-            
-            new_json_str = json.dumps(spec)
-            new_json_str_escaped = new_json_str.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
-            chart_section = chart_section.replace(json_str_escaped, new_json_str_escaped)
+        
+            chart_section = chart_section.replace(chart["spec_literal"], encode_spec_literal(spec))
         
         chart_section = re.sub(r'<chart-description>.*?</chart-description>', '', chart_section, flags=re.DOTALL)
         chart_section = chart_section.replace('id="expected-actual-outcome-chart"', 'id="model-fit-chart"')
@@ -606,8 +510,13 @@ def generate_insights_html(insights):
               '''
 
 
-def generate_html_template(model_info, model=None):
-    """Generate a modern and attractive HTML page to present the results"""
+def generate_html_template(model_info, model=None, model_loader=None):
+    """
+    Generate a modern and attractive HTML page to present the results.
+    The page is built from metadata, metrics.json and report_data.html; the
+    model (or `model_loader()`, called at most once) is only used to compute
+    metrics.json when it is missing.
+    """
     metadata = model_info["metadata"]
     folder = model_info["folder"]
     
@@ -617,18 +526,37 @@ def generate_html_template(model_info, model=None):
     data_shape = metadata.get('data_shape', [])
     model_config = metadata.get('model_config', {})
     
-    # Extract the R² score from report_data.html
-    report_html_path = os.path.join(model_info["path"], "report_data.html")
-    r2_score = extract_r2_from_html(report_html_path)
+    # Read and index report_data.html once; every extractor works on the parsed report
+    report = parse_report_html(os.path.join(model_info["path"], "report_data.html"))
+    
+    # ROI and R² come from the posterior metrics (metrics.json, computed from the
+    # model if missing); report_data.html is only scraped for older folders
+    metrics = load_metrics(model_info["path"])
+    if metrics is None and (model is not None or model_loader is not None):
+        try:
+            if model is None:
+                model = model_loader()
+            print("📊 Computing posterior metrics...")
+            metrics = compute_model_metrics(model)
+            save_metrics(metrics, model_info["path"])
+        except Exception as e:
+            print(f"⚠️  Could not compute posterior metrics, falling back to report_data.html: {e}")
+            metrics = None
     
-    # Extract ROI by channel
-    roi_by_channel = extract_roi_by_channel(report_html_path)
+    if metrics is not None:
+        r2_score = metrics["fit"]["r_squared"]
+        roi_by_channel = roi_by_channel_from_metrics(metrics)
+        channel_metrics = metrics["channels"]
+    else:
+        r2_score = extract_r2_from_html(report)
+        roi_by_channel = extract_roi_by_channel(report)
+        channel_metrics = None
     
     # Extract Model Fit chart section
-    model_fit_html = extract_model_fit_chart_html(report_html_path)
+    model_fit_html = extract_model_fit_chart_html(report)
     
     # Extract Contribution Channel chart section
-    contribution_channel_html = extract_contribution_channel_chart_html(report_html_path)
+    contribution_channel_html = extract_contribution_channel_chart_html(report)
     
     # Generate actionable marketing insights
     marketing_insights = generate_marketing_insights(r2_score, roi_by_channel)
@@ -1447,7 +1375,7 @@ def generate_html_template(model_info, model=None):
               <p style="font-size: 0.95rem; color: var(--text-muted); margin-bottom: 24px;">
                 Return on investment for each dollar spent per channel
               </p>
-              {generate_roi_html(roi_by_channel)}
+              {generate_roi_html(roi_by_channel, channel_metrics)}
             </div>
           </div>
         </div>
@@ -1526,8 +1454,149 @@ def generate_html_template(model_info, model=None):
     return html_content
 
 
+def report_stamp(model_path, offline=False):
+    """Template version, output mode + size/mtime of every input file of a model folder's custom report"""
+    inputs = {}
+    for name in REPORT_INPUTS:
+        path = os.path.join(model_path, name)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            inputs[name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return {"template_version": TEMPLATE_VERSION, "offline": bool(offline), "inputs": inputs}
+
+
+def is_report_up_to_date(model_path, offline=False):
+    """True if custom_report.html exists and was built from the current inputs, template and mode"""
+    stamp_path = os.path.join(model_path, STAMP_FILE)
+    if not os.path.exists(os.path.join(model_path, REPORT_FILE)) or not os.path.exists(stamp_path):
+        return False
+    try:
+        with open(stamp_path, "r") as f:
+            return json.load(f) == report_stamp(model_path, offline)
+    except (OSError, ValueError):
+        return False
+
+
+def write_report(model_info, model=None, model_loader=None, offline=False, gzip=False):
+    """
+    Generate custom_report.html for a model folder, record its stamp and return the output path.
+    offline=True inlines the vendored Vega assets and shares datasets (see report_bundle.py);
+    gzip=True also writes custom_report.html.gz.
+    """
+    html_content = generate_html_template(model_info, model=model, model_loader=model_loader)
+    if offline:
+        html_content = bundle_offline(html_content)
+    
+    output_path = os.path.join(model_info["path"], REPORT_FILE)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(html_content)
+    if gzip:
+        write_gzip(output_path)
+    # Stamp taken after generation: metrics.json may just have been written
+    with open(os.path.join(model_info["path"], STAMP_FILE), "w") as f:
+        json.dump(report_stamp(model_info["path"], offline), f, indent=2)
+    return output_path
+
+
+def _batch_report_job(model_info, force=False, offline=False, gzip=False):
+    """Worker: rebuild one report unless it is up to date (the model itself is never loaded)"""
+    try:
+        if not os.path.exists(os.path.join(model_info["path"], "report_data.html")):
+            return {"folder": model_info["folder"], "status": "failed", "error": "report_data.html missing"}
+        if not force and is_report_up_to_date(model_info["path"], offline):
+            return {"folder": model_info["folder"], "status": "skipped"}
+        write_report(model_info, offline=offline, gzip=gzip)
+        return {"folder": model_info["folder"], "status": "ok"}
+    except Exception as e:
+        return {"folder": model_info["folder"], "status": "failed", "error": str(e)}
+
+
+def run_batch(models, max_workers=None, force=False, offline=False, gzip=False):
+    """Regenerate the custom reports of many model folders across a process pool"""
+    if not models:
+        print("❌ No model matches these filters")
+        return []
+    
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(models)))
+    print(f"🗂️  {len(models)} model folder(s), {max_workers} worker(s)\n")
+    
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_batch_report_job, model_info, force, offline, gzip) for model_info in models]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            icon = {"ok": "✅", "skipped": "⏭️ ", "failed": "❌"}[result["status"]]
+            detail = f" ({result['error']})" if result.get("error") else ""
+            print(f"  {icon} {result['folder']}{detail}")
+    
+    counts = {status: sum(1 for r in results if r["status"] == status) for status in ("ok", "skipped", "failed")}
+    print("\n" + "="*80)
+    print(f"📋 Generated: {counts['ok']}  ⏭️  Up to date: {counts['skipped']}  ❌ Failed: {counts['failed']}")
+    print("="*80)
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Generate the custom marketing report of saved models",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Interactive mode (model selection)
+  python custom_report.py
+
+  # Rebuild every report whose inputs or template changed
+  python custom_report.py --all
+
+  # Models created since a date, or trained on a given data hash
+  python custom_report.py --since 2025-11-01
+  python custom_report.py --hash 9e1cf6c5bc1ebb68
+
+  # Rebuild everything, even up-to-date reports
+  python custom_report.py --all --force --workers 8
+
+  # Self-contained reports for offline review (after report_bundle.py --fetch)
+  python custom_report.py --all --offline --gzip
+        """
+    )
+    parser.add_argument("--all", action="store_true", help="Batch mode: every model folder")
+    parser.add_argument("--since", type=str, default=None, metavar="DATE",
+                        help="Batch mode: model folders created on or after DATE (YYYY-MM-DD)")
+    parser.add_argument("--hash", type=str, default=None, help="Batch mode: model folders with this data hash")
+    parser.add_argument("--workers", type=int, default=None, help="Batch mode: worker processes. Default: CPU count")
+    parser.add_argument("--force", action="store_true", help="Batch mode: rebuild reports even if up to date")
+    parser.add_argument("--offline", action="store_true",
+                        help="Inline the vendored Vega assets (assets/vendor/) so the page renders without network")
+    parser.add_argument("--gzip", action="store_true", help="Also write a precompressed custom_report.html.gz")
+    parser.add_argument("--load-model", action="store_true",
+                        help="Interactive mode: load the model up front even if the report does not need it")
+    return parser.parse_args()
+
+
 def main():
     """Main function"""
+    args = parse_args()
+    if args.offline:
+        # Fail before any work if the vendored assets are missing
+        try:
+            load_vendor_scripts()
+        except FileNotFoundError as e:
+            print(f"❌ {e}")
+            exit(1)
+    if args.all or args.since or args.hash:
+        print("\n" + "="*80)
+        print("🎨 BATCH CUSTOM REPORT GENERATION")
+        print("="*80)
+        results = run_batch(
+            query_models(data_hash=args.hash, since=args.since),
+            max_workers=args.workers,
+            force=args.force,
+            offline=args.offline,
+            gzip=args.gzip,
+        )
+        exit(1 if any(r["status"] == "failed" for r in results) else 0)
+    
     print("\n" + "="*80)
     print("🎨 CUSTOM REPORT GENERATION")
     print("="*80)
@@ -1535,32 +1604,45 @@ def main():
     # Select a model
     model_info = interactive_select_model()
     
-    # Load model from .pkl file
-    print("\n" + "="*80)
-    print("📂 LOADING MODEL")
-    print("="*80)
-    try:
-        model = load_model_from_pkl(model_info["path"])
-    except Exception as e:
-        print(f"❌ Error loading model: {e}")
-        exit(1)
+    # The model is only loaded if a section needs it (metrics.json missing), or with --load-model
+    load_seconds = []
+    
+    def lazy_load_model():
+        print("\n" + "="*80)
+        print("📂 LOADING MODEL")
+        print("="*80)
+        start = time.perf_counter()
+        loaded = load_saved_model(model_info["path"])
+        load_seconds.append(time.perf_counter() - start)
+        print(f"⏱️  Model loaded in {load_seconds[-1]:.1f}s")
+        return loaded
+    
+    model = None
+    if args.load_model:
+        try:
+            model = lazy_load_model()
+        except Exception as e:
+            print(f"❌ Error loading model: {e}")
+            exit(1)
     
-    # Generate HTML
+    # Generate and save the HTML page
     print("\n" + "="*80)
     print("📝 GENERATING HTML PAGE")
     print("="*80)
-    html_content = generate_html_template(model_info, model=model)
-    
-    # Save HTML file
-    output_path = os.path.join(model_info["path"], "custom_report.html")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    start = time.perf_counter()
+    output_path = write_report(model_info, model=model, model_loader=lazy_load_model,
+                               offline=args.offline, gzip=args.gzip)
+    total_seconds = time.perf_counter() - start
     
     print(f"\n✅ HTML report generated successfully!")
     print(f"   📁 Location: {output_path}")
+    if load_seconds:
+        print(f"   ⏱️  {total_seconds:.2f}s (including {sum(load_seconds):.1f}s to load the model)")
+    else:
+        print(f"   ⏱️  {total_seconds:.2f}s, model not loaded "
+              f"({saved_model_size(model_info['path']) / 1024 / 1024:.1f} MB of posterior left on disk)")
     print(f"\n💡 You can open the file in your browser to view the report.")
 
 
 if __name__ == "__main__":
     main()
-
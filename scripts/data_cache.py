@@ -0,0 +1,207 @@
+"""
+Columnar cache for CSV inputs.
+
+The first read of a CSV parses it with pandas and writes an Arrow IPC file next
+to it (`<name>.cache.arrow`) plus a small JSON sidecar describing the source
+(size, mtime, SHA-256). Later reads memory-map the Arrow file instead of parsing
+the CSV again. The cache is rebuilt when the CSV's content changes; a changed
+mtime with identical size is re-validated against the content hash.
+Column selection and row filters are applied on the memory-mapped table, so
+only the selected slice is ever materialized as a DataFrame.
+
+pyarrow is optional: without it every read falls back to `pd.read_csv`.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".cache.arrow"
+META_SUFFIX = ".cache.json"
+SHAPE_CHUNK_ROWS = 200_000  # Rows per chunk when csv_shape counts rows without a cache
+
+
+def cache_paths(csv_path):
+    """Return (arrow_path, meta_path) for a CSV file"""
+    stem = os.path.splitext(str(csv_path))[0]
+    return stem + CACHE_SUFFIX, stem + META_SUFFIX
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Streamed SHA-256 of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_info(csv_path):
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _load_meta(meta_path):
+    try:
+        with open(meta_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _temp_path(path):
+    """A fresh temporary file next to path: concurrent writers never share one"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    return tmp_path
+
+
+def _replace(tmp_path, path):
+    try:
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _write_meta(meta_path, meta):
+    tmp_path = _temp_path(meta_path)
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f, indent=2)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    _replace(tmp_path, meta_path)
+
+
+def _valid_meta(csv_path, parse_dates=None):
+    """Return the cache metadata if the cache still matches the CSV, else None"""
+    arrow_path, meta_path = cache_paths(csv_path)
+    meta = _load_meta(meta_path)
+    if meta is None or meta.get("version") != CACHE_VERSION or not os.path.exists(arrow_path):
+        return None
+    if parse_dates is not None and sorted(meta.get("parse_dates", [])) != sorted(parse_dates):
+        return None
+
+    source = _source_info(csv_path)
+    if source["size"] != meta["size"]:
+        return None
+    if source["mtime_ns"] != meta["mtime_ns"]:
+        # Touched or copied but maybe unchanged: fall back to the content hash
+        if file_sha256(csv_path) != meta["sha256"]:
+            return None
+        meta["mtime_ns"] = source["mtime_ns"]
+        _write_meta(meta_path, meta)
+    return meta
+
+
+def _build_cache(csv_path, parse_dates=None):
+    """Parse the CSV once and write the Arrow cache and its sidecar"""
+    source = _source_info(csv_path)
+    df = pd.read_csv(csv_path)
+    for col in parse_dates or []:
+        df[col] = pd.to_datetime(df[col])
+
+    arrow_path, meta_path = cache_paths(csv_path)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = _temp_path(arrow_path)
+    try:
+        # Uncompressed on purpose: compressed buffers cannot be memory-mapped
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    _replace(tmp_path, arrow_path)
+
+    _write_meta(meta_path, {
+        "version": CACHE_VERSION,
+        "source": os.path.basename(str(csv_path)),
+        "size": source["size"],
+        "mtime_ns": source["mtime_ns"],
+        "sha256": file_sha256(csv_path),
+        "parse_dates": list(parse_dates or []),
+        "rows": table.num_rows,
+        "columns": table.num_columns,
+    })
+    return df
+
+
+def _read_arrow(arrow_path, columns=None, filters=None):
+    with pa.memory_map(arrow_path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    if filters:
+        mask = None
+        for col, values in filters.items():
+            col_mask = pc.is_in(table[col], value_set=pa.array(list(values), type=table[col].type))
+            mask = col_mask if mask is None else pc.and_(mask, col_mask)
+        table = table.filter(mask)
+    if columns is not None:
+        wanted = set(columns)
+        table = table.select([name for name in table.column_names if name in wanted])
+    # split_blocks avoids consolidating columns into one big copied block
+    return table.to_pandas(split_blocks=True)
+
+
+def _select(df, columns=None, filters=None):
+    """Same selection as _read_arrow, on an already parsed DataFrame"""
+    for col, values in (filters or {}).items():
+        df = df[df[col].isin(list(values))]
+    if columns is not None:
+        df = df[[name for name in df.columns if name in set(columns)]]
+    return df.reset_index(drop=True)
+
+
+def read_csv_cached(csv_path, parse_dates=None, columns=None, filters=None):
+    """
+    Read a CSV through its columnar cache.
+    `parse_dates` columns are stored already converted to datetime64.
+    `columns` keeps only these columns (in file order); `filters` ({column: values}) keeps
+    the rows whose value is in the given set for every listed column.
+    """
+    if pa is None:
+        usecols = None if columns is None else list(dict.fromkeys([*columns, *(filters or {})]))
+        df = pd.read_csv(csv_path, usecols=usecols)
+        for col in parse_dates or []:
+            df[col] = pd.to_datetime(df[col])
+        return _select(df, columns, filters)
+
+    if _valid_meta(csv_path, parse_dates=parse_dates or []) is not None:
+        return _read_arrow(cache_paths(csv_path)[0], columns, filters)
+    df = _build_cache(csv_path, parse_dates=parse_dates)
+    if columns is None and not filters:
+        return df
+    # First read: serve the selection from the cache that was just written
+    del df
+    return _read_arrow(cache_paths(csv_path)[0], columns, filters)
+
+
+def csv_shape(csv_path):
+    """
+    (rows, columns) of a CSV, from its cache when one is valid. Otherwise the rows are
+    counted by streaming the first column: no cache is built (read_csv_cached builds it
+    with the parse_dates its caller needs).
+    """
+    if pa is not None:
+        # The shape does not depend on parse_dates: any valid cache will do
+        meta = _valid_meta(csv_path)
+        if meta is not None:
+            return meta["rows"], meta["columns"]
+
+    n_cols = len(pd.read_csv(csv_path, nrows=0).columns)
+    n_rows = sum(len(chunk) for chunk in pd.read_csv(csv_path, usecols=[0], chunksize=SHAPE_CHUNK_ROWS))
+    return n_rows, n_cols
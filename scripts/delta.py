@@ -0,0 +1,206 @@
+"""
+Block-level delta between a trained model's data and a new version of it.
+
+Every model folder has the fingerprint of its training data (fingerprint.json,
+see fingerprint.py) with one digest per (geo, month) block. The new data is
+fingerprinted with the same block layout up to the model's last date; rows
+after that date are only counted. Comparing the two tells exactly which
+blocks of the history were restated, and gives the retraining decision:
+  - cache_hit:   same data and configuration, the model is reused as is;
+  - incremental: history unchanged and new periods appended, warm-start from
+                 the model (run.py --incremental);
+  - full:        history restated or reordered (or columns / configuration changed).
+Only the columns and geos the model uses are fingerprinted, so upstream
+restatements of other columns or geos do not trigger a retrain.
+"""
+
+import os
+import json
+import argparse
+
+from fingerprint import (
+    fingerprint_frame, fingerprint_csv, data_hash_from_fingerprint, load_fingerprint, changed_blocks,
+    BLOCK_SEPARATOR, DEFAULT_CHUNK_ROWS,
+)
+
+
+def _history_layout(old_fingerprint):
+    """Fingerprint arguments that reproduce the block layout of old_fingerprint, up to its last date"""
+    return {
+        "time_col": old_fingerprint["time_col"],
+        "time_block": old_fingerprint["time_block"],
+        "geo_col": old_fingerprint.get("geo_col"),
+        "until": old_fingerprint["date_range"]["end"],
+    }
+
+
+def history_fingerprint_frame(df, old_fingerprint):
+    return fingerprint_frame(df, **_history_layout(old_fingerprint))
+
+
+def history_fingerprint_csv(csv_path, old_fingerprint, columns=None, filters=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Same as history_fingerprint_frame, streaming the CSV (columns/filters as read_csv_cached)"""
+    return fingerprint_csv(csv_path, columns=columns, filters=filters, chunk_rows=chunk_rows,
+                           **_history_layout(old_fingerprint))
+
+
+def _split_block(key):
+    geo, _, period = key.rpartition(BLOCK_SEPARATOR)
+    return geo or None, period
+
+
+def assess_delta(old_fingerprint, history_fingerprint, old_data_hash=None, model_config=None):
+    """
+    Compare a model's fingerprint with the history fingerprint of the new data.
+    With old_data_hash and the new model_config, a configuration change is detected too.
+    Rows moved across blocks without any block changing (reordered) change the data hash
+    like any restatement, so they also give a full retrain.
+    Returns {"decision", "reason", "blocks" {"added", "removed", "modified"}, "restated_periods",
+    "restated_geos", "changed_columns", "reordered", "appended" {"rows", "start", "end"}}.
+    """
+    blocks = changed_blocks(old_fingerprint, history_fingerprint)
+    restated = blocks["added"] + blocks["removed"] + blocks["modified"]
+    old_digests = old_fingerprint["column_digests"]
+    new_digests = history_fingerprint["column_digests"]
+    delta = {
+        "blocks": blocks,
+        "restated_periods": sorted({_split_block(key)[1] for key in restated}),
+        "restated_geos": sorted({_split_block(key)[0] for key in restated} - {None}),
+        "changed_columns": sorted(c for c in set(old_digests) | set(new_digests) if old_digests.get(c) != new_digests.get(c)),
+        # Same blocks, different overall digest: the rows of the history come in another order
+        "reordered": (not restated and old_fingerprint["columns"] == history_fingerprint["columns"]
+                      and old_fingerprint["digest"] != history_fingerprint["digest"]),
+        "appended": history_fingerprint["after_until"],
+    }
+
+    config_changed = False
+    if old_data_hash is not None and model_config is not None:
+        # The model's own data hashed under the new configuration (the data is compared above)
+        config_changed = data_hash_from_fingerprint(old_fingerprint, model_config) != old_data_hash
+
+    if old_fingerprint["columns"] != history_fingerprint["columns"]:
+        decision, reason = "full", "columns changed"
+    elif restated:
+        decision, reason = "full", f"history restated in {len(restated)} block(s)"
+    elif delta["reordered"]:
+        decision, reason = "full", "history rows reordered"
+    elif config_changed:
+        decision, reason = "full", "configuration changed"
+    elif delta["appended"]["rows"]:
+        decision, reason = "incremental", f"{delta['appended']['rows']} row(s) appended, history unchanged"
+    else:
+        decision, reason = "cache_hit", "same data" + (" and configuration" if model_config is not None else "")
+    return {"decision": decision, "reason": reason, **delta}
+
+
+def delta_for_model(model_info, df=None, source=None, model_config=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Delta between a registered model (query_models entry) and new data: a loaded df
+    or a dataset source from run.resolve_dataset_source, streamed. The configuration
+    is checked against the model's data hash when model_config is given (or taken
+    from the source). Returns None if the model has no fingerprint.json.
+    """
+    old_fingerprint = load_fingerprint(model_info["path"])
+    if old_fingerprint is None or not old_fingerprint.get("date_range"):
+        return None
+    if df is not None:
+        history = history_fingerprint_frame(df, old_fingerprint)
+    else:
+        history = history_fingerprint_csv(source["csv_path"], old_fingerprint, chunk_rows=chunk_rows, **source["read"])
+    if model_config is None and source is not None:
+        model_config = source["model_config"]
+    return assess_delta(old_fingerprint, history, model_info["metadata"].get("data_hash"), model_config)
+
+
+def latest_delta(df, config_data):
+    """(model_info, delta) against the most recent fingerprinted model of the dataset, or None"""
+    from registry import query_models
+
+    for model_info in query_models(dataset_name=config_data["dataset_name"], with_model=True):
+        delta = delta_for_model(model_info, df=df, model_config=config_data["model_config"])
+        if delta is not None:
+            return model_info, delta
+    return None
+
+
+def print_delta(delta, show_blocks=False):
+    icon = {"cache_hit": "♻️ ", "incremental": "📈", "full": "🔁"}[delta["decision"]]
+    print(f"{icon} Decision: {delta['decision']} ({delta['reason']})")
+    appended = delta["appended"]
+    if appended["rows"]:
+        print(f"   ➕ Appended: {appended['rows']} row(s), {appended['start']} → {appended['end']}")
+    blocks = delta["blocks"]
+    if any(blocks.values()):
+        print(f"   ✏️  Restated blocks: {len(blocks['modified'])} modified, {len(blocks['added'])} added, "
+              f"{len(blocks['removed'])} removed")
+        periods = delta["restated_periods"]
+        print(f"      Periods: {periods[0]} → {periods[-1]} ({len(periods)})")
+        if delta["restated_geos"]:
+            print(f"      Geos: {', '.join(delta['restated_geos'])}")
+        if delta["changed_columns"]:
+            print(f"      Columns: {', '.join(delta['changed_columns'])}")
+        if show_blocks:
+            for kind in ["modified", "added", "removed"]:
+                for key in blocks[kind]:
+                    print(f"      {kind:<8} {key}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Which (geo, month) blocks changed since a model was trained, and whether to retrain",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Compare the dataset's current file with its most recent model
+  python scripts/delta.py --config config_v1.yaml
+
+  # A regenerated file against a given model, listing every changed block
+  python scripts/delta.py --config config_v1.yaml --data data_processed_new.csv --model 2025-11-21_11-24-58 --blocks
+
+  # Machine-readable output (decision: cache_hit / incremental / full)
+  python scripts/delta.py --config config_v1.yaml --json
+        """
+    )
+    parser.add_argument("--config", type=str, required=True, help="Configuration file (e.g. config_v1.yaml)")
+    parser.add_argument("--dataset", type=str, default=None, help="Dataset key of the config. Default: default_dataset")
+    parser.add_argument("--data", type=str, default=None, help="New data file instead of the config's csv_path")
+    parser.add_argument("--model", type=str, default=None,
+                        help="Model folder to compare with. Default: most recent model of the dataset")
+    parser.add_argument("--blocks", action="store_true", help="List every changed block")
+    parser.add_argument("--json", action="store_true", help="Print the delta as JSON")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f"Rows read per chunk. Default: {DEFAULT_CHUNK_ROWS}")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from run import resolve_dataset_source
+    from registry import query_models
+
+    args = parse_args()
+    config_file = args.config if os.path.isabs(args.config) else f"configs/{args.config}"
+    source = resolve_dataset_source(config_file, data_file=args.data, dataset_name=args.dataset)
+    if "media_long" in source["model_config"]:
+        print("❌ Datasets with media_long are assembled from two files: compare them with run.py --incremental")
+        exit(1)
+
+    if args.model:
+        models = [m for m in query_models() if m["folder"] == args.model]
+    else:
+        models = [m for m in query_models(dataset_name=source["dataset_name"], with_model=True)
+                  if load_fingerprint(m["path"]) is not None]
+    if not models:
+        print(f"❌ No trained model with a fingerprint for dataset '{source['dataset_name']}'")
+        exit(1)
+    model_info = models[0]
+
+    delta = delta_for_model(model_info, source=source, chunk_rows=args.chunk_rows)
+    if delta is None:
+        print(f"❌ Model {model_info['folder']} has no fingerprint.json (trained before fingerprints were saved)")
+        exit(1)
+    if args.json:
+        print(json.dumps({"model": model_info["folder"], **delta}, indent=2))
+    else:
+        print(f"📅 Model: {model_info['folder']}  (data up to {model_info['metadata'].get('date_range', {}).get('end')})")
+        print(f"📊 Data: {source['csv_path']}\n")
+        print_delta(delta, show_blocks=args.blocks)
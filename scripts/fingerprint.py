@@ -0,0 +1,348 @@
+"""
+Data fingerprints (fingerprint.json) and the training data hash.
+
+Every column is hashed value by value (vectorized `hash_array` on a
+canonical form: datetimes as int64 ns, numbers as float64, anything else as
+text), and the digests are built from these row hashes in row order:
+  - one digest per column;
+  - one digest per time block (calendar month by default), or per (geo, time
+    block) when a geo column is given, over the combined row hashes of the
+    rows in that block;
+  - an overall digest over the column names and column digests.
+Reordering, duplicating or editing rows changes the digests (a plain sum of
+row hashes does not see reordering and can alias). All digests are updated
+chunk by chunk, so `fingerprint_csv` streams a file without materializing
+it and gives the same result as `fingerprint_frame` on the loaded data.
+
+`compute_data_hash` (the cache key of trained models) combines the overall
+digest with the model configuration; the fingerprint of the training data
+is saved with each model so later runs can tell which blocks changed.
+"""
+
+import os
+import json
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+
+FINGERPRINT_FILE = "fingerprint.json"
+FINGERPRINT_VERSION = 1
+DEFAULT_TIME_BLOCK = "M"  # Pandas period frequency of the block digests
+DEFAULT_CHUNK_ROWS = 200_000
+BLOCK_SEPARATOR = "|"  # Block keys are "<period>" or "<geo>|<period>"
+_ROW_MULTIPLIER = np.uint64(1_000_003)
+
+
+def _canonical(series):
+    """Values in a dtype-stable form, so chunked and whole-file reads hash the same"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype("datetime64[ns]").astype("int64")
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        return series.astype("float64")
+    return series.astype(str).where(series.notna(), "")
+
+
+def column_hashes(series):
+    """uint64 hash of every value of a column"""
+    return pd.util.hash_array(_canonical(series).to_numpy())
+
+
+def _digest(h):
+    return h.hexdigest()[:16]  # 16 characters is enough
+
+
+class Fingerprinter:
+    """Incremental fingerprint: feed DataFrame chunks in row order with update(), then result()"""
+
+    def __init__(self, time_col=None, time_block=DEFAULT_TIME_BLOCK, geo_col=None, until=None):
+        self.time_col = time_col
+        self.time_block = time_block
+        self.geo_col = geo_col
+        # Rows after `until` are only counted (fingerprint of the history up to that date)
+        self.until = None if until is None else pd.Timestamp(until)
+        self.after_until = {"rows": 0, "start": None, "end": None}
+        self.columns = None
+        self.rows = 0
+        self.column_digests = {}
+        self.blocks = {}
+        self.time_range = [None, None]
+
+    def update(self, chunk):
+        if self.columns is None:
+            self.columns = [str(c) for c in chunk.columns]
+            self.column_digests = {c: hashlib.sha256() for c in self.columns}
+        elif [str(c) for c in chunk.columns] != self.columns:
+            raise ValueError("All chunks must have the same columns")
+        if self.until is not None:
+            times = pd.to_datetime(chunk[self.time_col])
+            after = times > self.until
+            if after.any():
+                self.after_until["rows"] += int(after.sum())
+                low, high = times[after].min(), times[after].max()
+                start, end = self.after_until["start"], self.after_until["end"]
+                self.after_until["start"] = low if start is None else min(low, start)
+                self.after_until["end"] = high if end is None else max(high, end)
+                chunk = chunk[~after]
+        if chunk.empty:
+            return
+
+        rows = np.zeros(len(chunk), dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for name, col in zip(self.columns, chunk.columns):
+                hashes = column_hashes(chunk[col])
+                self.column_digests[name].update(hashes.tobytes())
+                rows = rows * _ROW_MULTIPLIER ^ hashes
+        self.rows += len(chunk)
+
+        if self.time_col is not None:
+            times = pd.to_datetime(chunk[self.time_col])
+            low, high = times.min(), times.max()
+            self.time_range = [low if self.time_range[0] is None else min(low, self.time_range[0]),
+                               high if self.time_range[1] is None else max(high, self.time_range[1])]
+            keys = times.dt.to_period(self.time_block).astype(str).to_numpy()
+            if self.geo_col is not None:
+                keys = chunk[self.geo_col].astype(str).to_numpy().astype(object) + BLOCK_SEPARATOR + keys
+            self._update_blocks(keys, rows)
+
+    def _update_blocks(self, keys, rows):
+        codes, uniques = pd.factorize(keys)
+        for code, key in enumerate(uniques):
+            # Boolean mask keeps the row order inside the block
+            block_rows = rows[codes == code]
+            if key not in self.blocks:
+                self.blocks[key] = {"rows": 0, "hash": hashlib.sha256()}
+            self.blocks[key]["rows"] += len(block_rows)
+            self.blocks[key]["hash"].update(block_rows.tobytes())
+
+    def result(self):
+        columns = self.columns or []
+        column_digests = {c: _digest(self.column_digests[c]) for c in columns}
+        overall = hashlib.sha256(json.dumps([self.rows, columns, [column_digests[c] for c in columns]]).encode())
+        fingerprint = {
+            "version": FINGERPRINT_VERSION,
+            "digest": _digest(overall),
+            "rows": self.rows,
+            "columns": columns,
+            "column_digests": column_digests,
+            "time_col": self.time_col,
+        }
+        if self.time_col is not None:
+            fingerprint["date_range"] = {"start": str(self.time_range[0]), "end": str(self.time_range[1])}
+            fingerprint["time_block"] = self.time_block
+            fingerprint["geo_col"] = self.geo_col
+            fingerprint["blocks"] = {
+                key: {"rows": block["rows"], "digest": _digest(block["hash"])}
+                for key, block in sorted(self.blocks.items())
+            }
+        if self.until is not None:
+            fingerprint["until"] = str(self.until)
+            fingerprint["after_until"] = {
+                "rows": self.after_until["rows"],
+                "start": None if self.after_until["start"] is None else str(self.after_until["start"]),
+                "end": None if self.after_until["end"] is None else str(self.after_until["end"]),
+            }
+        return fingerprint
+
+
+def fingerprint_frame(df, time_col=None, time_block=DEFAULT_TIME_BLOCK, geo_col=None, until=None,
+                      chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Fingerprint of a loaded DataFrame (hashed in slices of chunk_rows rows)"""
+    fingerprinter = Fingerprinter(time_col, time_block, geo_col, until)
+    for start in range(0, max(len(df), 1), chunk_rows):
+        fingerprinter.update(df.iloc[start:start + chunk_rows])
+    return fingerprinter.result()
+
+
+def fingerprint_csv(csv_path, columns=None, filters=None, time_col=None, time_block=DEFAULT_TIME_BLOCK,
+                    geo_col=None, until=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Fingerprint of a CSV read in chunks of chunk_rows rows. `columns` and `filters`
+    select like data_cache.read_csv_cached, so the result matches fingerprint_frame
+    on the DataFrame that read_csv_cached returns for the same arguments.
+    """
+    usecols = None if columns is None else list(dict.fromkeys([*columns, *(filters or {})]))
+    fingerprinter = Fingerprinter(time_col, time_block, geo_col, until)
+    reader = pd.read_csv(csv_path, usecols=usecols, parse_dates=[time_col] if time_col else None, chunksize=chunk_rows)
+    for chunk in reader:
+        for col, values in (filters or {}).items():
+            chunk = chunk[chunk[col].isin(list(values))]
+        if columns is not None:
+            chunk = chunk[[name for name in chunk.columns if name in set(columns)]]
+        fingerprinter.update(chunk)
+    if fingerprinter.columns is None:
+        # Header-only file
+        fingerprinter.update(pd.read_csv(csv_path, usecols=usecols, nrows=0))
+    return fingerprinter.result()
+
+
+def data_hash_from_fingerprint(fingerprint, model_config):
+    """Cache key of a model: data fingerprint + the configuration that changes the posterior"""
+    columns = model_config["columns"]
+    data_info = {
+        "shape": (fingerprint["rows"], len(fingerprint["columns"])),
+        "columns": sorted(fingerprint["columns"]),
+        "time_col": columns["time"],
+        "kpi_col": columns["kpi"],
+        "geo_col": columns.get("geo"),
+        "media_cols": sorted(columns["media"]) if columns.get("media") else [],
+        "media_spend_cols": sorted(columns["media_spend"]) if columns.get("media_spend") else [],
+        "date_range": fingerprint.get("date_range"),
+        "data_digest": fingerprint["digest"],
+    }
+    model_info = {
+        "kpi_type": model_config["kpi_type"],
+        "model_params": model_config.get("model", {}),
+        "sampling": model_config.get("sampling", {}),
+        "features": model_config.get("features", {}),
+    }
+    combined_str = str(data_info) + str(model_info)
+    return hashlib.sha256(combined_str.encode()).hexdigest()[:16]
+
+
+def compute_data_hash(df: pd.DataFrame, config_data: dict) -> str:
+    """
+    Computes a unique hash based on the data and model configuration.
+    This allows uniquely identifying a model by its training data.
+    """
+    model_config = config_data["model_config"]
+    fingerprint = fingerprint_frame(df, time_col=model_config["columns"]["time"])
+    return data_hash_from_fingerprint(fingerprint, model_config)
+
+
+def legacy_data_hashes(df, model_config):
+    """
+    Data hashes of models saved before fingerprints (sum of hash_pandas_object), as
+    computed by run.py and by save_model.py (which left out the feature priors)
+    """
+    columns = model_config["columns"]
+    data_info = {
+        "shape": df.shape,
+        "columns": sorted(df.columns.tolist()),
+        "time_col": columns["time"],
+        "kpi_col": columns["kpi"],
+        "geo_col": columns.get("geo"),
+        "media_cols": sorted(columns["media"]) if columns.get("media") else [],
+        "media_spend_cols": sorted(columns["media_spend"]) if columns.get("media_spend") else [],
+        "date_range": {
+            "start": str(df[columns["time"]].min()),
+            "end": str(df[columns["time"]].max()),
+        },
+        "data_hash": pd.util.hash_pandas_object(df).sum(),
+    }
+    model_info = {
+        "kpi_type": model_config["kpi_type"],
+        "model_params": model_config.get("model", {}),
+        "sampling": model_config.get("sampling", {}),
+    }
+    hashes = set()
+    for info in [{**model_info, "features": model_config.get("features", {})}, model_info]:
+        hashes.add(hashlib.sha256((str(data_info) + str(info)).encode()).hexdigest()[:16])
+    return hashes
+
+
+def save_fingerprint(fingerprint, model_dir):
+    path = os.path.join(model_dir, FINGERPRINT_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(fingerprint, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_fingerprint(model_dir):
+    """Saved fingerprint of a model's training data, or None (older models, other version)"""
+    try:
+        with open(os.path.join(model_dir, FINGERPRINT_FILE), "r") as f:
+            fingerprint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return fingerprint if fingerprint.get("version") == FINGERPRINT_VERSION else None
+
+
+def changed_blocks(old, new):
+    """Time blocks added, removed or modified between two fingerprints (same time_block)"""
+    old_blocks, new_blocks = old.get("blocks", {}), new.get("blocks", {})
+    return {
+        "added": sorted(set(new_blocks) - set(old_blocks)),
+        "removed": sorted(set(old_blocks) - set(new_blocks)),
+        "modified": sorted(k for k in set(old_blocks) & set(new_blocks) if old_blocks[k] != new_blocks[k]),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Fingerprint the training data of a dataset (streamed, without loading it)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Data hash of a dataset and whether a trained model already matches it
+  python scripts/fingerprint.py --config config_v1.yaml
+  python scripts/fingerprint.py --config config_v1.yaml --dataset weekly_applications --data data_new.csv
+
+  # Column and per-month digests of any CSV
+  python scripts/fingerprint.py --csv data/processed/data_processed.csv --time-col Date --blocks
+        """
+    )
+    parser.add_argument("--config", type=str, default=None, help="Configuration file (e.g. config_v1.yaml)")
+    parser.add_argument("--dataset", type=str, default=None, help="Dataset key of the config. Default: default_dataset")
+    parser.add_argument("--data", type=str, default=None, help="Data file instead of the config's csv_path")
+    parser.add_argument("--csv", type=str, default=None, help="Fingerprint this CSV (all columns)")
+    parser.add_argument("--time-col", type=str, default=None, help="With --csv: time column for block digests")
+    parser.add_argument("--geo-col", type=str, default=None, help="With --csv: geo column for (geo, time block) digests")
+    parser.add_argument("--time-block", type=str, default=DEFAULT_TIME_BLOCK,
+                        help=f"Pandas period frequency of the block digests. Default: {DEFAULT_TIME_BLOCK} (month)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f"Rows read per chunk. Default: {DEFAULT_CHUNK_ROWS}")
+    parser.add_argument("--blocks", action="store_true", help="Print the digest of every time block")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    import time
+
+    args = parse_args()
+    if not args.csv and not args.config:
+        print("❌ Error: pass --config or --csv")
+        exit(1)
+
+    start = time.perf_counter()
+    data_hash = None
+    if args.csv:
+        fingerprint = fingerprint_csv(args.csv, time_col=args.time_col, time_block=args.time_block,
+                                      geo_col=args.geo_col, chunk_rows=args.chunk_rows)
+    else:
+        from run import resolve_dataset_source
+
+        config_file = args.config if os.path.isabs(args.config) else f"configs/{args.config}"
+        source = resolve_dataset_source(config_file, data_file=args.data, dataset_name=args.dataset)
+        if "media_long" in source["model_config"]:
+            print("❌ Datasets with media_long are assembled from two files: their data hash needs the loaded data")
+            exit(1)
+        fingerprint = fingerprint_csv(source["csv_path"], time_col=source["time_col"], time_block=args.time_block,
+                                      geo_col=source["model_config"]["columns"].get("geo"),
+                                      chunk_rows=args.chunk_rows, **source["read"])
+        data_hash = data_hash_from_fingerprint(fingerprint, source["model_config"])
+    elapsed = time.perf_counter() - start
+
+    print(f"🔎 {fingerprint['rows']:,} rows × {len(fingerprint['columns'])} columns "
+          f"in {elapsed:.2f}s  digest {fingerprint['digest']}")
+    if fingerprint.get("date_range"):
+        print(f"📅 {fingerprint['date_range']['start']} → {fingerprint['date_range']['end']}  "
+              f"({len(fingerprint['blocks'])} blocks of '{fingerprint['time_block']}')")
+    for column, digest in fingerprint["column_digests"].items():
+        print(f"   {digest}  {column}")
+    if args.blocks:
+        for key, block in fingerprint.get("blocks", {}).items():
+            print(f"   {block['digest']}  {key} ({block['rows']} rows)")
+
+    if data_hash is not None:
+        from registry import query_models
+
+        print(f"\n🔑 Data hash: {data_hash}")
+        cached = query_models(data_hash=data_hash, with_model=True)
+        if cached:
+            print(f"♻️  Already trained: {cached[0]['folder']} (run.py reuses it unless --force)")
+        else:
+            print("🆕 No trained model with this data hash")
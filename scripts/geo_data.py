@@ -0,0 +1,164 @@
+"""
+Geo-level input data: column selection, geo subsets, long-format media and
+dense array construction.
+
+Meridian's DataFrameDataLoader copies and re-pivots the whole frame once per
+component (KPI, population, controls, media, spend), which gets expensive
+with hundreds of DMAs. Here the (geo, time) position of every row is
+factorized once and each component is written straight into a dense
+(geo, time[, channel]) array, then handed to Meridian's
+NDArrayInputDataBuilder.
+
+Dataset config keys (all optional):
+  columns.population   per-geo population column (required with several geos)
+  geos                 list of geos to keep; other rows are never materialized
+  media_long           media/spend given as a long geo × time × channel table:
+    csv_path             CSV with one row per (geo, time, channel)
+    geo / time           column names (default: columns.geo / columns.time)
+    channel              channel name column
+    spend                spend column
+    media                execution column (impressions...); spend when omitted
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_cache import read_csv_cached
+
+# Get POC directory (parent of scripts directory)
+SCRIPT_DIR = Path(__file__).parent.absolute()
+POC_DIR = SCRIPT_DIR.parent.absolute()
+
+# Same value as meridian.constants.NATIONAL_MODEL_DEFAULT_GEO_NAME
+NATIONAL_GEO = "national_geo"
+
+
+def _resolve(path):
+    return path if os.path.isabs(path) else os.path.join(POC_DIR, path)
+
+
+def data_columns(columns):
+    """Columns of the main CSV the model actually uses (everything else is not read)"""
+    names = [columns["time"], columns.get("geo"), columns["kpi"], columns.get("population")]
+    names += columns.get("controls") or []
+    names += columns.get("media") or []
+    names += columns.get("media_spend") or []
+    return [name for name in dict.fromkeys(names) if name]
+
+
+def geo_time_codes(df, time_col, geo_col=None):
+    """
+    Factorize the (geo, time) position of every row.
+    Returns (geo_codes, time_codes, geos, times) with geos/times sorted.
+    """
+    time_codes, times = pd.factorize(df[time_col], sort=True)
+    if geo_col and geo_col in df.columns:
+        geo_codes, geos = pd.factorize(df[geo_col].astype(str), sort=True)
+    else:
+        geo_codes, geos = np.zeros(len(df), dtype=np.intp), pd.Index([NATIONAL_GEO])
+    return geo_codes, time_codes, list(geos), pd.DatetimeIndex(times)
+
+
+def dense_array(values, geo_codes, time_codes, n_geos, n_times):
+    """(n_rows[, k]) values → (n_geos, n_times[, k]) array; missing cells stay NaN"""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full((n_geos, n_times) + values.shape[1:], np.nan)
+    out[geo_codes, time_codes] = values
+    return out
+
+
+def pivot_long(long_df, geo_col, time_col, channel_col, value_col, geos, times, channels):
+    """Long (geo, time, channel, value) rows → dense (geo, time, channel) array, zeros where absent"""
+    geo_codes = pd.Index(geos).get_indexer(long_df[geo_col].astype(str))
+    time_codes = pd.DatetimeIndex(times).get_indexer(pd.to_datetime(long_df[time_col]))
+    channel_codes = pd.Index(channels).get_indexer(long_df[channel_col])
+    keep = (geo_codes >= 0) & (time_codes >= 0) & (channel_codes >= 0)
+
+    out = np.zeros((len(geos), len(times), len(channels)))
+    # Duplicated (geo, time, channel) rows are summed
+    np.add.at(out, (geo_codes[keep], time_codes[keep], channel_codes[keep]),
+              long_df[value_col].to_numpy(dtype=np.float64)[keep])
+    return out
+
+
+def add_long_media(df, model_config):
+    """
+    Pivot the media_long table onto the rows of df, one column per channel
+    (`<channel>` for spend, `<channel> (media)` when a separate execution
+    column is given), and fill in the media columns and channel mappings of
+    model_config. Returns the extended df.
+    """
+    spec = model_config["media_long"]
+    columns = model_config["columns"]
+    geo_col = spec.get("geo", columns.get("geo"))
+    time_col = spec.get("time", columns["time"])
+    value_cols = [spec["spend"]] + ([spec["media"]] if spec.get("media") else [])
+
+    filters = {geo_col: model_config["geos"]} if model_config.get("geos") else None
+    long_df = read_csv_cached(
+        _resolve(spec["csv_path"]),
+        parse_dates=[time_col],
+        columns=[geo_col, time_col, spec["channel"], *value_cols],
+        filters=filters,
+    )
+    channels = list(spec.get("channels") or sorted(long_df[spec["channel"]].unique()))
+
+    geo_codes, time_codes, geos, times = geo_time_codes(df, columns["time"], columns.get("geo"))
+    spend_columns = list(channels)
+    media_columns = [f"{c} (media)" for c in channels] if spec.get("media") else spend_columns
+    # Built as one block and joined once (no per-column inserts)
+    wide = {}
+    for value_col, names in zip(value_cols, [spend_columns, media_columns]):
+        dense = pivot_long(long_df, geo_col, time_col, spec["channel"], value_col, geos, times, channels)
+        rows = dense[geo_codes, time_codes]
+        wide.update({name: rows[:, k] for k, name in enumerate(names)})
+    df = pd.concat([df, pd.DataFrame(wide, index=df.index)], axis=1)
+
+    columns["media"] = media_columns
+    columns["media_spend"] = spend_columns
+    model_config["media_to_channel"] = dict(zip(media_columns, channels))
+    model_config["media_spend_to_channel"] = dict(zip(spend_columns, channels))
+    return df
+
+
+def build_input_data(config_data):
+    """Meridian InputData of config_data, built from dense arrays (one pass over the frame)"""
+    from meridian.data import nd_array_input_data_builder
+
+    df = config_data["df"]
+    coord = config_data["coord_to_columns"]
+    model_config = config_data["model_config"]
+
+    geo_codes, time_codes, geos, times = geo_time_codes(df, coord.time, coord.geo)
+    n_geos, n_times = len(geos), len(times)
+    if len(df) != len(pd.unique(geo_codes.astype(np.int64) * n_times + time_codes)):
+        raise ValueError(f"Duplicate ({coord.geo}, {coord.time}) rows in the input data")
+
+    def dense(cols):
+        return dense_array(df[list(cols)].to_numpy(dtype=np.float64), geo_codes, time_codes, n_geos, n_times)
+
+    builder = nd_array_input_data_builder.NDArrayInputDataBuilder(kpi_type=model_config["kpi_type"])
+    builder.time_coords = list(times.strftime("%Y-%m-%d"))
+    builder.media_time_coords = list(times.strftime("%Y-%m-%d"))
+    # A single geo is a national model, named as Meridian names it
+    builder.geos = geos if n_geos > 1 else [NATIONAL_GEO]
+
+    builder.with_kpi(dense_array(df[coord.kpi].to_numpy(dtype=np.float64), geo_codes, time_codes, n_geos, n_times))
+    if n_geos > 1:
+        population = np.full(n_geos, np.nan)
+        values = df[coord.population].to_numpy(dtype=np.float64)
+        population[geo_codes] = values
+        if not np.allclose(population[geo_codes], values):
+            raise ValueError(f"'{coord.population}' must be constant within each geo")
+        builder.with_population(population)
+    if coord.controls:
+        builder.with_controls(dense(coord.controls), list(coord.controls))
+
+    channels = [config_data["media_to_channel"][c] for c in coord.media]
+    if channels != [config_data["media_spend_to_channel"][c] for c in coord.media_spend]:
+        raise ValueError("columns.media and columns.media_spend must map to the same channels, in the same order")
+    builder.with_media(dense(coord.media), dense(coord.media_spend), channels)
+    return builder.build()
@@ -0,0 +1,163 @@
+"""
+Report metrics computed from the posterior instead of scraped from HTML.
+
+`compute_model_metrics` runs the Meridian Analyzer once per quantity to get
+per-draw arrays (chains, draws, channels) and reduces them with NumPy:
+  - ROI, mROI and CPIK per paid channel;
+  - incremental outcome and its share of the total expected outcome;
+  - fit statistics (R², MAPE, wMAPE) of the posterior mean expected outcome
+    against the observed outcome, aggregated over geos.
+Every per-draw quantity is summarized as mean, median and an equal-tailed
+credible interval. The result is cached as metrics.json in the model folder.
+"""
+
+import os
+import json
+
+import numpy as np
+
+METRICS_FILE = "metrics.json"
+METRICS_VERSION = 1
+DEFAULT_CONFIDENCE_LEVEL = 0.9
+
+
+def summarize_draws(draws, confidence_level=DEFAULT_CONFIDENCE_LEVEL):
+    """
+    Reduce an array of shape (chains, draws, ...) over its first two axes.
+    Returns a dict of arrays of shape (...) with mean, median, ci_lo and ci_hi.
+    """
+    draws = np.asarray(draws, dtype=np.float64)
+    flat = draws.reshape((-1,) + draws.shape[2:])
+    alpha = (1.0 - confidence_level) / 2.0
+    ci_lo, median, ci_hi = np.nanquantile(flat, [alpha, 0.5, 1.0 - alpha], axis=0)
+    return {
+        "mean": np.nanmean(flat, axis=0),
+        "median": median,
+        "ci_lo": ci_lo,
+        "ci_hi": ci_hi,
+    }
+
+
+def fit_statistics(expected, actual):
+    """R², MAPE and wMAPE of an expected outcome series against the observed one"""
+    expected = np.asarray(expected, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    residuals = actual - expected
+    ss_tot = np.sum((actual - actual.mean()) ** 2)
+    nonzero = actual != 0
+    return {
+        "r_squared": float(1.0 - np.sum(residuals ** 2) / ss_tot) if ss_tot > 0 else None,
+        "mape": float(np.mean(np.abs(residuals[nonzero] / actual[nonzero]))) if nonzero.any() else None,
+        "wmape": float(np.sum(np.abs(residuals)) / np.sum(np.abs(actual))) if np.any(actual) else None,
+    }
+
+
+def _per_channel(channels, summaries):
+    """{metric: {stat: array(channels)}} -> {channel: {metric: {stat: float}}}"""
+    result = {channel: {} for channel in channels}
+    for metric, stats in summaries.items():
+        for i, channel in enumerate(channels):
+            result[channel][metric] = {stat: float(values[i]) for stat, values in stats.items()}
+    return result
+
+
+def compute_model_metrics(mmm, confidence_level=DEFAULT_CONFIDENCE_LEVEL):
+    """Compute per-channel and fit metrics of a sampled Meridian model"""
+    from meridian.analysis import analyzer
+
+    mmm_analyzer = analyzer.Analyzer(mmm)
+    input_data = mmm.input_data
+
+    spend = mmm_analyzer.get_aggregated_spend()
+    channels = [str(c) for c in spend.coords["channel"].values]
+    spend = np.asarray(spend.values, dtype=np.float64)
+
+    # (chains, draws, channels) on the outcome scale (revenue when available)
+    incremental = np.asarray(mmm_analyzer.incremental_outcome(include_non_paid_channels=False))
+    # (chains, draws, times), summed over geos
+    expected = np.asarray(mmm_analyzer.expected_outcome(aggregate_times=False))
+    mroi = np.asarray(mmm_analyzer.marginal_roi())
+
+    if input_data.revenue_per_kpi is not None:
+        incremental_kpi = np.asarray(
+            mmm_analyzer.incremental_outcome(use_kpi=True, include_non_paid_channels=False)
+        )
+        actual = (input_data.kpi * input_data.revenue_per_kpi).sum("geo").values
+    else:
+        incremental_kpi = incremental
+        actual = input_data.kpi.sum("geo").values
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        summaries = {
+            "roi": summarize_draws(incremental / spend, confidence_level),
+            "mroi": summarize_draws(mroi, confidence_level),
+            "cpik": summarize_draws(spend / incremental_kpi, confidence_level),
+            "incremental_outcome": summarize_draws(incremental, confidence_level),
+            "contribution_share": summarize_draws(
+                incremental / expected.sum(axis=-1, keepdims=True), confidence_level
+            ),
+        }
+
+    per_channel = _per_channel(channels, summaries)
+    for i, channel in enumerate(channels):
+        per_channel[channel]["spend"] = float(spend[i])
+
+    return {
+        "version": METRICS_VERSION,
+        "confidence_level": confidence_level,
+        "outcome": "revenue" if input_data.revenue_per_kpi is not None else "kpi",
+        "n_draws": int(incremental.shape[0] * incremental.shape[1]),
+        "fit": fit_statistics(expected.mean(axis=(0, 1)), actual),
+        "channels": per_channel,
+    }
+
+
+def save_metrics(metrics, model_dir):
+    metrics_path = os.path.join(model_dir, METRICS_FILE)
+    tmp_path = metrics_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(metrics, f, indent=2)
+    os.replace(tmp_path, metrics_path)
+    return metrics_path
+
+
+def load_metrics(model_dir):
+    """Cached metrics of a model folder, or None if absent or from an older format"""
+    metrics_path = os.path.join(model_dir, METRICS_FILE)
+    if not os.path.exists(metrics_path):
+        return None
+    with open(metrics_path, "r") as f:
+        metrics = json.load(f)
+    if metrics.get("version") != METRICS_VERSION:
+        return None
+    return metrics
+
+
+def compare_metrics(reference, other, metrics=("roi", "contribution_share", "incremental_outcome"),
+                    stats=("mean", "ci_lo", "ci_hi")):
+    """
+    Per-channel differences between two metrics dicts of the same model (e.g. full vs
+    thinned posterior): {"channels": {channel: {metric: {stat: {"reference", "value",
+    "abs_error", "rel_error"}}}}, "max_rel_error": {metric: largest rel_error}}
+    """
+    channels = {}
+    max_rel_error = {metric: 0.0 for metric in metrics}
+    for channel, values in reference["channels"].items():
+        channels[channel] = {}
+        for metric in metrics:
+            channels[channel][metric] = {}
+            for stat in stats:
+                ref = values[metric][stat]
+                value = other["channels"][channel][metric][stat]
+                abs_error = abs(value - ref)
+                rel_error = abs_error / abs(ref) if ref else (0.0 if abs_error == 0 else float("inf"))
+                channels[channel][metric][stat] = {
+                    "reference": ref, "value": value, "abs_error": abs_error, "rel_error": rel_error,
+                }
+                max_rel_error[metric] = max(max_rel_error[metric], rel_error)
+    return {"channels": channels, "max_rel_error": max_rel_error}
+
+
+def roi_by_channel(metrics):
+    """{channel: posterior mean ROI}, the shape the custom report expects"""
+    return {channel: values["roi"]["mean"] for channel, values in metrics["channels"].items()}
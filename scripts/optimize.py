@@ -0,0 +1,257 @@
+"""
+Budget allocation across paid channels from posterior response curves.
+
+Each channel's response curve (its incremental outcome as a function of its
+total spend, with the historical flighting scaled up or down) is evaluated
+for every kept posterior draw on a multiplier grid, in batched passes of the
+scenario engine (scenarios.py). Channels do not interact in the model, so
+the outcome of an allocation is the sum of its channel curves: the mix that
+maximizes the posterior mean is found exactly on a discretized budget by
+dynamic programming, which also handles S-shaped curves where a greedy
+marginal-ROI search stalls. The chosen mix is then scored against every
+draw for credible intervals. Results are saved as optimization.json in the
+model folder.
+"""
+
+import os
+import json
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from metrics import summarize_draws, DEFAULT_CONFIDENCE_LEVEL
+from scenarios import get_engine, thin_engine, INTERACTIVE_MAX_DRAWS
+from response_curves import historical_spend, response_curve_draws
+
+OPTIMIZATION_FILE = "optimization.json"
+DEFAULT_BOUNDS = (0.5, 2.0)  # Channel spend bounds, as multiples of historical spend
+DEFAULT_GRID_POINTS = 101
+DEFAULT_BUDGET_STEPS = 500
+
+
+def curve_values(curves, spend):
+    """Per-draw outcome of each channel at the given spend (channels,), linear on the grid: (draws, channels)"""
+    multipliers = curves["multipliers"]
+    hist = curves["spend"][-1] / multipliers[-1]
+    position = np.divide(spend, hist, out=np.zeros(len(hist)), where=hist > 0) / multipliers[1]
+    position = np.clip(position, 0, len(multipliers) - 1)
+    lower = np.minimum(np.floor(position).astype(int), len(multipliers) - 2)
+    frac = position - lower
+    channels = np.arange(len(hist))
+    draws = curves["draws"]
+    return (1 - frac) * draws[lower, :, channels].T + frac * draws[lower + 1, :, channels].T
+
+
+def allocate(mean_values, capacity):
+    """
+    Exact best allocation of `steps` budget units across channels.
+    mean_values (channels, steps + 1): expected outcome of giving k units to a channel;
+    capacity (channels,): most units a channel can take. Returns units per channel.
+    """
+    n_channels, n_units = mean_values.shape
+    steps = n_units - 1
+    k = np.arange(n_units)
+    # remaining[b, k] = b − k: budget left for previous channels when k units go to this one
+    remaining = k[:, None] - k[None, :]
+    valid_remaining = remaining >= 0
+    remaining = np.where(valid_remaining, remaining, 0)
+
+    best = np.full(n_units, -np.inf)
+    best[0] = 0.0
+    choices = np.zeros((n_channels, n_units), dtype=np.int32)
+    for m in range(n_channels):
+        values = np.where(k <= capacity[m], mean_values[m], -np.inf)
+        candidates = np.where(valid_remaining, best[remaining] + values[None, :], -np.inf)
+        choices[m] = np.argmax(candidates, axis=1)
+        best = candidates[k, choices[m]]
+    if not np.isfinite(best[steps]):
+        raise ValueError("No allocation satisfies the budget and channel bounds (widen --bounds or change --budget)")
+
+    units = np.zeros(n_channels, dtype=int)
+    budget_left = steps
+    for m in range(n_channels - 1, -1, -1):
+        units[m] = choices[m, budget_left]
+        budget_left -= units[m]
+    return units
+
+
+def optimize_budget(engine, budget=None, bounds=DEFAULT_BOUNDS, channel_bounds=None,
+                    steps=DEFAULT_BUDGET_STEPS, grid_points=DEFAULT_GRID_POINTS,
+                    confidence_level=DEFAULT_CONFIDENCE_LEVEL, curves=None):
+    """
+    Spend allocation maximizing the posterior mean outcome for a total budget
+    (default: historical total). Channel spend stays within bounds × historical
+    spend; channel_bounds {channel: (lo, hi)} overrides them per channel.
+    """
+    channels = list(engine["channels"])
+    hist = historical_spend(engine)
+    budget = float(hist.sum() if budget is None else budget)
+
+    factors = np.tile(np.asarray(bounds, dtype=np.float64), (len(channels), 1))
+    for channel, channel_range in (channel_bounds or {}).items():
+        if channel not in channels:
+            raise KeyError(f"Unknown channel '{channel}' (channels: {', '.join(channels)})")
+        factors[channels.index(channel)] = channel_range
+
+    if curves is None:
+        curves = response_curve_draws(engine, max_multiplier=float(factors[:, 1].max()), grid_points=grid_points)
+    # Channels without historical spend cannot be scaled: kept at zero
+    lower = np.where(hist > 0, factors[:, 0] * hist, 0.0)
+    upper = np.where(hist > 0, np.minimum(factors[:, 1] * hist, curves["spend"][-1]), 0.0)
+    # Every channel starts at its lower bound; the rest of the budget is split in units
+    remaining = budget - lower.sum()
+    if remaining < -1e-9 * budget or upper.sum() < budget * (1 - 1e-9):
+        raise ValueError(f"No allocation of {budget:,.0f} satisfies the channel bounds "
+                         f"({lower.sum():,.0f} to {upper.sum():,.0f}; widen --bounds or change --budget)")
+    unit = max(remaining, 0.0) / steps
+    if unit > 0:
+        capacity = np.floor((upper - lower) / unit + 1e-6).astype(int)
+    else:
+        # Budget exactly at the lower bounds: the (empty) units go anywhere
+        capacity = np.full(len(channels), steps)
+    # Expected outcome of lower bound + k units per channel, interpolated on the curve grid
+    mean_curve = curves["draws"].mean(axis=1)  # (points, channels)
+    units = np.arange(steps + 1) * unit
+    mean_values = np.stack([
+        np.interp(lower[m] + units, curves["spend"][:, m], mean_curve[:, m]) for m in range(len(channels))
+    ])
+
+    optimal_spend = lower + allocate(mean_values, capacity) * unit
+    optimal_draws = curve_values(curves, optimal_spend)  # (draws, channels)
+    historical_draws = curve_values(curves, hist)
+
+    def summary(draws):
+        return {stat: np.atleast_1d(values).tolist() for stat, values in summarize_draws(draws[None], confidence_level).items()}
+
+    per_channel = {}
+    optimal_summary = summary(optimal_draws)
+    historical_summary = summary(historical_draws)
+    for m, channel in enumerate(channels):
+        per_channel[channel] = {
+            "historical_spend": float(hist[m]),
+            "optimal_spend": float(optimal_spend[m]),
+            "change_pct": float((optimal_spend[m] / hist[m] - 1.0) * 100.0) if hist[m] > 0 else None,
+            "historical_outcome": {stat: values[m] for stat, values in historical_summary.items()},
+            "optimal_outcome": {stat: values[m] for stat, values in optimal_summary.items()},
+            "optimal_roi": float(optimal_summary["mean"][m] / optimal_spend[m]) if optimal_spend[m] > 0 else None,
+        }
+
+    def total(draws):
+        return {stat: float(values[0]) for stat, values in summary(draws.sum(axis=1)[:, None]).items()}
+
+    return {
+        "created_at": datetime.now().isoformat(),
+        "budget": budget,
+        "historical_budget": float(hist.sum()),
+        "bounds": {channel: [float(lo), float(hi)] for channel, (lo, hi) in zip(channels, factors)},
+        "n_draws": int(curves["draws"].shape[1]),
+        "confidence_level": confidence_level,
+        "channels": per_channel,
+        "historical_outcome": total(historical_draws),
+        "optimal_outcome": total(optimal_draws),
+        "incremental_vs_historical": total(optimal_draws - historical_draws),
+    }
+
+
+def save_optimization(result, model_dir):
+    path = os.path.join(model_dir, OPTIMIZATION_FILE)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    return path
+
+
+def print_optimization(result):
+    print(f"💰 Budget: {result['budget']:,.0f} (historical: {result['historical_budget']:,.0f}), "
+          f"{result['n_draws']} posterior draws\n")
+    print(f"   {'channel':<24} {'historical':>12} {'optimal':>12} {'change':>8} {'outcome (mean)':>15} {'ROI':>6}")
+    for channel, values in result["channels"].items():
+        change = f"{values['change_pct']:+.0f}%" if values["change_pct"] is not None else "n/a"
+        roi = f"{values['optimal_roi']:.2f}" if values["optimal_roi"] is not None else "n/a"
+        print(f"   {channel:<24} {values['historical_spend']:>12,.0f} {values['optimal_spend']:>12,.0f} "
+              f"{change:>8} {values['optimal_outcome']['mean']:>15,.0f} {roi:>6}")
+    level = int(result["confidence_level"] * 100)
+    hist, opt, inc = result["historical_outcome"], result["optimal_outcome"], result["incremental_vs_historical"]
+    print(f"\n📈 Paid media outcome: {hist['mean']:,.0f} → {opt['mean']:,.0f} "
+          f"({inc['mean']:+,.0f}, {level}% CI [{inc['ci_lo']:+,.0f}, {inc['ci_hi']:+,.0f}])")
+
+
+def _parse_channel_bounds(text):
+    """'TikTok=0.5:1.5' → ('TikTok', (0.5, 1.5))"""
+    channel, _, values = text.rpartition("=")
+    lo, _, hi = values.partition(":")
+    if not channel or not hi:
+        raise argparse.ArgumentTypeError(f"Expected CHANNEL=LO:HI, got '{text}'")
+    return channel, (float(lo), float(hi))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Optimize the budget allocation across paid channels of a saved model",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Reallocate the historical budget on the most recent model (each channel 0.5x-2x)
+  python scripts/optimize.py
+
+  # +10% budget, TikTok between 0.8x and 3x of its historical spend
+  python scripts/optimize.py --budget-change 10 --channel-bounds TikTok=0.8:3
+
+  # Fixed budget on a given model, finer budget grid
+  python scripts/optimize.py --model 2025-11-21_11-24-58 --budget 2500000 --steps 2000
+        """
+    )
+    parser.add_argument("--model", type=str, default=None, help="Model folder name. Default: most recent model")
+    parser.add_argument("--budget", type=float, default=None, help="Total budget. Default: historical total spend")
+    parser.add_argument("--budget-change", type=float, default=None, metavar="PCT",
+                        help="Total budget as a change of the historical total, in percent")
+    parser.add_argument("--bounds", type=float, nargs=2, default=list(DEFAULT_BOUNDS), metavar=("LO", "HI"),
+                        help=f"Channel spend bounds as multiples of historical spend. Default: {DEFAULT_BOUNDS[0]} {DEFAULT_BOUNDS[1]}")
+    parser.add_argument("--channel-bounds", action="append", default=[], type=_parse_channel_bounds,
+                        metavar="CHANNEL=LO:HI", help="Bounds of one channel (repeatable)")
+    parser.add_argument("--steps", type=int, default=DEFAULT_BUDGET_STEPS,
+                        help=f"Budget units of the allocation grid. Default: {DEFAULT_BUDGET_STEPS}")
+    parser.add_argument("--grid-points", type=int, default=DEFAULT_GRID_POINTS,
+                        help=f"Points of each response curve. Default: {DEFAULT_GRID_POINTS}")
+    parser.add_argument("--max-draws", type=int, default=INTERACTIVE_MAX_DRAWS,
+                        help=f"Posterior draws used. Default: {INTERACTIVE_MAX_DRAWS}")
+    parser.add_argument("--no-save", action="store_true", help=f"Do not write {OPTIMIZATION_FILE}")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from registry import query_models
+
+    args = parse_args()
+    models = query_models(with_model=True)
+    if args.model:
+        models = [m for m in models if m["folder"] == args.model]
+    if not models:
+        print("❌ No saved model found")
+        exit(1)
+    model_info = models[0]
+    print(f"📅 Model: {model_info['folder']}")
+
+    start = time.perf_counter()
+    engine = thin_engine(get_engine(model_info["path"]), args.max_draws)
+    budget = args.budget
+    if budget is None and args.budget_change is not None:
+        budget = historical_spend(engine).sum() * (1.0 + args.budget_change / 100.0)
+
+    try:
+        result = optimize_budget(
+            engine,
+            budget=budget,
+            bounds=tuple(args.bounds),
+            channel_bounds=dict(args.channel_bounds),
+            steps=args.steps,
+            grid_points=args.grid_points,
+        )
+    except (ValueError, KeyError) as e:
+        print(f"❌ {e}")
+        exit(1)
+    print_optimization(result)
+    print(f"\n⏱️  Optimized in {time.perf_counter() - start:.2f}s")
+    if not args.no_save:
+        print(f"💾 {save_optimization(result, model_info['path'])}")
@@ -0,0 +1,181 @@
+"""
+Stage-level profiling of the training pipeline.
+
+    profiler = StageProfiler()
+    with profiler.stage("sample_posterior"):
+        ...
+    profiler.save(output_dir)   # -> profile.json
+
+Each stage records wall time, process CPU time (all threads), RSS at start
+and end, peak RSS (polled in a background thread while the stage runs) and,
+when TensorFlow is already loaded, the allocator peak of every device that
+reports one (GPUs). Stages listed in `trace_stages` can additionally be
+captured with the TensorFlow profiler (TensorBoard profile + Chrome trace).
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - psutil is in requirements.txt
+    psutil = None
+
+PROFILE_FILE = "profile.json"
+TRACE_DIR = "profile_trace"
+RSS_POLL_INTERVAL = 0.05
+MB = 1024 * 1024
+
+
+def _max_rss():
+    """Process high-water mark in bytes (ru_maxrss is KB on Linux, bytes on macOS)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _current_rss():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    # No psutil: fall back to the high-water mark
+    return _max_rss()
+
+
+class _RssSampler:
+    """Polls the process RSS in a daemon thread and keeps the maximum"""
+
+    def __init__(self, interval=RSS_POLL_INTERVAL):
+        self.interval = interval
+        self.peak = _current_rss()
+        self._max_rss_start = _max_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _current_rss())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+        # A spike shorter than the poll interval still shows up if it raised the high-water mark
+        max_rss_end = _max_rss()
+        if max_rss_end > self._max_rss_start:
+            self.peak = max(self.peak, max_rss_end)
+
+
+def _tf_devices():
+    """Logical devices, only if TensorFlow has already been imported by the pipeline"""
+    tf = sys.modules.get("tensorflow")
+    if tf is None:
+        return None, []
+    try:
+        return tf, [device.name for device in tf.config.list_logical_devices()]
+    except Exception:
+        return tf, []
+
+
+def _tf_reset_peaks(tf, devices):
+    for device in devices:
+        try:
+            tf.config.experimental.reset_memory_stats(device)
+        except (ValueError, AttributeError):
+            # CPU devices do not expose allocator stats
+            pass
+
+
+def _tf_memory(tf, devices):
+    stats = {}
+    for device in devices:
+        try:
+            info = tf.config.experimental.get_memory_info(device)
+        except (ValueError, AttributeError):
+            continue
+        stats[device] = {
+            "current_mb": round(info["current"] / MB, 1),
+            "peak_mb": round(info["peak"] / MB, 1),
+        }
+    return stats
+
+
+class StageProfiler:
+    """Collects per-stage timing and memory records for one pipeline run"""
+
+    def __init__(self, trace_dir=None, trace_stages=("sample_posterior",)):
+        self.trace_dir = trace_dir
+        self.trace_stages = set(trace_stages or ())
+        self.stages = []
+        self.started_at = datetime.now().isoformat()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+    @contextmanager
+    def stage(self, name):
+        tf, devices = _tf_devices()
+        if tf is not None:
+            _tf_reset_peaks(tf, devices)
+
+        tracing = False
+        if self.trace_dir and name in self.trace_stages and tf is not None:
+            os.makedirs(self.trace_dir, exist_ok=True)
+            tf.profiler.experimental.start(self.trace_dir)
+            tracing = True
+
+        record = {"name": name, "rss_start_mb": round(_current_rss() / MB, 1)}
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            with _RssSampler() as sampler:
+                yield record
+        finally:
+            record["wall_s"] = round(time.perf_counter() - wall, 3)
+            record["cpu_s"] = round(time.process_time() - cpu, 3)
+            record["rss_end_mb"] = round(_current_rss() / MB, 1)
+            record["peak_rss_mb"] = round(sampler.peak / MB, 1)
+            if tracing:
+                tf.profiler.experimental.stop()
+                record["trace_dir"] = self.trace_dir
+            # TensorFlow may have been imported during the stage itself
+            tf, devices = _tf_devices()
+            if tf is not None:
+                tf_memory = _tf_memory(tf, devices)
+                if tf_memory:
+                    record["tf_memory"] = tf_memory
+            self.stages.append(record)
+
+    def summary(self):
+        return {
+            "started_at": self.started_at,
+            "total_wall_s": round(time.perf_counter() - self._start_wall, 3),
+            "total_cpu_s": round(time.process_time() - self._start_cpu, 3),
+            "peak_rss_mb": max((s["peak_rss_mb"] for s in self.stages), default=None),
+            "cpu_count": os.cpu_count(),
+            "stages": self.stages,
+        }
+
+    def save(self, output_dir):
+        """Write profile.json into output_dir and return its path"""
+        profile_path = os.path.join(output_dir, PROFILE_FILE)
+        with open(profile_path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        return profile_path
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"\n⏱️  Stage profile (total {summary['total_wall_s']:.1f}s wall, {summary['total_cpu_s']:.1f}s CPU)")
+        print(f"   {'stage':<20} {'wall (s)':>10} {'cpu (s)':>10} {'peak RSS (MB)':>14}")
+        for s in self.stages:
+            print(f"   {s['name']:<20} {s['wall_s']:>10.2f} {s['cpu_s']:>10.2f} {s['peak_rss_mb']:>14.1f}")
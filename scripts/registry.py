@@ -0,0 +1,265 @@
+"""
+SQLite index of trained models (outputs/registry.sqlite).
+
+Every saved model folder gets one row with the fields we filter on (data
+hash, config file, dataset, date range, fit metrics) plus its full metadata
+as JSON, so listing and cache lookups are a single indexed query instead of
+an os.listdir + metadata.yaml parse per folder. Rows are written in one
+transaction by save_model_and_metadata; `--rebuild` re-indexes existing
+folders (e.g. models trained before the registry existed, or copied in).
+"""
+
+import os
+import json
+import sqlite3
+import argparse
+from pathlib import Path
+
+import yaml
+
+# Get POC directory (parent of scripts directory)
+SCRIPT_DIR = Path(__file__).parent.absolute()
+POC_DIR = SCRIPT_DIR.parent.absolute()
+
+MODELS_DIR = os.path.join(POC_DIR, "outputs", "models")
+REGISTRY_FILE = os.path.join(POC_DIR, "outputs", "registry.sqlite")
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS models (
+    folder       TEXT PRIMARY KEY,
+    data_hash    TEXT,
+    config_file  TEXT,
+    dataset_name TEXT,
+    created_at   TEXT,
+    date_start   TEXT,
+    date_end     TEXT,
+    r_squared    REAL,
+    mape         REAL,
+    has_model    INTEGER NOT NULL DEFAULT 0,
+    metadata     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_models_data_hash ON models (data_hash, folder);
+CREATE INDEX IF NOT EXISTS idx_models_config ON models (config_file, dataset_name);
+CREATE INDEX IF NOT EXISTS idx_models_dates ON models (date_start, date_end);
+CREATE INDEX IF NOT EXISTS idx_models_r_squared ON models (r_squared);
+"""
+
+
+def connect(registry_file=REGISTRY_FILE):
+    """Open the registry, creating the schema on first use"""
+    os.makedirs(os.path.dirname(registry_file), exist_ok=True)
+    # Generous timeout: parallel sweep workers register models concurrently
+    conn = sqlite3.connect(registry_file, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+    if conn.execute("PRAGMA user_version").fetchone()[0] < 2:
+        # Version 1 stored date ranges as "YYYY-MM-DD HH:MM:SS": keep the day only
+        with conn:
+            conn.execute("UPDATE models SET date_start = substr(date_start, 1, 10), date_end = substr(date_end, 1, 10)")
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return conn
+
+
+def _day(value):
+    """YYYY-MM-DD of a date, timestamp or date string (None stays None)"""
+    return None if value is None else str(value)[:10]
+
+
+def _row_values(folder, metadata, metrics=None, has_model=True):
+    metadata = metadata or {}
+    date_range = metadata.get("date_range") or {}
+    fit = (metrics or {}).get("fit") or {}
+    return {
+        "folder": folder,
+        "data_hash": metadata.get("data_hash"),
+        "config_file": metadata.get("config_file"),
+        "dataset_name": metadata.get("dataset_name"),
+        "created_at": str(metadata.get("created_at", folder)),
+        # Days only, so --from/--to compare whole days ("2018-01-07 00:00:00" > "2018-01-07")
+        "date_start": _day(date_range.get("start")),
+        "date_end": _day(date_range.get("end")),
+        "r_squared": fit.get("r_squared"),
+        "mape": fit.get("mape"),
+        "has_model": int(bool(has_model)),
+        "metadata": json.dumps(metadata, default=str),
+    }
+
+
+def _upsert(conn, values):
+    columns = ", ".join(values)
+    placeholders = ", ".join(f":{name}" for name in values)
+    conn.execute(f"INSERT OR REPLACE INTO models ({columns}) VALUES ({placeholders})", values)
+
+
+def register_model(model_dir, metadata, metrics=None, has_model=True, registry_file=REGISTRY_FILE):
+    """Insert or replace the registry row of a model folder (single transaction)"""
+    conn = connect(registry_file)
+    try:
+        with conn:
+            _upsert(conn, _row_values(os.path.basename(os.path.normpath(model_dir)), metadata, metrics, has_model))
+    finally:
+        conn.close()
+
+
+def record_metrics(model_dir, metrics, registry_file=REGISTRY_FILE):
+    """Attach fit metrics to an already registered model"""
+    fit = metrics.get("fit") or {}
+    conn = connect(registry_file)
+    try:
+        with conn:
+            conn.execute(
+                "UPDATE models SET r_squared = ?, mape = ? WHERE folder = ?",
+                (fit.get("r_squared"), fit.get("mape"), os.path.basename(os.path.normpath(model_dir))),
+            )
+    finally:
+        conn.close()
+
+
+def _read_folder(model_dir):
+    """(metadata, metrics, has_model) read from the files of a model folder"""
+    from artifact import has_saved_model
+    from metrics import load_metrics
+
+    metadata_path = os.path.join(model_dir, "metadata.yaml")
+    if os.path.exists(metadata_path):
+        with open(metadata_path, "r") as f:
+            # Use FullLoader to support Python types like tuples
+            metadata = yaml.load(f, Loader=yaml.FullLoader) or {}
+    else:
+        # If no metadata, use the folder name as creation date
+        metadata = {"created_at": os.path.basename(model_dir)}
+    return metadata, load_metrics(model_dir), has_saved_model(model_dir)
+
+
+def rebuild_registry(models_dir=MODELS_DIR, registry_file=REGISTRY_FILE):
+    """Re-index every folder of models_dir, dropping rows of deleted folders"""
+    folders = []
+    if os.path.exists(models_dir):
+        folders = [f for f in os.listdir(models_dir) if os.path.isdir(os.path.join(models_dir, f))]
+
+    rows = [_row_values(folder, *_read_folder(os.path.join(models_dir, folder))) for folder in folders]
+    conn = connect(registry_file)
+    try:
+        with conn:
+            conn.execute("DELETE FROM models")
+            for values in rows:
+                _upsert(conn, values)
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def query_models(data_hash=None, config_file=None, dataset_name=None, date_from=None, date_to=None,
+                 min_r_squared=None, with_model=None, since=None, limit=None,
+                 models_dir=MODELS_DIR, registry_file=REGISTRY_FILE):
+    """
+    Models matching the given filters, most recent folder first, as
+    [{"folder", "path", "metadata"}, ...] (the shape list_saved_models returns).
+    date_from/date_to keep models whose training range covers that span;
+    since (YYYY-MM-DD) keeps models created on or after that day.
+    The registry is built from the folders on first use.
+    """
+    if not os.path.exists(registry_file):
+        rebuild_registry(models_dir, registry_file)
+
+    clauses = []
+    params = []
+    for column, value in (("data_hash", data_hash), ("config_file", config_file), ("dataset_name", dataset_name)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if date_from is not None:
+        clauses.append("date_start <= ?")
+        params.append(_day(date_from))
+    if date_to is not None:
+        clauses.append("date_end >= ?")
+        params.append(_day(date_to))
+    if min_r_squared is not None:
+        clauses.append("r_squared >= ?")
+        params.append(min_r_squared)
+    if with_model is not None:
+        clauses.append("has_model = ?")
+        params.append(int(bool(with_model)))
+    if since is not None:
+        # Folder names start with their creation date (YYYY-MM-DD_HH-MM-SS)
+        clauses.append("folder >= ?")
+        params.append(str(since))
+
+    sql = "SELECT folder, metadata FROM models"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY folder DESC"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+
+    conn = connect(registry_file)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+    return [
+        {
+            "folder": row["folder"],
+            "path": os.path.join(models_dir, row["folder"]),
+            "metadata": json.loads(row["metadata"]),
+        }
+        for row in rows
+    ]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Query or rebuild the model registry (outputs/registry.sqlite)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Re-index all folders in outputs/models/
+  python scripts/registry.py --rebuild
+
+  # Models trained on a given data hash
+  python scripts/registry.py --hash 9e1cf6c5bc1ebb68
+
+  # Models of a config with R² of at least 0.9
+  python scripts/registry.py --config configs/config_v1.yaml --min-r2 0.9
+        """
+    )
+    parser.add_argument("--rebuild", action="store_true", help="Re-index every model folder")
+    parser.add_argument("--hash", type=str, default=None, help="Filter by data hash")
+    parser.add_argument("--config", type=str, default=None, help="Filter by config file (as recorded in metadata)")
+    parser.add_argument("--dataset", type=str, default=None, help="Filter by dataset key")
+    parser.add_argument("--from", dest="date_from", type=str, default=None,
+                        help="Training range must start on or before this date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", type=str, default=None,
+                        help="Training range must end on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--min-r2", type=float, default=None, help="Minimum R² (from metrics.json)")
+    parser.add_argument("--limit", type=int, default=None, help="Maximum number of models to show")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.rebuild:
+        count = rebuild_registry()
+        print(f"✓ Registry rebuilt: {count} model folder(s) indexed in {REGISTRY_FILE}")
+        exit(0)
+
+    models = query_models(
+        data_hash=args.hash,
+        config_file=args.config,
+        dataset_name=args.dataset,
+        date_from=args.date_from,
+        date_to=args.date_to,
+        min_r_squared=args.min_r2,
+        limit=args.limit,
+    )
+    if not models:
+        print("❌ No model matches these filters")
+        exit(0)
+    for model_info in models:
+        meta = model_info["metadata"]
+        date_range = meta.get("date_range") or {}
+        print(f"📅 {model_info['folder']}  hash={meta.get('data_hash', 'N/A')}  "
+              f"config={meta.get('config_file', 'N/A')}  "
+              f"period={str(date_range.get('start', 'N/A'))[:10]} → {str(date_range.get('end', 'N/A'))[:10]}")
@@ -0,0 +1,201 @@
+"""
+Self-contained offline bundles of the custom report.
+
+`bundle_offline(html)` turns a generated custom_report.html into a page that
+renders without network access:
+  - the Vega / Vega-Lite / Vega-Embed CDN scripts are replaced by the
+    vendored copies in assets/vendor/, inlined once;
+  - Google Fonts links are dropped (the CSS falls back to system fonts);
+  - every chart spec is emitted as minified JSON instead of an escaped
+    JSON.parse string, and the inline datasets (renamed by content hash
+    "data-<md5>" of their final values, so identical data has identical
+    names and different data never shares one) are stored once for the
+    whole page and re-attached to each spec at render time.
+`write_gzip` writes a precompressed copy for static servers.
+
+The vendored files are fetched once on a connected machine with
+    python scripts/report_bundle.py --fetch
+and copied along with the repository to the air-gapped side.
+"""
+
+import os
+import re
+import copy
+import gzip
+import json
+import hashlib
+import argparse
+import urllib.request
+from pathlib import Path
+
+from report_parser import parse_report_string
+
+# Get POC directory (parent of scripts directory)
+SCRIPT_DIR = Path(__file__).parent.absolute()
+POC_DIR = SCRIPT_DIR.parent.absolute()
+
+VENDOR_DIR = os.path.join(POC_DIR, "assets", "vendor")
+# Pinned builds, in load order (vega-lite and vega-embed need vega)
+VENDOR_ASSETS = {
+    "vega.min.js": "https://cdn.jsdelivr.net/npm/vega@5.30.0/build/vega.min.js",
+    "vega-lite.min.js": "https://cdn.jsdelivr.net/npm/vega-lite@5.21.0/build/vega-lite.min.js",
+    "vega-embed.min.js": "https://cdn.jsdelivr.net/npm/vega-embed@6.26.0/build/vega-embed.min.js",
+}
+
+_CDN_SCRIPT_RE = re.compile(
+    r'[ \t]*<script src="https://[^"]*/(?:vega|vega_lite|vega-lite|vega_embed|vega-embed)[^"]*"[^>]*></script>\n?'
+)
+_SCRIPT_CLOSE_RE = re.compile(r"</(script)", re.IGNORECASE)
+_FONT_LINK_RE = re.compile(r'[ \t]*<link [^>]*https://fonts\.(?:googleapis|gstatic)\.com[^>]*>\n?')
+
+_RUNTIME = (
+    "const __mmmDatasets = {datasets};\n"
+    "function __mmmSpec(spec, names) {{\n"
+    "  spec.datasets = {{}};\n"
+    "  names.forEach(function (name) {{ spec.datasets[name] = __mmmDatasets[name]; }});\n"
+    "  return spec;\n"
+    "}}\n"
+)
+
+
+def _script_safe(text):
+    """Text that cannot close the surrounding <script> element ("<\\/" is "</" in JS strings and regexes)"""
+    return _SCRIPT_CLOSE_RE.sub(r"<\\/\1", text)
+
+
+def _minified(value):
+    return _script_safe(json.dumps(value, separators=(",", ":"), ensure_ascii=False))
+
+
+def dataset_name(values):
+    """Content-hash name of an inline dataset (the "data-<md5>" scheme of Altair)"""
+    return "data-" + hashlib.md5(json.dumps(values, sort_keys=True).encode()).hexdigest()
+
+
+def _rename_datasets(node, names):
+    """Point the {"data": {"name": ...}} references of a spec at their new dataset names, in place"""
+    if isinstance(node, dict):
+        data = node.get("data")
+        if isinstance(data, dict) and data.get("name") in names:
+            node["data"] = {**data, "name": names[data["name"]]}
+        for value in node.values():
+            _rename_datasets(value, names)
+    elif isinstance(node, list):
+        for value in node:
+            _rename_datasets(value, names)
+
+
+def load_vendor_scripts(vendor_dir=VENDOR_DIR):
+    """Contents of the vendored Vega scripts, in load order"""
+    missing = [name for name in VENDOR_ASSETS if not os.path.exists(os.path.join(vendor_dir, name))]
+    if missing:
+        raise FileNotFoundError(
+            f"Vendored Vega assets missing in {vendor_dir}: {', '.join(missing)} "
+            f"(run 'python scripts/report_bundle.py --fetch' on a connected machine)"
+        )
+    scripts = []
+    for name in VENDOR_ASSETS:
+        with open(os.path.join(vendor_dir, name), "r", encoding="utf-8") as f:
+            scripts.append(f.read())
+    return scripts
+
+
+def fetch_vendor_assets(vendor_dir=VENDOR_DIR):
+    """Download the pinned Vega builds into vendor_dir"""
+    os.makedirs(vendor_dir, exist_ok=True)
+    for name, url in VENDOR_ASSETS.items():
+        with urllib.request.urlopen(url, timeout=60) as response:
+            content = response.read()
+        with open(os.path.join(vendor_dir, name), "wb") as f:
+            f.write(content)
+        print(f"✓ {name} ({len(content) / 1024:.0f} KB) from {url}")
+
+
+def bundle_offline(html, vendor_dir=VENDOR_DIR):
+    """Return a self-contained version of a custom report page (see module docstring)"""
+    if "__mmmSpec(" in html:
+        # Already bundled
+        return html
+    report = parse_report_string(html)
+
+    # Specs: JSON.parse("<escaped>") -> __mmmSpec(<minified spec without datasets>, [names])
+    datasets = {}
+    pieces = []
+    pos = 0
+    for chart in sorted(report["charts"].values(), key=lambda c: c["start"]):
+        if chart["spec"] is None:
+            continue
+        call = f'JSON.parse("{chart["spec_literal"]}")'
+        call_start = html.find(call, chart["start"], chart["end"])
+        if call_start == -1:
+            continue
+        spec = dict(chart["spec"])
+        chart_datasets = spec.pop("datasets", None) or {}
+        # Names are recomputed from the values: a spec edited after rendering (baseline
+        # filtered out) keeps its old name, which would collide with the unedited data
+        names = {name: dataset_name(values) for name, values in chart_datasets.items()}
+        for name, values in chart_datasets.items():
+            datasets[names[name]] = values
+        if any(old != new for old, new in names.items()):
+            spec = copy.deepcopy(spec)
+            _rename_datasets(spec, names)
+        pieces.append(html[pos:call_start])
+        pieces.append(f"__mmmSpec({_minified(spec)}, {json.dumps(list(dict.fromkeys(names.values())))})")
+        pos = call_start + len(call)
+    pieces.append(html[pos:])
+    html = "".join(pieces)
+
+    # Libraries (inlined once, where the first CDN tag was) + shared datasets
+    vendor = "".join(f"<script>{_script_safe(script)}</script>\n" for script in load_vendor_scripts(vendor_dir))
+    runtime = f"<script>\n{_RUNTIME.format(datasets=_minified(datasets))}</script>\n"
+    first = _CDN_SCRIPT_RE.search(html)
+    html = _CDN_SCRIPT_RE.sub("", html)
+    html = _FONT_LINK_RE.sub("", html)
+    insert_at = first.start() if first else html.index("</head>")
+    return html[:insert_at] + vendor + runtime + html[insert_at:]
+
+
+def write_gzip(path, level=9):
+    """Write path + '.gz' (reproducible: no mtime/name in the header) and return its path"""
+    gz_path = path + ".gz"
+    with open(path, "rb") as f:
+        content = f.read()
+    with open(gz_path, "wb") as raw:
+        with gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=level, mtime=0) as gz:
+            gz.write(content)
+    return gz_path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Offline bundles of custom reports (vendored Vega assets, deduplicated datasets)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Download the pinned Vega builds into assets/vendor/ (connected machine)
+  python scripts/report_bundle.py --fetch
+
+  # Bundle an existing report
+  python scripts/report_bundle.py outputs/models/2025-11-21_11-24-58/custom_report.html --gzip
+        """
+    )
+    parser.add_argument("report", nargs="?", default=None, help="custom_report.html to bundle in place")
+    parser.add_argument("--fetch", action="store_true", help="Download the vendored Vega assets")
+    parser.add_argument("--gzip", action="store_true", help="Also write a .gz precompressed copy")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.fetch:
+        fetch_vendor_assets()
+    if args.report:
+        with open(args.report, "r", encoding="utf-8") as f:
+            original = f.read()
+        bundled = bundle_offline(original)
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(bundled)
+        print(f"✓ Offline bundle: {args.report} ({len(original.encode()) / 1024:.0f} KB → {len(bundled.encode()) / 1024:.0f} KB)")
+        if args.gzip:
+            gz_path = write_gzip(args.report)
+            print(f"✓ Precompressed: {gz_path} ({os.path.getsize(gz_path) / 1024:.0f} KB)")
@@ -0,0 +1,119 @@
+"""
+Single-pass parser for Meridian's report_data.html.
+
+The Summarizer renders every chart as
+    <chart><chart-embed id="..."></chart-embed>...</chart>
+    <script> ... const spec = JSON.parse("<escaped Vega-Lite JSON>"); ... </script>
+and every metrics table as <chart-table id="...">...</chart-table>.
+
+`parse_report_html` reads the file once, walks those markers in a single scan
+and indexes charts (decoded spec + HTML section) and tables (headers + rows)
+by id, so extractors work on dicts instead of re-reading and re-scanning the
+document.
+"""
+
+import os
+import re
+import json
+
+_MARKER_RE = re.compile(r'<chart-embed id="([^"]+)"|<chart-table id="([^"]+)"')
+_CELL_RE = re.compile(r'<(th|td)[^>]*>(.*?)</\1>', re.DOTALL)
+_ROW_RE = re.compile(r'<tr[^>]*>(.*?)</tr>', re.DOTALL)
+_SPEC_START = 'JSON.parse("'
+_SPEC_END = '");'
+
+
+def decode_spec_literal(literal):
+    """Decode the JS string literal passed to JSON.parse into a spec dict"""
+    # A double-quoted JS string literal with \", \\n, \\uXXXX escapes is a valid JSON string
+    return json.loads(json.loads('"' + literal + '"'))
+
+
+def encode_spec_literal(spec):
+    """Inverse of decode_spec_literal, safe to embed inside a <script> block"""
+    return json.dumps(json.dumps(spec))[1:-1].replace("</", "<\\/")
+
+
+def _parse_chart(html, chart_id, pos):
+    start = html.rfind('<chart>', 0, pos)
+    if start == -1:
+        start = pos
+    end = html.find('</script>', pos)
+    if end == -1:
+        return None
+    end += len('</script>')
+
+    chart = {"id": chart_id, "start": start, "end": end, "spec_literal": None, "spec": None}
+    literal_start = html.find(_SPEC_START, pos, end)
+    if literal_start != -1:
+        literal_start += len(_SPEC_START)
+        literal_end = html.find(_SPEC_END, literal_start, end)
+        if literal_end != -1:
+            chart["spec_literal"] = html[literal_start:literal_end]
+            try:
+                chart["spec"] = decode_spec_literal(chart["spec_literal"])
+            except ValueError:
+                chart["spec"] = None
+    return chart
+
+
+def _parse_table(html, table_id, pos):
+    end = html.find('</chart-table>', pos)
+    if end == -1:
+        return None
+    headers = []
+    rows = []
+    for row_html in _ROW_RE.findall(html, pos, end):
+        cells = _CELL_RE.findall(row_html)
+        if cells and all(tag == "th" for tag, _ in cells):
+            headers = [text.strip() for _, text in cells]
+        elif cells:
+            rows.append([text.strip() for _, text in cells])
+    return {"id": table_id, "start": pos, "end": end, "headers": headers, "rows": rows}
+
+
+def parse_report_html(report_html_path):
+    """
+    Read report_data.html once and index its charts and tables by id.
+    Returns None when the file does not exist.
+    """
+    if not os.path.exists(report_html_path):
+        return None
+    with open(report_html_path, 'r', encoding='utf-8') as f:
+        html = f.read()
+    return parse_report_string(html, path=report_html_path)
+
+
+def parse_report_string(html, path=None):
+    """Index the charts and tables of an HTML document already in memory"""
+    charts = {}
+    tables = {}
+    for match in _MARKER_RE.finditer(html):
+        chart_id, table_id = match.groups()
+        if chart_id:
+            chart = _parse_chart(html, chart_id, match.start())
+            if chart:
+                charts[chart_id] = chart
+        else:
+            table = _parse_table(html, table_id, match.start())
+            if table:
+                tables[table_id] = table
+
+    return {"path": path, "html": html, "charts": charts, "tables": tables}
+
+
+def chart_section(report, chart_id):
+    """Raw HTML of a chart, from its <chart> tag to the end of its <script>"""
+    chart = report["charts"].get(chart_id)
+    if chart is None:
+        return None
+    return report["html"][chart["start"]:chart["end"]]
+
+
+def chart_records(report, chart_id):
+    """Rows of a chart's (first) inline dataset, e.g. [{"channel": ..., "roi": ...}, ...]"""
+    chart = report["charts"].get(chart_id)
+    if not chart or not chart["spec"]:
+        return []
+    datasets = chart["spec"].get("datasets") or {}
+    return next(iter(datasets.values()), [])
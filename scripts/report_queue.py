@@ -0,0 +1,286 @@
+"""
+Report generation queue (outputs/report_queue.sqlite), decoupled from training.
+
+Rendering report_data.html needs the Meridian model and takes a while; doing
+it at the end of `main_pipeline` holds the training process (and its
+TensorFlow memory) until the HTML is written. With `run.py --defer-report`
+(always on in sweeps) training saves the posterior artifact, enqueues a
+report job and exits. Workers then claim queued jobs one at a time, rebuild
+the model from the artifact and render report_data.html followed by
+custom_report.html, several models in parallel.
+
+    python scripts/report_queue.py --workers 4          # drain the queue
+    python scripts/report_queue.py --workers 4 --watch  # keep polling for new jobs
+"""
+
+import os
+import time
+import sqlite3
+import argparse
+import traceback
+import multiprocessing
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+# Get POC directory (parent of scripts directory)
+SCRIPT_DIR = Path(__file__).parent.absolute()
+POC_DIR = SCRIPT_DIR.parent.absolute()
+
+QUEUE_FILE = os.path.join(POC_DIR, "outputs", "report_queue.sqlite")
+DEFAULT_POLL_INTERVAL = 10  # Seconds between queue checks with --watch
+MAX_ATTEMPTS = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS report_jobs (
+    model_dir    TEXT PRIMARY KEY,
+    status       TEXT NOT NULL,
+    enqueued_at  TEXT NOT NULL,
+    started_at   TEXT,
+    finished_at  TEXT,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    error        TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_report_jobs_status ON report_jobs (status, enqueued_at);
+"""
+
+
+def connect(queue_file=QUEUE_FILE):
+    """Open the queue, creating the schema on first use"""
+    os.makedirs(os.path.dirname(queue_file), exist_ok=True)
+    # Generous timeout: training processes and workers write concurrently
+    conn = sqlite3.connect(queue_file, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def enqueue_report(model_dir, queue_file=QUEUE_FILE):
+    """Queue (or re-queue) the reports of a model folder"""
+    conn = connect(queue_file)
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO report_jobs (model_dir, status, enqueued_at, attempts) VALUES (?, 'queued', ?, 0)",
+            (os.path.abspath(model_dir), datetime.now().isoformat()),
+        )
+    finally:
+        conn.close()
+
+
+def claim_next(conn, model_dirs=None):
+    """
+    Atomically mark the oldest queued job (among model_dirs, if given) as running
+    and return its model_dir, or None
+    """
+    sql = "SELECT model_dir FROM report_jobs WHERE status = 'queued'"
+    params = []
+    if model_dirs is not None:
+        if not model_dirs:
+            return None
+        model_dirs = [os.path.abspath(d) for d in model_dirs]
+        sql += f" AND model_dir IN ({', '.join('?' * len(model_dirs))})"
+        params.extend(model_dirs)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(sql + " ORDER BY enqueued_at LIMIT 1", params).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE report_jobs SET status = 'running', started_at = ?, attempts = attempts + 1 WHERE model_dir = ?",
+                (datetime.now().isoformat(), row["model_dir"]),
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return row["model_dir"] if row is not None else None
+
+
+def finish_job(conn, model_dir, error=None):
+    """Mark a job done, or failed (re-queued while attempts remain); returns its new status"""
+    if error is None:
+        conn.execute(
+            "UPDATE report_jobs SET status = 'done', finished_at = ?, error = NULL WHERE model_dir = ?",
+            (datetime.now().isoformat(), model_dir),
+        )
+    else:
+        conn.execute(
+            "UPDATE report_jobs SET status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END, "
+            "finished_at = ?, error = ? WHERE model_dir = ?",
+            (MAX_ATTEMPTS, datetime.now().isoformat(), error, model_dir),
+        )
+    return conn.execute("SELECT status FROM report_jobs WHERE model_dir = ?", (model_dir,)).fetchone()["status"]
+
+
+def requeue_stale(conn):
+    """Jobs left 'running' by a killed worker go back to the queue"""
+    return conn.execute("UPDATE report_jobs SET status = 'queued' WHERE status = 'running'").rowcount
+
+
+def list_jobs(queue_file=QUEUE_FILE, status=None):
+    conn = connect(queue_file)
+    try:
+        sql = "SELECT * FROM report_jobs"
+        params = []
+        if status:
+            sql += " WHERE status = ?"
+            params.append(status)
+        return [dict(row) for row in conn.execute(sql + " ORDER BY enqueued_at", params).fetchall()]
+    finally:
+        conn.close()
+
+
+def render_reports(model_dir):
+    """Rebuild the model of a folder and render report_data.html, then custom_report.html"""
+    from artifact import load_model, load_model_config_data
+    from run import generate_html_report
+    from registry import query_models
+    from custom_report import write_report
+
+    config_data = load_model_config_data(model_dir)
+    mmm = load_model(model_dir, config_data=config_data)
+    generate_html_report(mmm, config_data["model_config"], output_dir=model_dir)
+
+    folder = os.path.basename(os.path.normpath(model_dir))
+    model_info = next((m for m in query_models() if m["folder"] == folder), None)
+    if model_info is None:
+        model_info = {"folder": folder, "path": model_dir, "metadata": {}}
+    write_report(model_info, model=mmm)
+
+
+def render_job(model_dir):
+    """Worker: render the reports of one model folder, returning an error message or None"""
+    try:
+        render_reports(model_dir)
+        return None
+    except Exception as e:
+        traceback.print_exc()
+        return str(e) or type(e).__name__
+
+
+def run_report_workers(max_workers=None, watch=False, poll_interval=DEFAULT_POLL_INTERVAL,
+                       threads_per_worker=None, queue_file=QUEUE_FILE):
+    """
+    Render queued reports across a process pool until the queue is empty
+    (or forever with watch=True). Returns {"done": n, "queued": n retried, "failed": n}.
+    """
+    from run import available_cpus, _sweep_worker_init
+
+    cpus = available_cpus()
+    workers = max(1, max_workers or min(4, cpus))
+    intra_op = threads_per_worker or max(1, cpus // workers)
+    inter_op = min(2, intra_op)
+    os.environ["OMP_NUM_THREADS"] = str(intra_op)
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(intra_op)
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(inter_op)
+
+    conn = connect(queue_file)
+    counts = {"done": 0, "queued": 0, "failed": 0}
+    # TensorFlow is not fork-safe: always start clean interpreters
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_sweep_worker_init, initargs=(intra_op, inter_op)) as executor:
+            running = {}
+            while True:
+                while len(running) < workers:
+                    model_dir = claim_next(conn)
+                    if model_dir is None:
+                        break
+                    print(f"📄 Rendering reports: {os.path.basename(model_dir)}")
+                    try:
+                        running[executor.submit(render_job, model_dir)] = model_dir
+                    except BrokenProcessPool as e:
+                        finish_job(conn, model_dir, str(e))
+                        raise
+                if not running:
+                    if not watch:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                done, _ = wait(running, timeout=poll_interval if watch else None, return_when=FIRST_COMPLETED)
+                for future in done:
+                    model_dir = running.pop(future)
+                    try:
+                        error = future.result()
+                    except Exception as e:
+                        # Worker process died (e.g. out of memory)
+                        error = str(e) or type(e).__name__
+                    status = finish_job(conn, model_dir, error)
+                    counts[status] += 1
+                    icon = {"done": "✅", "queued": "🔁", "failed": "❌"}[status]
+                    print(f"  {icon} {os.path.basename(model_dir)}" + (f" ({error})" if error else ""))
+    finally:
+        conn.close()
+    return counts
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Render queued model reports (report_data.html + custom_report.html) in parallel",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Render every queued report with 4 workers, then exit
+  python scripts/report_queue.py --workers 4
+
+  # Keep serving the queue while training runs elsewhere
+  python scripts/report_queue.py --workers 2 --watch
+
+  # Queue a model by hand, show the queue
+  python scripts/report_queue.py --enqueue 2025-11-21_11-24-58
+  python scripts/report_queue.py --list
+        """
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes. Default: min(4, cores)")
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="TensorFlow intra-op threads per worker. Default: cores / workers")
+    parser.add_argument("--watch", action="store_true", help="Keep polling the queue for new jobs")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"Seconds between queue checks with --watch. Default: {DEFAULT_POLL_INTERVAL}")
+    parser.add_argument("--enqueue", type=str, nargs="+", default=None, metavar="FOLDER",
+                        help="Queue the reports of model folders (name in outputs/models/ or path)")
+    parser.add_argument("--list", action="store_true", help="Show the queue")
+    parser.add_argument("--requeue-stale", action="store_true",
+                        help="Put jobs left 'running' by a killed worker back in the queue")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.enqueue:
+        for folder in args.enqueue:
+            model_dir = folder if os.path.isdir(folder) else os.path.join(POC_DIR, "outputs", "models", folder)
+            if not os.path.isdir(model_dir):
+                print(f"❌ Error: The model folder '{folder}' does not exist.")
+                exit(1)
+            enqueue_report(model_dir)
+            print(f"📥 Queued: {os.path.basename(os.path.normpath(model_dir))}")
+        exit(0)
+
+    if args.list:
+        jobs = list_jobs()
+        if not jobs:
+            print("📭 Report queue is empty")
+        for job in jobs:
+            error = f"  ({job['error']})" if job["error"] else ""
+            print(f"{job['status']:<8} {os.path.basename(job['model_dir'])}  queued {job['enqueued_at'][:19]}"
+                  f"  attempts {job['attempts']}{error}")
+        exit(0)
+
+    if args.requeue_stale:
+        conn = connect()
+        try:
+            print(f"🔁 {requeue_stale(conn)} stale job(s) re-queued")
+        finally:
+            conn.close()
+
+    counts = run_report_workers(
+        max_workers=args.workers,
+        watch=args.watch,
+        poll_interval=args.poll_interval,
+        threads_per_worker=args.threads_per_worker,
+    )
+    print(f"\n📋 Rendered: {counts['done']}  ❌ Failed: {counts['failed']}")
+    exit(0 if counts["failed"] == 0 else 1)
@@ -0,0 +1,173 @@
+"""
+Precomputed response curves (response_curves.npz).
+
+Meridian's Summarizer recomputes the response curves of report_data.html
+from the posterior on every report, and they then only exist as chart JSON.
+Here they are computed once after sampling from the scenario engine
+(scenarios.py): every paid channel's incremental outcome when its historical
+spend is scaled by each multiplier of a spend grid, summarized over the
+engine draws as mean / median / credible interval per channel and grid
+point. The arrays are stored in the model folder (float32, a few KB) and
+read back in milliseconds by `load_response_curves`; `curve_at` interpolates
+a curve at any spend.
+
+The grid is configured per dataset with `report.response_curves`
+(max_multiplier, grid_points); by default 0x to 2x in steps of 0.05.
+"""
+
+import os
+import time
+import argparse
+
+import numpy as np
+
+from metrics import summarize_draws, DEFAULT_CONFIDENCE_LEVEL
+from scenarios import get_engine, media_effect_draws, save_npz, CHUNK_ELEMENTS
+
+RESPONSE_CURVES_FILE = "response_curves.npz"
+RESPONSE_CURVES_VERSION = 1
+DEFAULT_MAX_MULTIPLIER = 2.0
+DEFAULT_GRID_POINTS = 41
+CURVE_STATS = ["mean", "median", "ci_lo", "ci_hi"]
+
+
+def historical_spend(engine):
+    """Total historical spend per channel, (channels,)"""
+    return engine["spend"].sum(axis=(0, 1))
+
+
+def response_curve_draws(engine, max_multiplier=DEFAULT_MAX_MULTIPLIER, grid_points=DEFAULT_GRID_POINTS, time_mask=None):
+    """
+    Incremental outcome of every channel at spend = multiplier × historical spend,
+    for a uniform multiplier grid over [0, max_multiplier].
+    Returns {"multipliers": (points,), "spend": (points, channels), "draws": (points, draws, channels)}.
+    """
+    multipliers = np.linspace(0.0, max_multiplier, grid_points)
+    hist = engine["spend"].transpose(2, 1, 0)  # (channels, times, geos)
+    # All channels are scaled together: their curves are independent in the model
+    batch = max(1, CHUNK_ELEMENTS // hist.size)
+    draws = np.concatenate([
+        media_effect_draws(engine, multipliers[k:k + batch, None, None, None] * hist[None], time_mask, per_channel=True)
+        for k in range(0, grid_points, batch)
+    ])
+    return {
+        "multipliers": multipliers,
+        "spend": multipliers[:, None] * historical_spend(engine)[None, :],
+        "draws": draws,
+    }
+
+
+def compute_response_curves(engine, max_multiplier=DEFAULT_MAX_MULTIPLIER, grid_points=DEFAULT_GRID_POINTS,
+                            confidence_level=DEFAULT_CONFIDENCE_LEVEL):
+    """Response curves of every paid channel, summarized over the engine draws"""
+    curves = response_curve_draws(engine, max_multiplier, grid_points)
+    # summarize_draws reduces over (chains, draws): draws go first
+    summary = summarize_draws(curves["draws"].transpose(1, 0, 2)[None], confidence_level)
+    return {
+        "version": RESPONSE_CURVES_VERSION,
+        "channels": list(engine["channels"]),
+        "multipliers": curves["multipliers"],
+        "spend": curves["spend"],
+        "historical_spend": historical_spend(engine),
+        "confidence_level": confidence_level,
+        "n_draws": curves["draws"].shape[1],
+        **{stat: summary[stat] for stat in CURVE_STATS},
+    }
+
+
+def save_response_curves(curves, model_dir):
+    path = os.path.join(model_dir, RESPONSE_CURVES_FILE)
+    arrays = {
+        key: np.asarray(value, dtype=np.float32) if key in CURVE_STATS + ["spend"] else np.asarray(value)
+        for key, value in curves.items()
+    }
+    return save_npz(path, arrays)
+
+
+def load_response_curves(model_dir):
+    """
+    Saved response curves of a model folder, or None if not computed:
+    {"channels", "multipliers" (points,), "spend" / "mean" / "median" / "ci_lo" / "ci_hi" (points, channels),
+     "historical_spend" (channels,), "confidence_level", "n_draws"}
+    """
+    path = os.path.join(model_dir, RESPONSE_CURVES_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        curves = {key: data[key] for key in data.files}
+    if int(curves["version"]) != RESPONSE_CURVES_VERSION:
+        return None
+    curves["channels"] = [str(c) for c in curves["channels"]]
+    for key in ["version", "n_draws"]:
+        curves[key] = int(curves[key])
+    curves["confidence_level"] = float(curves["confidence_level"])
+    return curves
+
+
+def get_response_curves(model_dir, model_loader=None, **grid):
+    """Saved response curves of a model folder, computed (and saved) from its scenario engine on first use"""
+    curves = load_response_curves(model_dir)
+    if curves is None:
+        curves = compute_response_curves(get_engine(model_dir, model_loader=model_loader), **grid)
+        save_response_curves(curves, model_dir)
+    return curves
+
+
+def curve_at(curves, channel, spend, stat="mean"):
+    """Value of a channel's curve (stat in CURVE_STATS) at the given spend, linear between grid points"""
+    m = curves["channels"].index(channel)
+    return np.interp(spend, curves["spend"][:, m], curves[stat][:, m])
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compute or show the precomputed response curves of a saved model",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Curves of the most recent model (computed on first use)
+  python scripts/response_curves.py
+
+  # Recompute on a wider grid
+  python scripts/response_curves.py --model 2025-11-21_11-24-58 --max-multiplier 3 --grid-points 61 --rebuild
+        """
+    )
+    parser.add_argument("--model", type=str, default=None, help="Model folder name. Default: most recent model")
+    parser.add_argument("--max-multiplier", type=float, default=DEFAULT_MAX_MULTIPLIER,
+                        help=f"Largest spend multiplier of the grid. Default: {DEFAULT_MAX_MULTIPLIER}")
+    parser.add_argument("--grid-points", type=int, default=DEFAULT_GRID_POINTS,
+                        help=f"Points of the grid. Default: {DEFAULT_GRID_POINTS}")
+    parser.add_argument("--rebuild", action="store_true", help=f"Recompute {RESPONSE_CURVES_FILE}")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from registry import query_models
+
+    args = parse_args()
+    models = query_models(with_model=True)
+    if args.model:
+        models = [m for m in models if m["folder"] == args.model]
+    if not models:
+        print("❌ No saved model found")
+        exit(1)
+    model_info = models[0]
+
+    start = time.perf_counter()
+    curves_path = os.path.join(model_info["path"], RESPONSE_CURVES_FILE)
+    if args.rebuild and os.path.exists(curves_path):
+        os.remove(curves_path)
+    curves = get_response_curves(model_info["path"], max_multiplier=args.max_multiplier, grid_points=args.grid_points)
+    print(f"📅 Model: {model_info['folder']}  ({curves['n_draws']} draws, "
+          f"{len(curves['multipliers'])} grid points, loaded in {(time.perf_counter() - start) * 1000:.0f} ms)\n")
+
+    level = int(curves["confidence_level"] * 100)
+    for m, channel in enumerate(curves["channels"]):
+        print(f"📈 {channel} (historical spend {curves['historical_spend'][m]:,.0f})")
+        for multiplier in [0.5, 1.0, 1.5, 2.0]:
+            if multiplier > curves["multipliers"][-1]:
+                continue
+            spend = multiplier * curves["historical_spend"][m]
+            values = {stat: float(curve_at(curves, channel, spend, stat)) for stat in CURVE_STATS}
+            print(f"   ×{multiplier:.1f}  spend {spend:>12,.0f}  outcome {values['mean']:>12,.0f}  "
+                  f"{level}% CI [{values['ci_lo']:,.0f}, {values['ci_hi']:,.0f}]")
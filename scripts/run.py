@@ -1,20 +1,33 @@
 import os
+import glob
 import random
 import warnings
 import argparse
 import yaml
-import hashlib
 import pickle
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import multiprocessing
 
 import numpy as np
 import pandas as pd
-import tensorflow as tf
 
-from meridian.data import load
-from meridian.model import spec, model
-from meridian.analysis import summarizer
+# TensorFlow and Meridian are imported inside the functions that need them:
+# listing, selection and cache lookups must not pay their start-up cost.
+from sampling import sample_posterior_in_segments, load_progress, clear_checkpoint, seed_warm_start, warm_sampling
+from data_cache import read_csv_cached
+from fingerprint import compute_data_hash, fingerprint_frame, data_hash_from_fingerprint, save_fingerprint
+from delta import latest_delta, print_delta
+from compact import compact_posterior, storage_error_report, save_storage_report, print_storage_report
+from geo_data import data_columns, add_long_media, build_input_data
+from artifact import save_posterior_artifact, has_saved_model, PICKLE_FILE, MANIFEST_FILE
+from metrics import compute_model_metrics, save_metrics
+from registry import register_model, record_metrics, query_models
+from scenarios import build_engine, save_engine
+from response_curves import compute_response_curves, save_response_curves
+from profiling import StageProfiler, TRACE_DIR
+from report_queue import enqueue_report, claim_next, finish_job, render_job, connect as connect_report_queue
 
 # Get POC directory (parent of scripts directory)
 SCRIPT_DIR = Path(__file__).parent.absolute()
@@ -25,6 +38,8 @@ CONFIG_FILE = "configs/config_v1.yaml"
 
 
 def setup_seed(seed=SEED):
+    import tensorflow as tf
+
     os.environ["PYTHONHASHSEED"] = str(seed)
     random.seed(seed)
     np.random.seed(seed)
@@ -32,13 +47,35 @@ def setup_seed(seed=SEED):
     warnings.filterwarnings("ignore")
 
 
-def load_config_and_data(config_file=CONFIG_FILE, data_file=None):
+def configure_tf_threads(intra_op_threads=None, inter_op_threads=None):
+    """Limit TensorFlow thread pools (must run before the first TF op)"""
+    import tensorflow as tf
+
+    if intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    if inter_op_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+
+def list_dataset_keys(config):
+    """List the dataset entries of a loaded configuration"""
+    return [
+        key for key, value in config.items()
+        if key != "default_dataset" and isinstance(value, dict) and "columns" in value
+    ]
+
+
+def resolve_dataset_source(config_file=CONFIG_FILE, data_file=None, dataset_name=None):
+    """
+    Dataset of a config without reading its data: {"dataset_name", "model_config",
+    "csv_path", "time_col", "read": {"columns", "filters"}} (the read_csv_cached selection).
+    """
     # Resolve config file path relative to POC directory
     config_path = os.path.join(POC_DIR, config_file) if not os.path.isabs(config_file) else config_file
 
     with open(config_path, "r") as f:
         config = yaml.safe_load(f)
-    model_name = os.getenv("DATASET_NAME", config.get("default_dataset", "weekly_applications"))
+    model_name = dataset_name or os.getenv("DATASET_NAME", config.get("default_dataset", "weekly_applications"))
     model_config = config[model_name]
 
     # Override CSV path if data_file is provided
@@ -58,20 +95,55 @@ def load_config_and_data(config_file=CONFIG_FILE, data_file=None):
         if not os.path.isabs(csv_path):
             csv_path = os.path.join(POC_DIR, csv_path)
 
-    df = pd.read_csv(csv_path)
-    time_col = model_config["columns"]["time"]
-    df[time_col] = pd.to_datetime(df[time_col])
-
-    display_cols = (
-        [time_col, model_config["columns"].get("geo"), model_config["columns"]["kpi"]]
-        + model_config["columns"]["media"][:3]
+    columns = model_config["columns"]
+    time_col = columns["time"]
+    geos = model_config.get("geos")
+    if geos and not columns.get("geo"):
+        raise ValueError(f"'geos' is set for dataset '{model_name}' but columns.geo is not")
+    used_columns = data_columns(
+        {**columns, "media": [], "media_spend": []} if "media_long" in model_config else columns
     )
+    return {
+        "dataset_name": model_name,
+        "model_config": model_config,
+        "csv_path": csv_path,
+        "time_col": time_col,
+        "read": {"columns": used_columns, "filters": {columns["geo"]: geos} if geos else None},
+    }
+
 
+def load_config_and_data(config_file=CONFIG_FILE, data_file=None, dataset_name=None):
+    source = resolve_dataset_source(config_file, data_file=data_file, dataset_name=dataset_name)
+    model_name = source["dataset_name"]
+    model_config = source["model_config"]
     columns = model_config["columns"]
+    time_col = source["time_col"]
+    geos = model_config.get("geos")
+    csv_path = source["csv_path"]
+    # Parsed once into a memory-mapped Arrow cache next to the CSV; only the
+    # used columns and the configured geo subset are materialized
+    df = read_csv_cached(csv_path, parse_dates=[time_col], **source["read"])
+    if geos and df.empty:
+        raise ValueError(f"None of the configured geos {geos} is present in {csv_path}")
+    if "media_long" in model_config:
+        df = add_long_media(df, model_config)
+
+    n_geos = df[columns["geo"]].nunique() if columns.get("geo") else 1
+    if n_geos > 1 and not columns.get("population"):
+        raise ValueError(
+            f"Dataset '{model_name}' has {n_geos} geos: set columns.population "
+            f"(per-geo population column) in the config"
+        )
+
+    display_cols = [time_col, columns.get("geo"), columns["kpi"]] + columns["media"][:3]
+
+    from meridian.data import load
+
     coord_to_columns = load.CoordToColumns(
         time=columns["time"],
         geo=columns.get("geo"),
         kpi=columns["kpi"],
+        population=columns.get("population", "population"),
         media=columns["media"],
         media_spend=columns["media_spend"],
         controls=columns.get("controls", [])
@@ -88,26 +160,20 @@ def load_config_and_data(config_file=CONFIG_FILE, data_file=None):
         "media_to_channel": media_to_channel,
         "media_spend_to_channel": media_spend_to_channel,
         "feature_params": feature_params,
-        "display_cols": display_cols
+        "display_cols": display_cols,
+        "dataset_name": model_name,
     }
 
 
-def build_model_and_sample(config_data):
-    df = config_data["df"]
-    coord_to_columns = config_data["coord_to_columns"]
+def build_model(config_data, inference_data=None):
+    """Build the Meridian model described by config_data (unsampled unless inference_data is given)"""
+    from meridian.model import spec, model
+
     model_config = config_data["model_config"]
-    media_to_channel = config_data["media_to_channel"]
-    media_spend_to_channel = config_data["media_spend_to_channel"]
     feature_params = config_data["feature_params"]
 
-    loader = load.DataFrameDataLoader(
-        df=df,
-        coord_to_columns=coord_to_columns,
-        kpi_type=model_config["kpi_type"],
-        media_to_channel=media_to_channel,
-        media_spend_to_channel=media_spend_to_channel,
-    )
-    meridian_data = loader.load()
+    # Dense (geo, time, channel) arrays built in one pass (see geo_data.py)
+    meridian_data = build_input_data(config_data)
 
     model_params = model_config["model"]
     model_spec = spec.ModelSpec(max_lag=model_params["max_lag"])
@@ -116,60 +182,84 @@ def build_model_and_sample(config_data):
         if hyper in model_params and hasattr(model_spec, hyper):
             setattr(model_spec, hyper, model_params[hyper])
 
-    mmm = model.Meridian(input_data=meridian_data, model_spec=model_spec)
+    mmm = model.Meridian(input_data=meridian_data, model_spec=model_spec, inference_data=inference_data)
 
     if feature_params and hasattr(mmm, "set_feature_priors"):
         mmm.set_feature_priors(feature_params)
 
-    sampling = model_config["sampling"]
-    mmm.sample_posterior(
-        n_chains=sampling["n_chains"],
-        n_adapt=sampling["n_adapt"],
-        n_burnin=sampling["n_burnin"],
-        n_keep=sampling["n_keep"],
-    )
-
-    mmm.sample_prior(n_draws=1)
-    return mmm, model_config
+    return mmm
 
 
-def compute_data_hash(df: pd.DataFrame, config_data: dict) -> str:
+def build_model_and_sample(config_data, output_dir=None, run_info=None, profiler=None, warm_start_dir=None):
     """
-    Computes a unique hash based on the data and model configuration.
-    This allows uniquely identifying a model by its training data.
+    Build the model and sample its posterior. With `sampling.checkpoint_every`
+    or `sampling.adaptive` set (or an existing checkpoint in output_dir),
+    sampling runs in resumable segments checkpointed to output_dir.
+    With warm_start_dir (a model trained on a prefix of the same data),
+    sampling starts from that model's final state with the shorter
+    adaptation and burn-in of `sampling.warm_start`.
+    Stages are timed on `profiler` (a StageProfiler) when one is given.
     """
-    coord = config_data["coord_to_columns"]
+    profiler = profiler or StageProfiler()
     model_config = config_data["model_config"]
+    with profiler.stage("build_model"):
+        mmm = build_model(config_data)
 
-    # Data information
-    data_info = {
-        "shape": df.shape,
-        "columns": sorted(df.columns.tolist()),
-        "time_col": coord.time,
-        "kpi_col": coord.kpi,
-        "geo_col": coord.geo,
-        "media_cols": sorted(coord.media) if coord.media else [],
-        "media_spend_cols": sorted(coord.media_spend) if coord.media_spend else [],
-        "date_range": {
-            "start": str(df[coord.time].min()),
-            "end": str(df[coord.time].max()),
-        },
-        # Value hash (sampled for performance)
-        "data_hash": pd.util.hash_pandas_object(df).sum(),
-    }
+    sampling = model_config["sampling"]
+    if warm_start_dir and output_dir:
+        sampling = warm_sampling(sampling)
+        with profiler.stage("warm_start"):
+            seed_warm_start(mmm, warm_start_dir, output_dir, sampling["n_chains"], seed=SEED)
+    segmented = sampling.get("checkpoint_every") or sampling.get("adaptive")
+    with profiler.stage("sample_posterior"):
+        if output_dir and (segmented or load_progress(output_dir) or warm_start_dir):
+            config_data["sampling_summary"] = sample_posterior_in_segments(
+                mmm, sampling, output_dir, run_info=run_info, seed=SEED
+            )
+        else:
+            mmm.sample_posterior(
+                n_chains=sampling["n_chains"],
+                n_adapt=sampling["n_adapt"],
+                n_burnin=sampling["n_burnin"],
+                n_keep=sampling["n_keep"],
+            )
+
+    with profiler.stage("sample_prior"):
+        mmm.sample_prior(n_draws=1)
+    return mmm, model_config
 
-    # Model configuration
-    model_info = {
-        "kpi_type": model_config["kpi_type"],
-        "model_params": model_config.get("model", {}),
-        "sampling": model_config.get("sampling", {}),
-    }
 
-    # Create a combined string and compute hash
-    combined_str = str(data_info) + str(model_info)
-    data_hash = hashlib.sha256(combined_str.encode()).hexdigest()[:16]  # 16 characters is enough
+def find_cached_model(data_hash):
+    """Return the most recent model folder trained with the same data hash, or None"""
+    for model_info in query_models(data_hash=data_hash, with_model=True):
+        # The registry may predate a manual cleanup of outputs/models/
+        if has_saved_model(model_info["path"]):
+            return model_info["path"]
+    return None
 
-    return data_hash
+
+def find_extended_model(df, config_data):
+    """
+    Most recent trained model of the same dataset whose training data is a
+    strict prefix in time of df: same config and columns, and the rows up to
+    its last date hash to its data_hash. Returns its folder path, or None.
+    """
+    time_col = config_data["coord_to_columns"].time
+    end = df[time_col].max()
+    prefix_hashes = {}
+    for model_info in query_models(dataset_name=config_data["dataset_name"], with_model=True):
+        metadata = model_info["metadata"]
+        previous_end = (metadata.get("date_range") or {}).get("end")
+        if previous_end is None or pd.Timestamp(previous_end) >= end:
+            continue
+        if previous_end not in prefix_hashes:
+            # Same rows, in the same order and numbering, as when that model was trained
+            prefix = df[df[time_col] <= pd.Timestamp(previous_end)].reset_index(drop=True)
+            prefix_hashes[previous_end] = compute_data_hash(prefix, config_data)
+        # Warm starts read the posterior artifact (legacy model.pkl folders are skipped)
+        if prefix_hashes[previous_end] == metadata.get("data_hash") and os.path.exists(os.path.join(model_info["path"], MANIFEST_FILE)):
+            return model_info["path"]
+    return None
 
 
 def generate_html_report(mmm, model_config, output_dir=None):
@@ -184,6 +274,8 @@ def generate_html_report(mmm, model_config, output_dir=None):
     else:
         output_html_path = os.path.join(POC_DIR, report["output_html"])
 
+    from meridian.analysis import summarizer
+
     mmm_summarizer = summarizer.Summarizer(mmm)
     mmm_summarizer.output_model_results_summary(
         output_html_path,
@@ -194,9 +286,13 @@ def generate_html_report(mmm, model_config, output_dir=None):
     print(f"✓ HTML report generated: {output_html_path}")
 
 
-def save_model_and_metadata(mmm, config_data, model_config, output_dir, data_hash, config_file=None, data_file=None):
+def save_model_and_metadata(mmm, config_data, model_config, output_dir, data_hash, config_file=None, data_file=None, save_pickle=False, fingerprint=None):
     """
     Save the model and its metadata in the specified folder.
+    The posterior is stored as a compressed netCDF artifact, compacted per the
+    dataset's `storage` block (see compact.py); the full pickled Meridian object
+    is only written when save_pickle is True. The fingerprint of the training
+    data (column and time-block digests) goes to fingerprint.json.
     """
     df = config_data["df"]
     coord = config_data["coord_to_columns"]
@@ -204,12 +300,25 @@ def save_model_and_metadata(mmm, config_data, model_config, output_dir, data_has
     # Extract the folder name (creation date)
     folder_name = os.path.basename(output_dir)
 
-    # Save the model
-    model_path = os.path.join(output_dir, "model.pkl")
-    print(f"💾 Saving model to: {model_path}")
-    with open(model_path, 'wb') as f:
-        pickle.dump(mmm, f)
-    print("✓ Model saved successfully")
+    # Save the posterior artifact
+    print(f"💾 Saving posterior artifact to: {output_dir}")
+    storage = model_config.get("storage")
+    if storage:
+        inference_data, derived, storage_info = compact_posterior(mmm, storage)
+        manifest = save_posterior_artifact(inference_data, output_dir, derived=derived, extra={"storage": storage_info})
+        print(f"✓ Stored {storage_info['n_draws']}/{storage_info['n_draws_full']} draws "
+              f"({storage_info['dtype'] or 'original dtype'}"
+              + (f", without {', '.join(storage_info['dropped'])}" if storage_info["dropped"] else "") + ")")
+    else:
+        manifest = save_posterior_artifact(mmm.inference_data, output_dir)
+    print(f"✓ Posterior saved ({manifest['size_bytes'] / 1024 / 1024:.1f} MB, groups: {', '.join(manifest['groups'])})")
+
+    if save_pickle:
+        model_path = os.path.join(output_dir, PICKLE_FILE)
+        print(f"💾 Saving model to: {model_path}")
+        with open(model_path, 'wb') as f:
+            pickle.dump(mmm, f)
+        print("✓ Model saved successfully")
 
     # Save metadata
     now = datetime.now()
@@ -231,12 +340,20 @@ def save_model_and_metadata(mmm, config_data, model_config, output_dir, data_has
         },
         "config_file": config_file,
         "data_file": data_file,
+        "dataset_name": config_data.get("dataset_name"),
     }
+    if config_data.get("sampling_summary"):
+        metadata["sampling_summary"] = config_data["sampling_summary"]
 
     metadata_path = os.path.join(output_dir, "metadata.yaml")
     with open(metadata_path, 'w') as f:
         yaml.dump(metadata, f, default_flow_style=False, allow_unicode=True)
     print(f"✓ Metadata saved to: {metadata_path}")
+    if fingerprint is not None:
+        save_fingerprint(fingerprint, output_dir)
+
+    register_model(output_dir, metadata)
+    print("✓ Model registered in outputs/registry.sqlite")
 
 
 def list_available_files(directory, extension=None):
@@ -286,43 +403,317 @@ def interactive_select_config():
             exit(1)
 
 
-def main_pipeline(config_file=None, data_file=None):
+def main_pipeline(config_file=None, data_file=None, dataset_name=None, run_name=None, force=False, resume_dir=None, save_pickle=False, profile_trace=False, incremental=False, defer_report=False):
+    profiler = StageProfiler()
+    warm_start_dir = None
     setup_seed()
-    config_data = load_config_and_data(config_file=config_file, data_file=data_file)
+
+    if resume_dir:
+        # Continue an interrupted run with the exact inputs recorded in its checkpoint
+        progress = load_progress(resume_dir)
+        if progress is None:
+            raise FileNotFoundError(f"No sampling checkpoint found in {resume_dir}")
+        if progress.get("complete"):
+            print(f"⚠️  Sampling already complete in {resume_dir}, finishing save and report")
+        run_info = progress.get("run", {})
+        config_file = run_info.get("config_file", config_file)
+        data_file = run_info.get("data_file", data_file)
+        dataset_name = run_info.get("dataset_name", dataset_name)
+        warm_start_dir = run_info.get("warm_start")
+
+    with profiler.stage("load_data"):
+        config_data = load_config_and_data(config_file=config_file, data_file=data_file, dataset_name=dataset_name)
 
     # Create a folder name based on creation date
     now = datetime.now()
     date_folder = now.strftime("%Y-%m-%d_%H-%M-%S")
     print(f"\n📅 Creation date: {date_folder}")
+    if run_name:
+        # Suffix keeps folders unique when several runs start in the same second
+        date_folder = f"{date_folder}_{run_name}"
 
     # Compute data hash for metadata (but do not use it for name of folder)
     df = config_data["df"]
-    data_hash = compute_data_hash(df, config_data)
-
-    # Create output folder organized by creation date
-    output_dir = os.path.join(POC_DIR, "outputs", "models", date_folder)
-    os.makedirs(output_dir, exist_ok=True)
+    with profiler.stage("data_hash"):
+        columns = config_data["model_config"]["columns"]
+        fingerprint = fingerprint_frame(df, time_col=columns["time"], geo_col=columns.get("geo"))
+        data_hash = data_hash_from_fingerprint(fingerprint, config_data["model_config"])
+
+    if resume_dir:
+        if run_info.get("data_hash") not in (None, data_hash):
+            raise ValueError(
+                f"Data or configuration changed since the checkpoint was written "
+                f"(hash {run_info['data_hash']} → {data_hash}); cannot resume"
+            )
+        output_dir = resume_dir
+    else:
+        # Identical data + configuration already trained: reuse its posterior
+        if not force:
+            cached_dir = find_cached_model(data_hash)
+            if cached_dir:
+                print(f"♻️  Model with data hash {data_hash} already trained: {cached_dir}")
+                print("   Reusing it (use --force to retrain)")
+                return cached_dir
+
+        # New periods appended to the data of a trained model: start from its posterior
+        if incremental:
+            warm_start_dir = find_extended_model(df, config_data)
+            if warm_start_dir:
+                print(f"📈 Data extends {os.path.basename(warm_start_dir)}: warm-starting from its posterior")
+            else:
+                print("ℹ️  No trained model on a prefix of this data: sampling from scratch")
+                # Say why: which blocks of the latest model's history were restated
+                latest = latest_delta(df, config_data)
+                if latest is not None:
+                    print(f"   Compared with {latest[0]['folder']}:")
+                    print_delta(latest[1])
+
+        # Create output folder organized by creation date
+        output_dir = os.path.join(POC_DIR, "outputs", "models", date_folder)
+        os.makedirs(output_dir, exist_ok=True)
     print(f"📁 Output folder: {output_dir}\n")
+    if profile_trace:
+        # TensorBoard profile (with a Chrome trace) of the sampling stage
+        profiler.trace_dir = os.path.join(output_dir, TRACE_DIR)
 
     # Build and train model
-    mmm, model_config = build_model_and_sample(config_data)
+    run_info = {
+        "config_file": config_file,
+        "data_file": data_file,
+        "dataset_name": config_data["dataset_name"],
+        "data_hash": data_hash,
+    }
+    if warm_start_dir:
+        run_info["warm_start"] = warm_start_dir
+    mmm, model_config = build_model_and_sample(
+        config_data, output_dir=output_dir, run_info=run_info, profiler=profiler, warm_start_dir=warm_start_dir
+    )
+    if warm_start_dir:
+        config_data["sampling_summary"] = {
+            **(config_data.get("sampling_summary") or {}),
+            "warm_start": os.path.basename(warm_start_dir),
+        }
 
     # Save model and metadata
-    save_model_and_metadata(
-        mmm, config_data, model_config,
-        output_dir, data_hash,
-        config_file=config_file,
-        data_file=data_file
-    )
+    with profiler.stage("save_model"):
+        save_model_and_metadata(
+            mmm, config_data, model_config,
+            output_dir, data_hash,
+            config_file=config_file,
+            data_file=data_file,
+            save_pickle=save_pickle,
+            fingerprint=fingerprint,
+        )
+    clear_checkpoint(output_dir)
+
+    # Cache ROI / mROI / CPIK / contribution / fit metrics for the custom report
+    print("\n📊 Computing posterior metrics...")
+    metrics = None
+    try:
+        with profiler.stage("metrics"):
+            metrics = compute_model_metrics(mmm)
+        save_metrics(metrics, output_dir)
+        record_metrics(output_dir, metrics)
+        r2 = metrics["fit"]["r_squared"]
+        print(f"✓ Metrics saved to: metrics.json (R² = {r2:.3f})" if r2 is not None else "✓ Metrics saved to: metrics.json")
+    except Exception as e:
+        print(f"⚠️  Could not compute posterior metrics: {e}")
+
+    # Effect of the compacted storage on the metrics (against the full posterior still in memory)
+    if model_config.get("storage") and metrics is not None:
+        print("\n🗜️  Measuring the effect of the compacted posterior...")
+        try:
+            with profiler.stage("storage_report"):
+                storage_report = storage_error_report(output_dir, metrics, config_data)
+            save_storage_report(storage_report, output_dir)
+            print_storage_report(storage_report)
+        except Exception as e:
+            print(f"⚠️  Could not measure the storage error: {e}")
+
+    # Scenario engine + response curves, so reports and the optimizer never reload the model for them
+    print("\n📈 Precomputing response curves...")
+    try:
+        with profiler.stage("response_curves"):
+            engine = build_engine(mmm)
+            save_engine(engine, output_dir)
+            grid = model_config.get("report", {}).get("response_curves") or {}
+            save_response_curves(compute_response_curves(engine, **grid), output_dir)
+        print("✓ Response curves saved to: response_curves.npz (+ scenario_engine.npz)")
+    except Exception as e:
+        print(f"⚠️  Could not compute response curves: {e}")
+
+    if defer_report:
+        # Rendered later by a report worker (report_queue.py) from the saved artifact
+        enqueue_report(output_dir)
+        print("\n📥 Report queued (render with: python scripts/report_queue.py)")
+    else:
+        # Generate HTML report in the same folder
+        print("\n📄 Generating HTML report...")
+        with profiler.stage("report"):
+            generate_html_report(mmm, model_config, output_dir=output_dir)
 
-    # Generate HTML report in the same folder
-    print("\n📄 Generating HTML report...")
-    generate_html_report(mmm, model_config, output_dir=output_dir)
+    profiler.save(output_dir)
+    profiler.print_summary()
 
     print(f"\n✅ Model and report saved in: {output_dir}")
-    print(f"   🤖 Model: model.pkl")
-    print(f"   📄 Report: report_data.html")
-    print(f"   📋 Metadata: metadata.yaml")
+    print(f"   🤖 Posterior: inference_data.nc (+ manifest.json)")
+    if save_pickle:
+        print(f"   🤖 Model: model.pkl")
+    print(f"   📄 Report: report_data.html" + (" (queued)" if defer_report else ""))
+    print(f"   📊 Metrics: metrics.json")
+    print(f"   📈 Response curves: response_curves.npz")
+    print(f"   📋 Metadata: metadata.yaml (+ fingerprint.json)")
+    print(f"   ⏱️  Profile: profile.json")
+    if profile_trace:
+        print(f"   🔬 Sampling trace: {TRACE_DIR}/ (open with TensorBoard)")
+
+    return output_dir
+
+
+def resolve_sweep_configs(patterns):
+    """Expand --sweep patterns into config paths relative to the POC directory"""
+    config_files = []
+    for pattern in patterns:
+        matches = glob.glob(pattern) or glob.glob(os.path.join(POC_DIR, pattern))
+        for match in sorted(matches):
+            if not match.endswith(('.yaml', '.yml')):
+                continue
+            abs_path = os.path.abspath(match)
+            try:
+                config_file = os.path.relpath(abs_path, POC_DIR)
+                if config_file.startswith(".."):
+                    config_file = abs_path
+            except ValueError:
+                config_file = abs_path
+            if config_file not in config_files:
+                config_files.append(config_file)
+    return config_files
+
+
+def build_sweep_jobs(config_files):
+    """One job per (config file, dataset key) pair"""
+    jobs = []
+    for config_file in config_files:
+        config_path = os.path.join(POC_DIR, config_file) if not os.path.isabs(config_file) else config_file
+        with open(config_path, "r") as f:
+            config = yaml.safe_load(f) or {}
+        for dataset_name in list_dataset_keys(config):
+            config_stem = os.path.splitext(os.path.basename(config_file))[0]
+            jobs.append({
+                "config_file": config_file,
+                "dataset_name": dataset_name,
+                "run_name": f"{config_stem}_{dataset_name}",
+            })
+    return jobs
+
+
+def available_cpus():
+    """Number of cores this process may run on (respects affinity/cgroups masks)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _sweep_worker_init(intra_op_threads, inter_op_threads):
+    configure_tf_threads(intra_op_threads, inter_op_threads)
+
+
+def _run_sweep_job(job, force=False):
+    try:
+        output_dir = main_pipeline(
+            config_file=job["config_file"],
+            data_file=None,
+            dataset_name=job["dataset_name"],
+            run_name=job["run_name"],
+            force=force,
+            defer_report=True,
+        )
+        return {**job, "status": "ok", "output_dir": output_dir}
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return {**job, "status": "failed", "error": str(e)}
+
+
+def run_sweep(patterns, max_workers=None, threads_per_worker=None, force=False):
+    """Train every dataset of every matching config across a process pool"""
+    config_files = resolve_sweep_configs(patterns)
+    jobs = build_sweep_jobs(config_files)
+    if not jobs:
+        print("❌ No dataset found for the given --sweep patterns")
+        return []
+
+    cpus = available_cpus()
+    workers = max_workers or min(len(jobs), cpus)
+    workers = max(1, min(workers, len(jobs)))
+    intra_op = threads_per_worker or max(1, cpus // workers)
+    inter_op = min(2, intra_op)
+
+    # Children inherit these before TensorFlow is imported (OpenMP/Eigen pools)
+    os.environ["OMP_NUM_THREADS"] = str(intra_op)
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(intra_op)
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(inter_op)
+
+    print("\n" + "="*60)
+    print("🧪 TRAINING SWEEP")
+    print("="*60)
+    print(f"📋 Jobs: {len(jobs)} ({len(config_files)} config file(s))")
+    print(f"⚙️  Workers: {workers} × {intra_op} intra-op / {inter_op} inter-op threads ({cpus} cores)\n")
+
+    results = []
+    # TensorFlow is not fork-safe: always start clean interpreters
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_sweep_worker_init,
+        initargs=(intra_op, inter_op),
+    ) as executor:
+        # Reports are queued by the training jobs and rendered in the same pool as
+        # training slots free up, so a finished model never waits for the others.
+        # Only this sweep's models are claimed (the queue may hold other runs' reports),
+        # including reports re-queued after a failure, until each is done or failed.
+        pending = {executor.submit(_run_sweep_job, job, force): None for job in jobs}
+        sweep_dirs = set()
+        conn = connect_report_queue()
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report_dir = pending.pop(future)
+                    if report_dir is not None:
+                        try:
+                            error = future.result()
+                        except Exception as e:
+                            error = str(e) or type(e).__name__
+                        status = finish_job(conn, report_dir, error)
+                        icon = {"done": "📄", "queued": "🔁"}.get(status, "❌")
+                        print(f"{icon} Reports of {os.path.basename(report_dir)}: {error or 'ok'}"
+                              + (" (retrying)" if status == "queued" else ""))
+                        continue
+                    result = future.result()
+                    results.append(result)
+                    icon = "✓" if result["status"] == "ok" else "❌"
+                    print(f"{icon} {result['config_file']} [{result['dataset_name']}]: {result['status']}")
+                    if result.get("output_dir"):
+                        sweep_dirs.add(result["output_dir"])
+                while len(pending) < workers:
+                    report_dir = claim_next(conn, sweep_dirs)
+                    if report_dir is None:
+                        break
+                    pending[executor.submit(render_job, report_dir)] = report_dir
+        finally:
+            conn.close()
+
+    print("\n" + "="*60)
+    print("📊 SWEEP SUMMARY")
+    print("="*60)
+    for result in sorted(results, key=lambda r: (r["config_file"], r["dataset_name"])):
+        if result["status"] == "ok":
+            print(f"  ✓ {result['config_file']} [{result['dataset_name']}] → {result['output_dir']}")
+        else:
+            print(f"  ❌ {result['config_file']} [{result['dataset_name']}]: {result['error']}")
+    return results
 
 
 def parse_args():
@@ -339,6 +730,25 @@ Examples:
 
   # List available configuration files
   python run.py --list-configs
+
+  # Train every dataset of several configs in parallel
+  python run.py --sweep configs/*.yaml
+
+  # Retrain even if an identical model already exists
+  python run.py --config config_v1.yaml --force
+
+  # Continue an interrupted run from its last sampling checkpoint
+  python run.py --resume 2025-11-21_11-24-58
+
+  # Free the training process early: render the report in a separate worker
+  python run.py --config config_v1.yaml --defer-report
+  python report_queue.py --workers 2
+
+  # Weekly refresh: warm-start from the model trained on the data before the new weeks
+  python run.py --config config_v1.yaml --incremental
+
+  # Record a TensorBoard/Chrome trace of posterior sampling (profile.json is always written)
+  python run.py --config config_v1.yaml --profile-trace
         """
     )
 
@@ -355,6 +765,66 @@ Examples:
         help="Display the list of available configuration files"
     )
 
+    parser.add_argument(
+        "--sweep",
+        nargs="+",
+        default=None,
+        metavar="PATTERN",
+        help="Train every dataset of the matching config files across a process pool (e.g. configs/*.yaml)"
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Sweep mode: number of worker processes. Default: one per job, up to the available cores"
+    )
+
+    parser.add_argument(
+        "--threads-per-worker",
+        type=int,
+        default=None,
+        help="Sweep mode: TensorFlow intra-op threads per worker. Default: cores / workers"
+    )
+
+    parser.add_argument(
+        "--resume",
+        type=str,
+        default=None,
+        metavar="FOLDER",
+        help="Resume an interrupted run from the sampling checkpoint of outputs/models/FOLDER (or a path)"
+    )
+
+    parser.add_argument(
+        "--pickle",
+        action="store_true",
+        help="Also pickle the full Meridian object to model.pkl (the posterior artifact is always written)"
+    )
+
+    parser.add_argument(
+        "--defer-report",
+        action="store_true",
+        help="Queue report_data.html for a report worker (report_queue.py) instead of rendering it in this process"
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="If the data extends a trained model (same config, new periods appended), warm-start sampling from its posterior"
+    )
+
+    parser.add_argument(
+        "--profile-trace",
+        action="store_true",
+        help="Capture a TensorFlow profiler trace of the sampling stage into <model folder>/profile_trace/"
+    )
+
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Retrain even if a model with the same data hash already exists in outputs/models/"
+    )
+
     return parser.parse_args()
 
 
@@ -370,6 +840,27 @@ if __name__ == "__main__":
         print()
         exit(0)
 
+    if args.sweep:
+        results = run_sweep(
+            args.sweep,
+            max_workers=args.workers,
+            threads_per_worker=args.threads_per_worker,
+            force=args.force,
+        )
+        exit(0 if results and all(r["status"] == "ok" for r in results) else 1)
+
+    if args.resume:
+        resume_dir = args.resume
+        if not os.path.isdir(resume_dir):
+            resume_dir = os.path.join(POC_DIR, "outputs", "models", args.resume)
+        if not os.path.isdir(resume_dir):
+            print(f"❌ Error: The model folder '{args.resume}' does not exist.")
+            exit(1)
+        print(f"⏯️  Resuming: {resume_dir}\n")
+        main_pipeline(resume_dir=os.path.abspath(resume_dir), save_pickle=args.pickle, profile_trace=args.profile_trace,
+                      defer_report=args.defer_report)
+        exit(0)
+
     # Determine config file
     if args.config:
         # Command line mode: use provided config
@@ -403,5 +894,6 @@ if __name__ == "__main__":
         print("="*60 + "\n")
 
     # Run pipeline (always use dataset from config, so data_file=None)
-    main_pipeline(config_file=config_file, data_file=None)
+    main_pipeline(config_file=config_file, data_file=None, force=args.force, save_pickle=args.pickle,
+                  profile_trace=args.profile_trace, incremental=args.incremental, defer_report=args.defer_report)
 
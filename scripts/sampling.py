@@ -0,0 +1,439 @@
+"""
+Segmented MCMC sampling with on-disk checkpoints.
+
+Meridian's `sample_posterior` runs adaptation, burn-in and kept draws in one
+call. Here the same windowed-adaptive NUTS kernel is driven segment by segment;
+after each segment the draws and the last full kernel state (including the
+`*_dev` parameters Meridian does not keep in `inference_data`) are written to
+`<output_dir>/checkpoint/`, so a killed job can continue from there.
+The same segment loop implements convergence-driven early stopping, and
+warm starts: a refresh on data that extends a previously trained model seeds
+the checkpoint with that model's final state (`seed_warm_start`), so sampling
+begins near the posterior with a short re-adaptation and burn-in.
+
+arviz and Meridian are imported inside the sampling functions so that
+checkpoint helpers (load_progress, clear_checkpoint) stay cheap to import.
+"""
+
+import os
+import glob
+import shutil
+
+import yaml
+import numpy as np
+
+CHECKPOINT_DIR = "checkpoint"
+PROGRESS_FILE = "progress.yaml"
+STATE_FILE = "state.npz"
+
+# Re-adaptation window used when a segment continues from a saved state.
+# windowed_adaptive_nuts cannot be seeded with a mass matrix, so every
+# continuation re-estimates it (step size starts from the saved value).
+DEFAULT_RESUME_ADAPT = 100
+
+# Adaptation / burn-in of a warm-started run (overridable with sampling.warm_start)
+DEFAULT_WARM_ADAPT = 200
+DEFAULT_WARM_BURNIN = 100
+
+# Non-centered geo deviations Meridian does not save, recovered from the saved
+# geo-level values: geo_level = center + scale * dev (exp(...) for log-normal media effects)
+_GEO_DEVIATIONS = [
+    ("beta_gm_dev", "beta_gm", "beta_m", "eta_m"),
+    ("beta_grf_dev", "beta_grf", "beta_rf", "eta_rf"),
+    ("beta_gom_dev", "beta_gom", "beta_om", "eta_om"),
+    ("beta_gorf_dev", "beta_gorf", "beta_orf", "eta_orf"),
+    ("gamma_gc_dev", "gamma_gc", "gamma_c", "xi_c"),
+    ("gamma_gn_dev", "gamma_gn", "gamma_n", "xi_n"),
+]
+
+
+def checkpoint_path(output_dir, *parts):
+    return os.path.join(output_dir, CHECKPOINT_DIR, *parts)
+
+
+def load_progress(output_dir):
+    """Return the checkpoint progress of a model folder, or None"""
+    progress_path = checkpoint_path(output_dir, PROGRESS_FILE)
+    if not os.path.exists(progress_path):
+        return None
+    with open(progress_path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def _write_progress(output_dir, progress):
+    # Write-then-rename so a kill never leaves a truncated progress file
+    progress_path = checkpoint_path(output_dir, PROGRESS_FILE)
+    tmp_path = progress_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        yaml.dump(progress, f, default_flow_style=False, allow_unicode=True)
+    os.replace(tmp_path, progress_path)
+
+
+def _save_npz(path, arrays):
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def _load_npz(path):
+    with np.load(path) as data:
+        return {k: data[k] for k in data.files}
+
+
+def _run_segment(mmm, n_chains, n_adapt, n_draws, current_state, init_step_size, seed):
+    """One windowed-adaptive NUTS call; returns (states, trace) as numpy dicts of shape (draw, chain, ...)"""
+    from meridian import backend, constants
+
+    # Same pinned joint distribution Meridian's PosteriorMCMCSampler samples from
+    joint_dist = mmm.posterior_sampler_callable._get_joint_dist()
+    mcmc = backend.xla_windowed_adaptive_nuts(
+        n_draws=n_draws,
+        joint_dist=joint_dist,
+        n_chains=n_chains,
+        num_adaptation_steps=n_adapt,
+        current_state=current_state,
+        init_step_size=init_step_size,
+        seed=seed,
+    )
+    states = {k: np.asarray(v) for k, v in mcmc.all_states._asdict().items()}
+    trace = {
+        k: np.asarray(v) for k, v in mcmc.trace.items()
+        if k not in constants.IGNORED_TRACE_METRICS
+    }
+    return states, trace
+
+
+def _to_inference_data(mmm, states, trace, n_chains, n_keep):
+    """Mirror PosteriorMCMCSampler: turn (draw, chain, ...) arrays into posterior/trace/sample_stats groups"""
+    import arviz as az
+    from meridian import constants
+
+    posterior = {
+        k: np.swapaxes(v, 0, 1)
+        for k, v in states.items()
+        if k not in constants.UNSAVED_PARAMETERS
+    }
+    infdata_posterior = az.convert_to_inference_data(
+        posterior,
+        coords=mmm.create_inference_data_coords(n_chains, n_keep),
+        dims=mmm.create_inference_data_dims(),
+    )
+
+    # Step size has no chain axis when it is shared by all chains
+    mcmc_trace = {k: np.broadcast_to(np.asarray(v).T, (n_chains, n_keep)) for k, v in trace.items()}
+    trace_coords = {constants.CHAIN: np.arange(n_chains), constants.DRAW: np.arange(n_keep)}
+    trace_dims = {k: [constants.CHAIN, constants.DRAW] for k in mcmc_trace}
+    infdata_trace = az.convert_to_inference_data(
+        mcmc_trace, coords=trace_coords, dims=trace_dims, group="trace"
+    )
+
+    sample_stats = {
+        constants.SAMPLE_STATS_METRICS[k]: v
+        for k, v in mcmc_trace.items()
+        if k in constants.SAMPLE_STATS_METRICS
+    }
+    infdata_sample_stats = az.convert_to_inference_data(
+        sample_stats,
+        coords=trace_coords,
+        dims={k: [constants.CHAIN, constants.DRAW] for k in sample_stats},
+        group="sample_stats",
+    )
+    return az.concat(infdata_posterior, infdata_trace, infdata_sample_stats)
+
+
+def _segment_path(output_dir, segment):
+    return checkpoint_path(output_dir, f"segment_{segment:04d}.npz")
+
+
+def _discard_stale_segments(output_dir, n_segments):
+    """
+    Remove segment files at or above n_segments: a run killed after writing a
+    segment but before recording it in the progress file samples that segment again.
+    """
+    for segment_path in glob.glob(checkpoint_path(output_dir, "segment_*.npz")):
+        index = os.path.basename(segment_path)[len("segment_"):-len(".npz")]
+        if not index.isdigit() or int(index) >= n_segments:
+            os.remove(segment_path)
+
+
+def _load_segments(output_dir, n_segments):
+    """Concatenate the n_segments recorded segments along the draw axis"""
+    states, trace = {}, {}
+    for segment in range(n_segments):
+        arrays = _load_npz(_segment_path(output_dir, segment))
+        for key, value in arrays.items():
+            group, name = key.split("/", 1)
+            target = states if group == "state" else trace
+            target.setdefault(name, []).append(value)
+    states = {k: np.concatenate(v, axis=0) for k, v in states.items()}
+    trace = {k: np.concatenate(v, axis=0) for k, v in trace.items()}
+    return states, trace
+
+
+def convergence_diagnostics(states, n_burnin):
+    """Worst-case split R-hat and bulk/tail ESS over every element of every kept parameter"""
+    import arviz as az
+    from meridian import constants
+
+    kept = {
+        k: np.swapaxes(v[n_burnin:], 0, 1)
+        for k, v in states.items()
+        if k not in constants.UNSAVED_PARAMETERS
+    }
+    dataset = az.convert_to_dataset(kept)
+
+    def _reduce(result, fn):
+        values = [np.asarray(result[k].values, dtype=float).ravel() for k in result.data_vars]
+        values = np.concatenate(values) if values else np.array([np.nan])
+        # Constant parameters (e.g. the baseline geo) give NaN diagnostics
+        values = values[np.isfinite(values)]
+        return float(fn(values)) if values.size else float("nan")
+
+    return {
+        "n_keep": int(next(iter(kept.values())).shape[1]) if kept else 0,
+        "max_rhat": _reduce(az.rhat(dataset), np.max),
+        "min_ess_bulk": _reduce(az.ess(dataset, method="bulk"), np.min),
+        "min_ess_tail": _reduce(az.ess(dataset, method="tail"), np.min),
+    }
+
+
+def _is_converged(diagnostics, adaptive):
+    return (
+        diagnostics["max_rhat"] < adaptive.get("rhat_target", 1.01)
+        and diagnostics["min_ess_bulk"] >= adaptive.get("ess_target", 400)
+        and diagnostics["min_ess_tail"] >= adaptive.get("ess_target", 400)
+    )
+
+
+def warm_start_state(mmm, previous_dir, n_chains, seed=None):
+    """
+    Initial MCMC state of mmm from the last draw of each chain of a previous
+    model's posterior, and that run's final step size.
+
+    The previous model must have the same channels, geos and controls; it may
+    cover fewer time periods. The trend knots are re-read from the previous
+    mu_t at the new knot locations (the last value carries over new periods),
+    and every deterministic parameter (mu_t, beta_m under ROI priors, ...) is
+    recomputed on the new data. Parameters that cannot be mapped are drawn
+    from the prior. Returns (state, step_size) as numpy arrays of shape (n_chains, ...).
+    """
+    from meridian import backend, constants
+    from artifact import open_group
+
+    posterior = open_group(previous_dir, "posterior")
+    last = {name: np.asarray(posterior[name].isel(draw=-1).values) for name in posterior.data_vars}
+    chains = np.arange(n_chains) % next(iter(last.values())).shape[0]
+    last = {name: values[chains] for name, values in last.items()}
+
+    if "tau_g" in last:
+        last[constants.TAU_G_EXCL_BASELINE] = np.delete(last["tau_g"], mmm.baseline_geo_idx, axis=-1)
+    for dev, geo_level, center, scale in _GEO_DEVIATIONS:
+        if not all(name in last for name in (geo_level, center, scale)):
+            continue
+        values = last[geo_level]
+        if dev.startswith("beta") and mmm.media_effects_dist == constants.MEDIA_EFFECTS_LOG_NORMAL:
+            values = np.log(values)
+        scales = last[scale][:, None, :]
+        last[dev] = np.divide(values - last[center][:, None, :], scales,
+                              out=np.zeros_like(values), where=scales != 0)
+    if "mu_t" in last:
+        old_times = np.arange(last["mu_t"].shape[-1])
+        knot_locations = np.asarray(mmm.knot_info.knot_locations, dtype=np.float64)
+        last["knot_values"] = np.stack([np.interp(knot_locations, old_times, mu_t) for mu_t in last["mu_t"]])
+
+    rng = backend.RNGHandler(seed)
+    joint_dist = mmm.posterior_sampler_callable._get_joint_dist_unpinned()
+    distributions, prior = joint_dist.sample_distributions(n_chains, seed=rng.get_next_seed())
+    prior = prior._asdict()
+    free, redrawn = {}, []
+    for name, distribution in distributions._asdict().items():
+        if name == "y" or isinstance(distribution, backend.tfd.Deterministic):
+            continue
+        if name in last and last[name].shape == tuple(np.shape(prior[name])):
+            free[name] = last[name].astype(np.float32)
+        else:
+            redrawn.append(name)
+    if redrawn:
+        print(f"⚠️  Warm start: {', '.join(redrawn)} not in the previous posterior, drawn from the prior")
+
+    # Sampling with the free parameters given recomputes the deterministic ones
+    state = joint_dist.sample(n_chains, seed=rng.get_next_seed(), **free)._asdict()
+    state = {name: np.asarray(values) for name, values in state.items() if name != "y"}
+
+    step_size = None
+    try:
+        trace = open_group(previous_dir, "trace", variables=[constants.STEP_SIZE])
+        step_size = float(np.mean(trace[constants.STEP_SIZE].isel(draw=-1).values))
+    except KeyError:
+        pass
+    return state, step_size
+
+
+def warm_sampling(sampling):
+    """Sampling settings of a warm-started run: short adaptation and burn-in, same kept draws"""
+    warm = sampling.get("warm_start") or {}
+    n_adapt = warm.get("n_adapt", DEFAULT_WARM_ADAPT)
+    return {
+        **sampling,
+        "n_adapt": n_adapt,
+        "n_burnin": warm.get("n_burnin", DEFAULT_WARM_BURNIN),
+        "resume_adapt": n_adapt,
+    }
+
+
+def seed_warm_start(mmm, previous_dir, output_dir, n_chains, seed=None):
+    """
+    Write the previous model's final state as the checkpoint kernel state of
+    output_dir, so that sample_posterior_in_segments starts from it. An
+    existing checkpoint (interrupted warm run) is left as is.
+    """
+    state_path = checkpoint_path(output_dir, STATE_FILE)
+    if load_progress(output_dir) is not None or os.path.exists(state_path):
+        return
+    state, step_size = warm_start_state(mmm, previous_dir, n_chains, seed=seed)
+    if step_size is not None:
+        state["__step_size__"] = np.asarray(step_size)
+    os.makedirs(checkpoint_path(output_dir), exist_ok=True)
+    _save_npz(state_path, state)
+    print(f"🔥 Warm start from {os.path.basename(os.path.normpath(previous_dir))}")
+
+
+def sample_posterior_in_segments(mmm, sampling, output_dir, run_info=None, seed=None):
+    """
+    Run posterior sampling in segments, checkpointed to `<output_dir>/checkpoint/`.
+
+    Segment length is `sampling["checkpoint_every"]`. With a `sampling["adaptive"]`
+    block, segments are `adaptive.block_size` draws long and sampling stops as soon
+    as R-hat and bulk/tail ESS reach their targets (or `adaptive.max_keep` is hit).
+    Returns a summary dict (draws kept, convergence diagnostics).
+    """
+    from meridian import constants
+
+    n_chains = sampling["n_chains"]
+    n_adapt = sampling["n_adapt"]
+    n_burnin = sampling["n_burnin"]
+    adaptive = sampling.get("adaptive")
+    if adaptive:
+        max_keep = adaptive.get("max_keep", sampling["n_keep"])
+        min_keep = adaptive.get("min_keep", 0)
+        segment_size = adaptive.get("block_size", sampling.get("checkpoint_every") or 250)
+    else:
+        max_keep = sampling["n_keep"]
+        min_keep = max_keep
+        segment_size = sampling.get("checkpoint_every") or (n_burnin + max_keep)
+    total_draws = n_burnin + max_keep
+
+    os.makedirs(checkpoint_path(output_dir), exist_ok=True)
+    progress = load_progress(output_dir)
+    if progress is None:
+        progress = {
+            "run": run_info or {},
+            "n_chains": n_chains,
+            "n_adapt": n_adapt,
+            "n_burnin": n_burnin,
+            "n_keep": max_keep,
+            "adaptive": bool(adaptive),
+            "segment_size": segment_size,
+            "resume_adapt": sampling.get("resume_adapt", DEFAULT_RESUME_ADAPT),
+            "n_segments": 0,
+            "n_drawn": 0,
+            "diagnostics": [],
+            "complete": False,
+        }
+        _write_progress(output_dir, progress)
+    elif (progress["n_chains"], progress["n_burnin"], progress["n_keep"]) != (n_chains, n_burnin, max_keep):
+        raise ValueError(
+            f"Checkpoint in {output_dir} was created with different sampling settings; "
+            "remove the checkpoint folder to restart"
+        )
+    else:
+        print(f"⏯️  Resuming sampling: {progress['n_drawn']}/{total_draws} draws done "
+              f"({progress['n_segments']} segment(s))")
+
+    if hasattr(mmm, "_run_model_fitting_guardrail"):
+        mmm._run_model_fitting_guardrail()
+
+    # Only segments recorded in the progress file count; draws so far stay in
+    # memory too, so adaptive checks don't re-read every segment
+    _discard_stale_segments(output_dir, progress["n_segments"])
+    all_states, all_trace = _load_segments(output_dir, progress["n_segments"])
+    base_seed = seed if seed is not None else 0
+    while progress["n_drawn"] < total_draws and not progress["complete"]:
+        segment = progress["n_segments"]
+        n_draws = min(progress["segment_size"], total_draws - progress["n_drawn"])
+
+        state_path = checkpoint_path(output_dir, STATE_FILE)
+        if os.path.exists(state_path):
+            saved = _load_npz(state_path)
+            # A warm-start state may come without a step size (no trace in the previous artifact)
+            init_step_size = saved.pop("__step_size__", None)
+            init_step_size = float(init_step_size) if init_step_size is not None else None
+            current_state = saved
+            segment_adapt = progress["resume_adapt"]
+        else:
+            init_step_size = None
+            current_state = None
+            segment_adapt = n_adapt
+
+        print(f"🔗 Segment {segment + 1}: {n_draws} draws "
+              f"({segment_adapt} adaptation steps, {progress['n_drawn']}/{total_draws} done)")
+        states, trace = _run_segment(
+            mmm, n_chains, segment_adapt, n_draws,
+            current_state=current_state,
+            init_step_size=init_step_size,
+            seed=[base_seed, segment],
+        )
+
+        # Persist draws first, then the kernel state, then the progress marker:
+        # an interruption at any point leaves a consistent (possibly older) checkpoint,
+        # since segments not yet recorded in the progress file are discarded on resume.
+        saved_states = {k: v for k, v in states.items() if k not in constants.UNSAVED_PARAMETERS}
+        segment_arrays = {f"state/{k}": v for k, v in saved_states.items()}
+        segment_arrays.update({f"trace/{k}": v for k, v in trace.items()})
+        _save_npz(_segment_path(output_dir, segment), segment_arrays)
+
+        last_state = {k: v[-1] for k, v in states.items()}
+        last_state["__step_size__"] = np.asarray(np.mean(trace[constants.STEP_SIZE][-1]))
+        _save_npz(state_path, last_state)
+
+        for k, v in saved_states.items():
+            all_states[k] = np.concatenate([all_states[k], v], axis=0) if k in all_states else v
+        for k, v in trace.items():
+            all_trace[k] = np.concatenate([all_trace[k], v], axis=0) if k in all_trace else v
+
+        progress["n_segments"] = segment + 1
+        progress["n_drawn"] += n_draws
+
+        n_kept = progress["n_drawn"] - n_burnin
+        if adaptive and n_kept > 0 and n_kept >= min_keep:
+            diagnostics = convergence_diagnostics(all_states, n_burnin)
+            progress["diagnostics"].append(diagnostics)
+            print(f"   📏 R-hat max {diagnostics['max_rhat']:.4f}, "
+                  f"ESS bulk min {diagnostics['min_ess_bulk']:.0f}, "
+                  f"ESS tail min {diagnostics['min_ess_tail']:.0f}")
+            if _is_converged(diagnostics, adaptive):
+                print(f"✓ Convergence targets met after {n_kept} kept draws (cap {max_keep})")
+                progress["complete"] = True
+        _write_progress(output_dir, progress)
+
+    n_keep = progress["n_drawn"] - n_burnin
+    states = {k: v[n_burnin:] for k, v in all_states.items()}
+    trace = {k: v[n_burnin:] for k, v in all_trace.items()}
+    mmm.inference_data.extend(
+        _to_inference_data(mmm, states, trace, n_chains, n_keep), join="right"
+    )
+
+    progress["complete"] = True
+    _write_progress(output_dir, progress)
+    print(f"✓ Sampling complete: {n_chains} chains × {n_keep} draws")
+
+    summary = {"n_keep": n_keep, "n_segments": progress["n_segments"]}
+    if adaptive:
+        summary["converged"] = bool(progress["diagnostics"]) and _is_converged(progress["diagnostics"][-1], adaptive)
+        summary["diagnostics"] = progress["diagnostics"][-1] if progress["diagnostics"] else None
+    return summary
+
+
+def clear_checkpoint(output_dir):
+    """Remove the checkpoint folder once the model has been saved"""
+    shutil.rmtree(checkpoint_path(output_dir), ignore_errors=True)
@@ -1,64 +1,19 @@
 import os
-import hashlib
 import pickle
 import argparse
 import yaml
 from pathlib import Path
 from datetime import datetime
 
-import pandas as pd
-
 from run import build_model_and_sample, load_config_and_data, setup_seed, generate_html_report
+from registry import register_model, query_models
+from fingerprint import compute_data_hash
 
 # Get POC directory (parent of scripts directory)
 SCRIPT_DIR = Path(__file__).parent.absolute()
 POC_DIR = SCRIPT_DIR.parent.absolute()
 
 
-def compute_data_hash(df: pd.DataFrame, config_data: dict) -> str:
-    """
-    Calcule un hash unique basé sur les données et la configuration du modèle.
-    Cela permet d'identifier de manière unique un modèle par ses données d'entraînement.
-    """
-    # Créer une chaîne unique combinant :
-    # - Le hash des données (premiers et derniers éléments pour performance)
-    # - La configuration du modèle
-    # - Les colonnes utilisées
-    
-    coord = config_data["coord_to_columns"]
-    model_config = config_data["model_config"]
-    
-    # Informations sur les données
-    data_info = {
-        "shape": df.shape,
-        "columns": sorted(df.columns.tolist()),
-        "time_col": coord.time,
-        "kpi_col": coord.kpi,
-        "geo_col": coord.geo,
-        "media_cols": sorted(coord.media) if coord.media else [],
-        "media_spend_cols": sorted(coord.media_spend) if coord.media_spend else [],
-        "date_range": {
-            "start": str(df[coord.time].min()),
-            "end": str(df[coord.time].max()),
-        },
-        # Hash des valeurs (échantillon pour performance)
-        "data_hash": pd.util.hash_pandas_object(df).sum(),
-    }
-    
-    # Configuration du modèle
-    model_info = {
-        "kpi_type": model_config["kpi_type"],
-        "model_params": model_config.get("model", {}),
-        "sampling": model_config.get("sampling", {}),
-    }
-    
-    # Créer une chaîne combinée et calculer le hash
-    combined_str = str(data_info) + str(model_info)
-    data_hash = hashlib.sha256(combined_str.encode()).hexdigest()[:16]  # 16 caractères suffisent
-    
-    return data_hash
-
-
 def save_model_with_report(config_file=None, data_file=None):
     """
     Entraîne un modèle, le sauvegarde dans outputs/models/{date_creation}/,
@@ -128,6 +83,8 @@ def save_model_with_report(config_file=None, data_file=None):
         yaml.dump(metadata, f, default_flow_style=False, allow_unicode=True)
     print(f"✓ Métadonnées sauvegardées dans: {metadata_path}")
     
+    register_model(output_base_dir, metadata)
+    
     # Générer uniquement le report_data.html
     print("\n" + "="*60)
     print("📄 GÉNÉRATION DU RAPPORT HTML")
@@ -146,36 +103,11 @@ def save_model_with_report(config_file=None, data_file=None):
 
 
 def list_saved_models():
-    """Liste tous les modèles sauvegardés dans outputs/models/"""
-    models_dir = os.path.join(POC_DIR, "outputs", "models")
-    
-    if not os.path.exists(models_dir):
+    """Liste tous les modèles sauvegardés dans outputs/models/ (via le registre)"""
+    models = query_models()
+    if not models:
         print("❌ Aucun modèle sauvegardé pour le moment.")
-        return []
-    
-    models = []
-    for model_folder in os.listdir(models_dir):
-        model_path = os.path.join(models_dir, model_folder)
-        if os.path.isdir(model_path):
-            metadata_path = os.path.join(model_path, "metadata.yaml")
-            if os.path.exists(metadata_path):
-                with open(metadata_path, 'r') as f:
-                    metadata = yaml.safe_load(f)
-                models.append({
-                    "folder": model_folder,
-                    "path": model_path,
-                    "metadata": metadata,
-                })
-            else:
-                # Si pas de metadata, utiliser le nom du dossier comme date
-                models.append({
-                    "folder": model_folder,
-                    "path": model_path,
-                    "metadata": {"created_at": model_folder},
-                })
-    
-    # Trier par date de création (plus récent en premier)
-    return sorted(models, key=lambda x: x["folder"], reverse=True)
+    return models
 
 
 def display_saved_models():
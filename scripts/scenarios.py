@@ -0,0 +1,418 @@
+"""
+Posterior what-if engine for budget scenarios.
+
+`build_engine(mmm)` extracts, once, everything the expected KPI depends on:
+the posterior draws of the media parameters (alpha, ec, slope, beta_gm), the
+media-independent part of the KPI (tau_g + mu_t + controls, per draw) and the
+model's scaling constants. `evaluate_scenarios(engine, spend)` then applies
+adstock + Hill to a whole batch of spend matrices against every kept draw in
+NumPy, with the same formulas as Meridian's adstock_hill_media, and returns
+the expected outcome of each scenario with credible intervals.
+
+The engine is saved as scenario_engine.npz in the model folder, so later
+sessions answer scenarios without TensorFlow or the model itself. Latency is
+controlled by thinning the posterior (`max_draws`).
+
+Scenario spend has shape (n_scenarios, n_channels, n_times, n_geos). Media
+execution follows spend proportionally to the historical media/spend ratio of
+each geo and channel (identical when spend is used as media, as in our configs).
+"""
+
+import os
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from metrics import summarize_draws, DEFAULT_CONFIDENCE_LEVEL
+
+SCENARIO_ENGINE_FILE = "scenario_engine.npz"
+ENGINE_VERSION = 1
+DEFAULT_MAX_DRAWS = 500  # Stored in the engine
+INTERACTIVE_MAX_DRAWS = 200  # Used by the command line
+# Upper bound of the (scenarios × draws × geos × times × channels) block evaluated at once
+CHUNK_ELEMENTS = 2 ** 23
+
+
+def thin_indices(n_draws, max_draws=None):
+    """Evenly spaced indices of at most max_draws draws out of n_draws"""
+    if not max_draws or max_draws >= n_draws:
+        return np.arange(n_draws)
+    return np.unique(np.linspace(0, n_draws - 1, max_draws).round().astype(int))
+
+
+def _flat_draws(posterior, name):
+    """(chain, draw, ...) posterior variable as a (chain × draw, ...) array"""
+    values = np.asarray(posterior[name].values)
+    return values.reshape((-1,) + values.shape[2:])
+
+
+def _as_array(tensor):
+    return None if tensor is None else np.asarray(tensor, dtype=np.float64)
+
+
+def build_engine(mmm, max_draws=DEFAULT_MAX_DRAWS):
+    """Extract the arrays needed to evaluate spend scenarios from a sampled Meridian model"""
+    if mmm.n_rf_channels or mmm.n_organic_media_channels or mmm.n_organic_rf_channels:
+        raise ValueError("Scenario engine supports paid media channels only (no reach/frequency or organic channels)")
+    if mmm.n_media_times != mmm.n_times:
+        raise ValueError("Scenario engine needs media and KPI on the same time periods (no lagged media history)")
+
+    posterior = mmm.inference_data.posterior
+    n_total = posterior.sizes["chain"] * posterior.sizes["draw"]
+    idx = thin_indices(n_total, max_draws)
+
+    def draws(name):
+        return _flat_draws(posterior, name)[idx].astype(np.float64)
+
+    population = _as_array(mmm.population)
+    tau_g = draws("tau_g")
+    mu_t = draws("mu_t")
+    # Media-independent part of the scaled KPI, per draw: (draws, geos, times)
+    other = tau_g[:, :, None] + mu_t[:, None, :]
+    if mmm.controls_scaled is not None:
+        other += np.einsum("gtc,dgc->dgt", _as_array(mmm.controls_scaled), draws("gamma_gc"))
+    if mmm.non_media_treatments_normalized is not None:
+        other += np.einsum("gtn,dgn->dgt", _as_array(mmm.non_media_treatments_normalized), draws("gamma_gn"))
+
+    revenue_per_kpi = mmm.revenue_per_kpi
+    if revenue_per_kpi is None or mmm.input_data.kpi_type == "revenue":
+        revenue_per_kpi = np.ones((mmm.n_geos, mmm.n_times))
+    decay = mmm.adstock_decay_spec.media
+    decay = [decay] * mmm.n_media_channels if isinstance(decay, str) else list(decay)
+
+    media_transformer = mmm.media_tensors.media_transformer
+    input_data = mmm.input_data
+    return {
+        "version": ENGINE_VERSION,
+        "channels": [str(c) for c in input_data.media_channel.values],
+        "geos": [str(g) for g in input_data.geo.values],
+        "times": [str(t) for t in input_data.time.values],
+        "max_lag": int(mmm.model_spec.max_lag),
+        "hill_before_adstock": bool(mmm.model_spec.hill_before_adstock),
+        "decay_functions": decay,
+        # Historical inputs, (geos, times, channels)
+        "media": _as_array(mmm.media_tensors.media),
+        "spend": _as_array(mmm.media_tensors.media_spend),
+        # media_scaled = media / (population_g × median_m)
+        "scale_gm": np.einsum("g,m->gm", population, _as_array(media_transformer.population_scaled_median_m)),
+        # outcome_gt = (kpi_scaled × stdev + mean) × population_g × revenue_per_kpi_gt
+        "outcome_weight_gt": (
+            float(np.asarray(mmm.kpi_transformer.population_scaled_stdev))
+            * population[:, None] * _as_array(revenue_per_kpi)
+        ),
+        "outcome_offset_gt": (
+            float(np.asarray(mmm.kpi_transformer.population_scaled_mean))
+            * population[:, None] * _as_array(revenue_per_kpi)
+        ),
+        "other_dgt": other,
+        "alpha_dm": draws("alpha_m"),
+        "ec_dm": draws("ec_m"),
+        "slope_dm": draws("slope_m"),
+        "beta_dgm": draws("beta_gm"),
+    }
+
+
+def save_npz(path, arrays):
+    """
+    Compressed .npz written through a temporary file of its own in the same folder,
+    then renamed: concurrent writers (scenarios.py and optimize.py building the same
+    engine) never share a temporary file, and readers never see a partial one.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def save_engine(engine, model_dir):
+    path = os.path.join(model_dir, SCENARIO_ENGINE_FILE)
+    return save_npz(path, {key: np.asarray(value) for key, value in engine.items()})
+
+
+def load_engine(model_dir, max_draws=None):
+    """Load a saved engine, optionally thinned further to max_draws"""
+    with np.load(os.path.join(model_dir, SCENARIO_ENGINE_FILE)) as data:
+        engine = {key: data[key] for key in data.files}
+    if int(engine["version"]) != ENGINE_VERSION:
+        raise ValueError(f"{SCENARIO_ENGINE_FILE} has version {int(engine['version'])}, expected {ENGINE_VERSION}")
+    for key in ["channels", "geos", "times", "decay_functions"]:
+        engine[key] = [str(v) for v in engine[key]]
+    for key in ["max_lag", "version"]:
+        engine[key] = int(engine[key])
+    engine["hill_before_adstock"] = bool(engine["hill_before_adstock"])
+    return thin_engine(engine, max_draws)
+
+
+def thin_engine(engine, max_draws=None):
+    """Engine restricted to at most max_draws evenly spaced draws"""
+    idx = thin_indices(len(engine["alpha_dm"]), max_draws)
+    if len(idx) == len(engine["alpha_dm"]):
+        return engine
+    thinned = dict(engine)
+    for key in ["other_dgt", "alpha_dm", "ec_dm", "slope_dm", "beta_dgm"]:
+        thinned[key] = engine[key][idx]
+    return thinned
+
+
+def get_engine(model_dir, max_draws=DEFAULT_MAX_DRAWS, model_loader=None):
+    """Saved engine of a model folder, built (and saved) from the model on first use"""
+    if os.path.exists(os.path.join(model_dir, SCENARIO_ENGINE_FILE)):
+        return load_engine(model_dir, max_draws)
+    if model_loader is None:
+        from artifact import load_model
+        model_loader = lambda: load_model(model_dir)
+    engine = build_engine(model_loader(), max_draws=max_draws)
+    save_engine(engine, model_dir)
+    return engine
+
+
+def decay_weights(alpha, window_size, decay_functions):
+    """Normalized adstock weights (draws, channels, window), oldest lag first as in Meridian"""
+    l_range = np.arange(window_size - 1, -1, -1, dtype=np.float64)
+    geometric = alpha[..., None] ** l_range
+    with np.errstate(divide="ignore"):
+        binomial = (1.0 - l_range / window_size) ** (1.0 / alpha[..., None] - 1.0)
+    is_binomial = np.array([d == "binomial" for d in decay_functions])[:, None]
+    weights = np.where(is_binomial, binomial, geometric)
+    return weights / weights.sum(axis=-1, keepdims=True)
+
+
+def _adstock(x, weights):
+    """Adstock over the time axis of x (scenarios, draws or 1, geos, times, channels)"""
+    window = weights.shape[-1]
+    pad = np.zeros(x.shape[:3] + (window - 1,) + x.shape[4:], dtype=x.dtype)
+    windows = sliding_window_view(np.concatenate([pad, x], axis=3), window, axis=3)
+    if x.shape[1] == 1:
+        return np.einsum("sgtmw,dmw->sdgtm", windows[:, 0], weights, optimize=True)
+    return np.einsum("sdgtmw,dmw->sdgtm", windows, weights, optimize=True)
+
+
+def _hill(x, ec, slope):
+    """x^s / (x^s + ec^s), as 1 / (1 + exp(s·(log ec − log x))): one exp per element instead of two powers"""
+    with np.errstate(divide="ignore", over="ignore"):
+        out = np.log(x) * -slope[None, :, None, None, :]
+        out += (slope * np.log(ec))[None, :, None, None, :]
+        np.exp(out, out=out)
+    out += 1.0
+    return np.reciprocal(out, out=out)
+
+
+def media_per_spend(engine):
+    """
+    Media units per unit of spend, (geos, times, channels): the historical ratio
+    of each cell, or the channel's average where the cell had no spend
+    """
+    hist_spend, hist_media = engine["spend"], engine["media"]
+    per_spend_gm = np.divide(
+        hist_media.sum(axis=1), hist_spend.sum(axis=1),
+        out=np.ones_like(engine["scale_gm"]), where=hist_spend.sum(axis=1) > 0,
+    )
+    ratio = np.broadcast_to(per_spend_gm[:, None, :], hist_media.shape).copy()
+    return np.divide(hist_media, hist_spend, out=ratio, where=hist_spend > 0)
+
+
+def scenario_media_scaled(engine, spend, ratio=None):
+    """(scenarios, channels, times, geos) spend → scaled media (scenarios, geos, times, channels)"""
+    ratio = media_per_spend(engine) if ratio is None else ratio
+    spend = np.asarray(spend, dtype=np.float64).transpose(0, 3, 2, 1)
+    return spend * (ratio / engine["scale_gm"][:, None, :])[None]
+
+
+def _time_mask(engine, time_mask=None):
+    n_times = len(engine["times"])
+    return np.ones(n_times, dtype=bool) if time_mask is None else np.asarray(time_mask, dtype=bool)
+
+
+def media_effect_draws(engine, spend, time_mask=None, per_channel=False,
+                       chunk_elements=CHUNK_ELEMENTS, workers=None):
+    """
+    Paid media part of the outcome of each scenario and draw, summed over geos
+    and the selected times: (scenarios, draws), or (scenarios, draws, channels)
+    with per_channel=True. Work is split into (scenario, draw) blocks of at most
+    chunk_elements media cells, transformed in float32 and spread over
+    `workers` threads (NumPy releases the GIL).
+    """
+    n_scenarios, n_channels, n_times, n_geos = np.shape(spend)
+    n_draws = len(engine["alpha_dm"])
+    mask = _time_mask(engine, time_mask)
+    ratio = media_per_spend(engine)
+
+    window = min(engine["max_lag"] + 1, n_times)
+    weights = decay_weights(engine["alpha_dm"], window, engine["decay_functions"]).astype(np.float32)
+    ec, slope = engine["ec_dm"].astype(np.float32), engine["slope_dm"].astype(np.float32)
+    # beta_gm × outcome weight of each selected (geo, time): (draws, geos × times, channels)
+    n_cells = n_geos * n_times
+    effect_weight = (engine["beta_dgm"][:, :, None, :]
+                     * np.where(mask, engine["outcome_weight_gt"], 0.0)[None, :, :, None])
+    effect_weight = effect_weight.reshape(n_draws, n_cells, n_channels).astype(np.float32)
+
+    out = np.empty((n_scenarios, n_draws, n_channels) if per_channel else (n_scenarios, n_draws))
+    per_draw = n_cells * n_channels
+    draw_chunk = max(1, min(n_draws, chunk_elements // per_draw))
+    scenario_chunk = max(1, chunk_elements // (per_draw * draw_chunk))
+
+    def run_block(block):
+        s0, d0 = block
+        s1, d1 = min(s0 + scenario_chunk, n_scenarios), min(d0 + draw_chunk, n_draws)
+        x = scenario_media_scaled(engine, spend[s0:s1], ratio).astype(np.float32)[:, None]
+        if engine["hill_before_adstock"]:
+            transformed = _adstock(_hill(x, ec[d0:d1], slope[d0:d1]), weights[d0:d1])
+        else:
+            transformed = _hill(_adstock(x, weights[d0:d1]), ec[d0:d1], slope[d0:d1])
+        transformed = transformed.reshape(s1 - s0, d1 - d0, n_cells, n_channels)
+        if per_channel:
+            out[s0:s1, d0:d1] = np.einsum("sdkm,dkm->sdm", transformed, effect_weight[d0:d1], optimize=True)
+        else:
+            # Batched over draws: (draws, scenarios, cells × channels) @ (draws, cells × channels, 1)
+            flat = transformed.reshape(s1 - s0, d1 - d0, -1).transpose(1, 0, 2)
+            out[s0:s1, d0:d1] = np.matmul(flat, effect_weight[d0:d1].reshape(d1 - d0, -1, 1))[..., 0].T
+
+    blocks = [(s0, d0) for s0 in range(0, n_scenarios, scenario_chunk) for d0 in range(0, n_draws, draw_chunk)]
+    workers = min(workers or os.cpu_count() or 1, len(blocks))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(run_block, blocks))
+    else:
+        for block in blocks:
+            run_block(block)
+    return out
+
+
+def outcome_draws(engine, spend, time_mask=None, workers=None):
+    """
+    Expected outcome (revenue, or KPI without revenue_per_kpi) of each scenario
+    and draw, summed over geos and the selected times: array (scenarios, draws).
+    """
+    mask = _time_mask(engine, time_mask)
+    # Media-independent part: (draws,), accumulated in float64
+    base = (np.einsum("dgt,gt->d", engine["other_dgt"][:, :, mask], engine["outcome_weight_gt"][:, mask])
+            + engine["outcome_offset_gt"][:, mask].sum())
+    return base[None, :] + media_effect_draws(engine, spend, mask, workers=workers)
+
+
+def spend_multipliers(engine, multipliers):
+    """
+    Scenario spend from historical spend scaled per channel:
+    multipliers is a list of {channel: factor} dicts (missing channels keep 1.0).
+    Returns an array (scenarios, channels, times, geos).
+    """
+    hist = engine["spend"].transpose(2, 1, 0)
+    factors = np.ones((len(multipliers), len(engine["channels"])))
+    for s, scenario in enumerate(multipliers):
+        for channel, factor in scenario.items():
+            if channel not in engine["channels"]:
+                raise KeyError(f"Unknown channel '{channel}' (channels: {', '.join(engine['channels'])})")
+            factors[s, engine["channels"].index(channel)] = factor
+    return factors[:, :, None, None] * hist[None]
+
+
+def evaluate_scenarios(engine, spend, time_mask=None, confidence_level=DEFAULT_CONFIDENCE_LEVEL):
+    """
+    Expected outcome of a batch of spend scenarios, against the historical spend.
+    Returns {"spend", "outcome", "incremental", "baseline"}: spend is the total
+    spend per scenario, outcome/incremental are {mean, median, ci_lo, ci_hi}
+    arrays over scenarios (incremental = scenario − historical spend, per draw).
+    """
+    hist = engine["spend"].transpose(2, 1, 0)[None]
+    draws = outcome_draws(engine, np.concatenate([hist, np.asarray(spend, dtype=np.float64)]), time_mask)
+    baseline, scenarios = draws[0], draws[1:]
+    # summarize_draws reduces over (chains, draws): draws go first
+    return {
+        "spend": np.asarray(spend, dtype=np.float64).sum(axis=(1, 2, 3)),
+        "outcome": summarize_draws(scenarios.T[None], confidence_level),
+        "incremental": summarize_draws((scenarios - baseline[None]).T[None], confidence_level),
+        "baseline": summarize_draws(baseline[None, :, None], confidence_level),
+    }
+
+
+def _parse_change(text):
+    """'TikTok=+20%' / 'TikTok=1.2' → ('TikTok', 1.2)"""
+    channel, _, value = text.rpartition("=")
+    if not channel:
+        raise argparse.ArgumentTypeError(f"Expected CHANNEL=FACTOR or CHANNEL=±PCT%, got '{text}'")
+    value = value.strip()
+    factor = 1.0 + float(value[:-1]) / 100.0 if value.endswith("%") else float(value)
+    return channel, factor
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Evaluate budget what-if scenarios against a saved model's posterior",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # TikTok +20% on the most recent model
+  python scripts/scenarios.py --change TikTok=+20%
+
+  # Several scenarios at once (one per --scenario, comma-separated changes)
+  python scripts/scenarios.py --model 2025-11-21_11-24-58 \\
+      --scenario "TikTok=+20%" --scenario "TikTok=+20%,Facebook=-20%" --scenario "Google Ads=0"
+
+  # Faster answers from fewer posterior draws
+  python scripts/scenarios.py --change Facebook=1.5 --max-draws 100
+        """
+    )
+    parser.add_argument("--model", type=str, default=None, help="Model folder name. Default: most recent model")
+    parser.add_argument("--change", action="append", default=[], type=_parse_change, metavar="CHANNEL=CHANGE",
+                        help="Spend change of one channel in a single scenario (repeatable)")
+    parser.add_argument("--scenario", action="append", default=[], metavar="CHANGES",
+                        help="One scenario as comma-separated CHANNEL=CHANGE items (repeatable)")
+    parser.add_argument("--max-draws", type=int, default=INTERACTIVE_MAX_DRAWS,
+                        help=f"Posterior draws used (at most {DEFAULT_MAX_DRAWS} are stored). "
+                             f"Default: {INTERACTIVE_MAX_DRAWS}")
+    parser.add_argument("--rebuild", action="store_true", help=f"Rebuild {SCENARIO_ENGINE_FILE} from the model")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from registry import query_models
+
+    args = parse_args()
+    scenarios = [dict(_parse_change(item) for item in s.split(",") if item.strip()) for s in args.scenario]
+    if args.change:
+        scenarios.append(dict(args.change))
+    if not scenarios:
+        print("❌ No scenario given (use --change or --scenario)")
+        exit(1)
+
+    models = query_models(with_model=True)
+    if args.model:
+        models = [m for m in models if m["folder"] == args.model]
+    if not models:
+        print("❌ No saved model found")
+        exit(1)
+    model_info = models[0]
+
+    start = time.perf_counter()
+    if args.rebuild and os.path.exists(os.path.join(model_info["path"], SCENARIO_ENGINE_FILE)):
+        os.remove(os.path.join(model_info["path"], SCENARIO_ENGINE_FILE))
+    engine = thin_engine(get_engine(model_info["path"]), args.max_draws)
+    loaded = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = evaluate_scenarios(engine, spend_multipliers(engine, scenarios))
+    elapsed = time.perf_counter() - start
+
+    baseline = results["baseline"]
+    print(f"📅 Model: {model_info['folder']}  ({len(engine['alpha_dm'])} draws, engine loaded in {loaded:.2f}s)")
+    print(f"📊 Historical spend: expected outcome {baseline['mean'][0]:,.0f} "
+          f"[{baseline['ci_lo'][0]:,.0f}, {baseline['ci_hi'][0]:,.0f}]\n")
+    for s, scenario in enumerate(scenarios):
+        label = ", ".join(f"{c} ×{f:.2f}" for c, f in scenario.items())
+        inc = {stat: values[s] for stat, values in results["incremental"].items()}
+        print(f"  🔮 {label}")
+        print(f"     Outcome: {results['outcome']['mean'][s]:,.0f}   "
+              f"Δ vs historical: {inc['mean']:+,.0f} [{inc['ci_lo']:+,.0f}, {inc['ci_hi']:+,.0f}]   "
+              f"spend: {results['spend'][s]:,.0f}")
+    print(f"\n⏱️  {len(scenarios)} scenario(s) evaluated in {elapsed * 1000:.0f} ms")
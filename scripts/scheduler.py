@@ -0,0 +1,497 @@
+"""
+Local job queue and scheduler for training runs (outputs/jobs.sqlite).
+
+Jobs are (config file, dataset) training runs submitted with a priority and
+a resource request (cores, memory). The daemon (`--daemon`) starts queued
+jobs as separate processes, highest priority first, whenever the request
+fits in what is left of the host:
+  - cores: the sum of running requests stays within --max-cpus;
+  - memory: the request fits both the --max-memory-gb budget left by
+    running jobs and the memory the system currently reports available.
+A job that does not fit is skipped for lower-priority jobs that do
+(backfilling), so small jobs keep the host busy while a large one waits;
+the highest-priority waiting job keeps its request reserved, so backfilled
+jobs only use what it leaves and it cannot be starved by a stream of
+small jobs.
+Each job runs `main_pipeline` with its TensorFlow thread pools sized to its
+core request and logs to outputs/jobs/<id>.log. Failed jobs are retried
+up to their retry count; queued or running jobs can be cancelled.
+Reports are deferred to the report queue (report_queue.py) so training
+slots are released as soon as the posterior is saved.
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import sqlite3
+import argparse
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - psutil is in requirements.txt
+    psutil = None
+
+# Get POC directory (parent of scripts directory)
+SCRIPT_DIR = Path(__file__).parent.absolute()
+POC_DIR = SCRIPT_DIR.parent.absolute()
+
+JOBS_FILE = os.path.join(POC_DIR, "outputs", "jobs.sqlite")
+LOG_DIR = os.path.join(POC_DIR, "outputs", "jobs")
+DEFAULT_JOB_CPUS = 4
+DEFAULT_JOB_MEMORY_GB = 4.0
+DEFAULT_RETRIES = 1
+DEFAULT_POLL_INTERVAL = 5  # Seconds between scheduling passes
+GB = 1024 ** 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    status       TEXT NOT NULL,
+    priority     INTEGER NOT NULL DEFAULT 0,
+    config_file  TEXT NOT NULL,
+    dataset_name TEXT,
+    options      TEXT NOT NULL,
+    cpus         INTEGER NOT NULL,
+    memory_gb    REAL NOT NULL,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    submitted_at TEXT NOT NULL,
+    started_at   TEXT,
+    finished_at  TEXT,
+    host         TEXT,
+    pid          INTEGER,
+    output_dir   TEXT,
+    exit_code    INTEGER,
+    error        TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, priority DESC, id);
+"""
+
+
+def connect(jobs_file=JOBS_FILE):
+    """Open the job database, creating the schema on first use"""
+    os.makedirs(os.path.dirname(jobs_file), exist_ok=True)
+    # Generous timeout: the daemon, job processes and the CLI write concurrently
+    conn = sqlite3.connect(jobs_file, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+    if "exit_code" not in columns:
+        # Queues created before job processes recorded their own exit status
+        conn.execute("ALTER TABLE jobs ADD COLUMN exit_code INTEGER")
+    return conn
+
+
+def _now():
+    return datetime.now().isoformat()
+
+
+def host_limits():
+    """(cores, memory in GB) of the whole host: the most a single job can ever get"""
+    from run import available_cpus
+
+    memory_gb = psutil.virtual_memory().total / GB if psutil is not None else float("inf")
+    return available_cpus(), memory_gb
+
+
+def _oversized(job, max_cpus, max_memory_gb):
+    """Why a job can never start within max_cpus / max_memory_gb (None if it can)"""
+    if job["cpus"] > max_cpus:
+        return f"requests {job['cpus']} cores, at most {max_cpus} available"
+    if job["memory_gb"] > max_memory_gb:
+        return f"requests {job['memory_gb']:g} GB, at most {max_memory_gb:.1f} GB available"
+    return None
+
+
+def submit_job(config_file, dataset_name=None, priority=0, cpus=DEFAULT_JOB_CPUS, memory_gb=DEFAULT_JOB_MEMORY_GB,
+               retries=DEFAULT_RETRIES, force=False, incremental=False, jobs_file=JOBS_FILE):
+    """Queue one training run and return its job id (ValueError if it can never fit on this host)"""
+    reason = _oversized({"cpus": int(cpus), "memory_gb": float(memory_gb)}, *host_limits())
+    if reason:
+        raise ValueError(f"Job {config_file} [{dataset_name}] {reason} on this host")
+    options = {"force": bool(force), "incremental": bool(incremental)}
+    conn = connect(jobs_file)
+    try:
+        cursor = conn.execute(
+            "INSERT INTO jobs (status, priority, config_file, dataset_name, options, cpus, memory_gb, "
+            "max_attempts, submitted_at) VALUES ('queued', ?, ?, ?, ?, ?, ?, ?, ?)",
+            (int(priority), config_file, dataset_name, json.dumps(options), int(cpus), float(memory_gb),
+             int(retries) + 1, _now()),
+        )
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+
+def list_jobs(status=None, jobs_file=JOBS_FILE):
+    conn = connect(jobs_file)
+    try:
+        sql = "SELECT * FROM jobs"
+        params = []
+        if status:
+            sql += " WHERE status = ?"
+            params.append(status)
+        return [dict(row) for row in conn.execute(sql + " ORDER BY id", params).fetchall()]
+    finally:
+        conn.close()
+
+
+def cancel_job(job_id, jobs_file=JOBS_FILE):
+    """Cancel a queued job, or terminate a running one. Returns its previous status (None if unknown)"""
+    conn = connect(jobs_file)
+    try:
+        row = conn.execute("SELECT status, pid, host FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row["status"] not in ("queued", "running"):
+            return row["status"] if row else None
+        conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ?", (_now(), job_id))
+        if row["status"] == "running" and row["pid"] and row["host"] == socket.gethostname():
+            try:
+                # The job runs in its own process group (see start_job)
+                os.killpg(row["pid"], signal.SIGTERM)
+            except (ProcessLookupError, PermissionError):
+                pass
+        return row["status"]
+    finally:
+        conn.close()
+
+
+def available_memory_gb():
+    """Memory the system reports available right now (None without psutil)"""
+    if psutil is None:
+        return None
+    return psutil.virtual_memory().available / GB
+
+
+def pick_jobs(queued, running, max_cpus, max_memory_gb, system_available_gb=None):
+    """
+    Queued jobs to start now, in priority order: each one must fit in the cores and
+    memory budget left by running jobs (and in the memory the system has available).
+    A job that does not fit is passed over for smaller ones (backfilling), but the first
+    such job reserves its request: later jobs only start in what is left beyond it,
+    so it starts as soon as enough running jobs finish.
+    """
+    free_cpus = max_cpus - sum(job["cpus"] for job in running)
+    free_memory = max_memory_gb - sum(job["memory_gb"] for job in running)
+    if system_available_gb is not None:
+        free_memory = min(free_memory, system_available_gb)
+    picked = []
+    reserved = None
+    for job in sorted(queued, key=lambda j: (-j["priority"], j["id"])):
+        if job["cpus"] <= free_cpus and job["memory_gb"] <= free_memory:
+            picked.append(job)
+            free_cpus -= job["cpus"]
+            free_memory -= job["memory_gb"]
+        elif reserved is None:
+            reserved = job
+            free_cpus -= job["cpus"]
+            free_memory -= job["memory_gb"]
+    return picked
+
+
+def start_job(conn, job):
+    """Start a job in its own process (and process group), logging to outputs/jobs/<id>.log"""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    threads = str(job["cpus"])
+    # TensorFlow/OpenMP pools sized to the core request, set before TF is imported
+    env = {**os.environ, "OMP_NUM_THREADS": threads, "TF_NUM_INTRAOP_THREADS": threads,
+           "TF_NUM_INTEROP_THREADS": str(min(2, job["cpus"]))}
+    with open(os.path.join(LOG_DIR, f"{job['id']}.log"), "a") as log:
+        log.write(f"\n=== attempt {job['attempts'] + 1} started {_now()} ===\n")
+        log.flush()
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(SCRIPT_DIR, "scheduler.py"), "--run-job", str(job["id"])],
+            cwd=POC_DIR, env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True,
+        )
+    conn.execute(
+        "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, host = ?, pid = ?, "
+        "exit_code = NULL, error = NULL WHERE id = ?",
+        (_now(), socket.gethostname(), process.pid, job["id"]),
+    )
+    return process
+
+
+def finish_job(conn, job_id, returncode):
+    """
+    Record the exit of a job process: done, retried while attempts remain, or failed.
+    returncode is None when the process ended without recording how (killed).
+    """
+    row = conn.execute("SELECT status, attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None or row["status"] != "running":
+        # Cancelled while running: keep that status
+        return row["status"] if row else None
+    if returncode == 0:
+        status, error = "done", None
+    else:
+        status = "queued" if row["attempts"] < row["max_attempts"] else "failed"
+        exit_status = "killed" if returncode is None else f"exit code {returncode}"
+        error = f"{exit_status} (see outputs/jobs/{job_id}.log)"
+    conn.execute("UPDATE jobs SET status = ?, finished_at = ?, pid = NULL, error = ? WHERE id = ?",
+                 (status, _now(), error, job_id))
+    return status
+
+
+def _job_process_alive(pid, job_id):
+    """True if pid is still the `--run-job job_id` process (and not a reused pid)"""
+    if not pid:
+        return False
+    if psutil is None:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+    try:
+        process = psutil.Process(pid)
+        if process.status() == psutil.STATUS_ZOMBIE:
+            return False
+        cmdline = process.cmdline()
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+    return "--run-job" in cmdline and str(job_id) in cmdline
+
+
+class AdoptedProcess:
+    """
+    A job process started by a previous scheduler, polled like a Popen: it is not
+    our child, so its exit status is the one the job recorded (run_job), or None if
+    it was killed before recording one.
+    """
+
+    def __init__(self, conn, job_id, pid):
+        self.conn = conn
+        self.job_id = job_id
+        self.pid = pid
+        self.returncode = None
+
+    def poll(self):
+        if _job_process_alive(self.pid, self.job_id):
+            return None
+        row = self.conn.execute("SELECT exit_code FROM jobs WHERE id = ?", (self.job_id,)).fetchone()
+        self.returncode = row["exit_code"] if row else None
+        return -1 if self.returncode is None else self.returncode
+
+
+def _recover_orphans(conn):
+    """
+    Jobs marked running on this host by a previous scheduler: those whose process is still
+    alive are adopted (returned as {job_id: AdoptedProcess}, their resources stay reserved);
+    those whose process is gone are finished with the exit status they recorded, or
+    re-queued if they recorded none (host restart, process lost).
+    """
+    adopted = {}
+    rows = conn.execute("SELECT id, pid, exit_code FROM jobs WHERE status = 'running' AND host = ?",
+                        (socket.gethostname(),))
+    for row in rows.fetchall():
+        if _job_process_alive(row["pid"], row["id"]):
+            adopted[row["id"]] = AdoptedProcess(conn, row["id"], row["pid"])
+            print(f"🔗 Job {row['id']}: still running (pid {row['pid']}), adopted")
+        elif row["exit_code"] is not None:
+            status = finish_job(conn, row["id"], row["exit_code"])
+            print(f"• Job {row['id']}: {status} (exit code {row['exit_code']}) while the scheduler was stopped")
+        else:
+            conn.execute("UPDATE jobs SET status = 'queued', pid = NULL WHERE id = ?", (row["id"],))
+            print(f"🔁 Job {row['id']}: process lost, re-queued")
+    return adopted
+
+
+def run_daemon(max_cpus=None, max_memory_gb=None, poll_interval=DEFAULT_POLL_INTERVAL, once=False, jobs_file=JOBS_FILE):
+    """
+    Schedule queued jobs until interrupted (or, with once=True, until every started
+    job has finished and no queued job can start). Jobs that request more than
+    max_cpus / max_memory_gb are failed: they would never start.
+    """
+    host_cpus, host_memory_gb = host_limits()
+    max_cpus = max_cpus or host_cpus
+    if max_memory_gb is None:
+        max_memory_gb = host_memory_gb
+    print(f"🗓️  Scheduler: {max_cpus} cores, {max_memory_gb:.1f} GB budget, queue {jobs_file}")
+
+    conn = connect(jobs_file)
+    processes = _recover_orphans(conn)
+    try:
+        while True:
+            for job_id, process in list(processes.items()):
+                returncode = process.poll()
+                if returncode is None:
+                    continue
+                del processes[job_id]
+                returncode = process.returncode  # None for an adopted job killed before recording its exit
+                status = finish_job(conn, job_id, returncode)
+                icon = {"done": "✅", "queued": "🔁", "failed": "❌", "cancelled": "🚫"}.get(status, "•")
+                print(f"{icon} Job {job_id}: {status} ({'killed' if returncode is None else f'exit code {returncode}'})")
+
+            running = [dict(r) for r in conn.execute("SELECT * FROM jobs WHERE status = 'running'").fetchall()
+                       if r["id"] in processes]
+            queued = []
+            for job in (dict(r) for r in conn.execute("SELECT * FROM jobs WHERE status = 'queued'").fetchall()):
+                reason = _oversized(job, max_cpus, max_memory_gb)
+                if reason is None:
+                    queued.append(job)
+                    continue
+                conn.execute("UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                             (_now(), f"never fits the scheduler: {reason}", job["id"]))
+                print(f"❌ Job {job['id']}: failed, {reason}")
+            for job in pick_jobs(queued, running, max_cpus, max_memory_gb, available_memory_gb()):
+                processes[job["id"]] = start_job(conn, job)
+                dataset = f" [{job['dataset_name']}]" if job["dataset_name"] else ""
+                print(f"🚀 Job {job['id']}: {job['config_file']}{dataset} "
+                      f"(priority {job['priority']}, {job['cpus']} cores, {job['memory_gb']:g} GB)")
+
+            if once and not processes:
+                if queued:
+                    # Nothing running to wait for: only the memory other processes use holds them back
+                    print(f"⚠️  {len(queued)} queued job(s) left: not enough memory available on the system")
+                break
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print(f"\n⏹️  Scheduler stopped; {len(processes)} running job(s) keep running: the next scheduler "
+              f"adopts them, or records their exit if they finished meanwhile")
+    finally:
+        conn.close()
+
+
+def run_job(job_id, jobs_file=JOBS_FILE):
+    """Job process entry point: run the training pipeline of a job, record its output folder and exit status"""
+    from run import main_pipeline, configure_tf_threads
+
+    conn = connect(jobs_file)
+    try:
+        job = dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+    finally:
+        conn.close()
+    options = json.loads(job["options"])
+    configure_tf_threads(job["cpus"], min(2, job["cpus"]))
+
+    config_stem = os.path.splitext(os.path.basename(job["config_file"]))[0]
+    output_dir = None
+    try:
+        output_dir = main_pipeline(
+            config_file=job["config_file"],
+            dataset_name=job["dataset_name"],
+            run_name=f"{config_stem}_{job['dataset_name'] or 'default'}_job{job_id}",
+            force=options.get("force", False),
+            incremental=options.get("incremental", False),
+            defer_report=True,
+        )
+        exit_code = 0
+    except BaseException:
+        exit_code = 1
+        raise
+    finally:
+        # A restarted scheduler is not this process's parent: it reads the exit status from here
+        conn = connect(jobs_file)
+        try:
+            conn.execute("UPDATE jobs SET output_dir = COALESCE(?, output_dir), exit_code = ? WHERE id = ?",
+                         (output_dir, exit_code, job_id))
+        finally:
+            conn.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Queue training runs and schedule them on this host (outputs/jobs.sqlite)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Queue every dataset of two configs, 8 cores / 6 GB each, high priority
+  python scripts/scheduler.py --submit configs/config_v1.yaml configs/config_v2.yaml --cpus 8 --memory-gb 6 --priority 10
+
+  # Queue one dataset, weekly refresh with a warm start, 2 retries
+  python scripts/scheduler.py --submit configs/config_v1.yaml --dataset weekly_applications --incremental --retries 2
+
+  # Run the scheduler (leave it running overnight), or drain the queue and exit
+  python scripts/scheduler.py --daemon --max-cpus 32 --max-memory-gb 96
+  python scripts/scheduler.py --daemon --once
+
+  # Show and cancel jobs
+  python scripts/scheduler.py --list
+  python scripts/scheduler.py --cancel 12 13
+
+Reports of finished jobs are queued: render them with python scripts/report_queue.py
+        """
+    )
+    parser.add_argument("--submit", nargs="+", default=None, metavar="PATTERN",
+                        help="Queue one job per dataset of the matching config files (e.g. configs/*.yaml)")
+    parser.add_argument("--dataset", type=str, default=None, help="With --submit: only this dataset key")
+    parser.add_argument("--priority", type=int, default=0, help="With --submit: higher runs first. Default: 0")
+    parser.add_argument("--cpus", type=int, default=DEFAULT_JOB_CPUS,
+                        help=f"With --submit: cores per job (TensorFlow threads). Default: {DEFAULT_JOB_CPUS}")
+    parser.add_argument("--memory-gb", type=float, default=DEFAULT_JOB_MEMORY_GB,
+                        help=f"With --submit: memory reserved per job. Default: {DEFAULT_JOB_MEMORY_GB:g}")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help=f"With --submit: retries after a failure. Default: {DEFAULT_RETRIES}")
+    parser.add_argument("--force", action="store_true", help="With --submit: retrain even if an identical model exists")
+    parser.add_argument("--incremental", action="store_true",
+                        help="With --submit: warm-start from a model trained on a prefix of the data")
+    parser.add_argument("--list", action="store_true", help="Show the jobs")
+    parser.add_argument("--status", type=str, default=None, help="With --list: only jobs with this status")
+    parser.add_argument("--cancel", type=int, nargs="+", default=None, metavar="ID", help="Cancel jobs")
+    parser.add_argument("--daemon", action="store_true", help="Run the scheduler")
+    parser.add_argument("--once", action="store_true", help="With --daemon: exit once no queued job can start and running ones finished")
+    parser.add_argument("--max-cpus", type=int, default=None, help="With --daemon: cores to use. Default: all")
+    parser.add_argument("--max-memory-gb", type=float, default=None,
+                        help="With --daemon: memory budget for jobs. Default: total system memory")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"With --daemon: seconds between scheduling passes. Default: {DEFAULT_POLL_INTERVAL}")
+    parser.add_argument("--run-job", type=int, default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.run_job is not None:
+        run_job(args.run_job)
+        exit(0)
+
+    if args.submit:
+        from run import resolve_sweep_configs, build_sweep_jobs
+
+        jobs = build_sweep_jobs(resolve_sweep_configs(args.submit))
+        if args.dataset:
+            jobs = [job for job in jobs if job["dataset_name"] == args.dataset]
+        if not jobs:
+            print("❌ No dataset found for the given config patterns")
+            exit(1)
+        for job in jobs:
+            try:
+                job_id = submit_job(
+                    job["config_file"], job["dataset_name"],
+                    priority=args.priority, cpus=args.cpus, memory_gb=args.memory_gb,
+                    retries=args.retries, force=args.force, incremental=args.incremental,
+                )
+            except ValueError as e:
+                print(f"❌ {e}")
+                exit(1)
+            print(f"📥 Job {job_id}: {job['config_file']} [{job['dataset_name']}] (priority {args.priority})")
+
+    if args.cancel:
+        for job_id in args.cancel:
+            previous = cancel_job(job_id)
+            if previous in ("queued", "running"):
+                print(f"🚫 Job {job_id} cancelled (was {previous})")
+            else:
+                print(f"⚠️  Job {job_id}: nothing to cancel ({previous or 'unknown job'})")
+
+    if args.list:
+        jobs = list_jobs(status=args.status)
+        if not jobs:
+            print("📭 No job")
+        for job in jobs:
+            dataset = f" [{job['dataset_name']}]" if job["dataset_name"] else ""
+            detail = job["output_dir"] or job["error"] or ""
+            print(f"{job['id']:>5}  {job['status']:<9} p{job['priority']:<3} {job['cpus']:>3} cores "
+                  f"{job['memory_gb']:>5g} GB  attempts {job['attempts']}/{job['max_attempts']}  "
+                  f"{job['config_file']}{dataset}  {detail}")
+
+    if args.daemon:
+        run_daemon(max_cpus=args.max_cpus, max_memory_gb=args.max_memory_gb,
+                   poll_interval=args.poll_interval, once=args.once)
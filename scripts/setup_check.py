@@ -6,7 +6,11 @@ Verifies that all dependencies, files, and folders are properly configured.
 
 import os
 import sys
+import json
+import time
+import argparse
 import importlib
+import subprocess
 from pathlib import Path
 from typing import List, Tuple, Dict
 
@@ -114,6 +118,7 @@ def check_required_packages() -> List[CheckResult]:
         ("joblib", "joblib"),
         ("scipy", "scipy"),
         ("matplotlib", "matplotlib"),
+        ("pyarrow", "pyarrow"),
     ]
     
     results = []
@@ -274,12 +279,12 @@ def check_data_files() -> List[CheckResult]:
         if raw_files:
             for data_file in raw_files:
                 try:
-                    import pandas as pd
-                    df = pd.read_csv(data_file)
+                    from data_cache import csv_shape
+                    n_rows, n_cols = csv_shape(data_file)
                     results.append(CheckResult(
                         f"Raw data: {data_file.name}",
                         True,
-                        f"{len(df)} rows, {len(df.columns)} columns",
+                        f"{n_rows} rows, {n_cols} columns",
                         f"Size: {data_file.stat().st_size / 1024:.1f} KB"
                     ))
                 except Exception as e:
@@ -313,12 +318,12 @@ def check_data_files() -> List[CheckResult]:
         if processed_files:
             for data_file in processed_files:
                 try:
-                    import pandas as pd
-                    df = pd.read_csv(data_file)
+                    from data_cache import csv_shape
+                    n_rows, n_cols = csv_shape(data_file)
                     results.append(CheckResult(
                         f"Processed data: {data_file.name}",
                         True,
-                        f"{len(df)} rows, {len(df.columns)} columns",
+                        f"{n_rows} rows, {n_cols} columns",
                         f"Size: {data_file.stat().st_size / 1024:.1f} KB"
                     ))
                 except Exception as e:
@@ -404,6 +409,65 @@ def check_scripts() -> List[CheckResult]:
     return results
 
 
+# Metadata-only commands must start without loading these modules, and within the budget
+STARTUP_COMMANDS = [
+    ["run.py", "--list-configs"],
+    ["save_model.py", "--list"],
+    ["registry.py", "--limit", "1"],
+]
+STARTUP_HEAVY_MODULES = ["tensorflow", "tensorflow_probability", "meridian", "arviz"]
+STARTUP_BUDGET_SECONDS = 2.0
+
+# Runs a script as __main__ in a fresh interpreter, then reports the heavy modules it imported
+_STARTUP_PROBE = """
+import sys, json, runpy
+sys.argv = sys.argv[1:]
+sys.path.insert(0, sys.argv[0].rsplit('/', 1)[0])
+try:
+    runpy.run_path(sys.argv[0], run_name='__main__')
+except SystemExit:
+    pass
+heavy = {heavy}
+print('STARTUP_PROBE ' + json.dumps(sorted(m for m in heavy if m in sys.modules)))
+"""
+
+
+def check_startup_time(budget: float = STARTUP_BUDGET_SECONDS) -> List[CheckResult]:
+    """Time metadata-only commands and check they never import TensorFlow/Meridian"""
+    print_header("STARTUP TIME CHECK")
+    
+    script_dir = Path(__file__).parent
+    probe = _STARTUP_PROBE.format(heavy=repr(STARTUP_HEAVY_MODULES))
+    
+    results = []
+    for command in STARTUP_COMMANDS:
+        name = f"Startup: {' '.join(command)}"
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", probe, str(script_dir / command[0])] + command[1:],
+            capture_output=True, text=True, cwd=script_dir.parent,
+        )
+        elapsed = time.perf_counter() - start
+        
+        marker = [line for line in proc.stdout.splitlines() if line.startswith("STARTUP_PROBE ")]
+        if proc.returncode != 0 or not marker:
+            error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit code {proc.returncode}"
+            results.append(CheckResult(name, False, f"Command failed: {error}", ""))
+        else:
+            heavy = json.loads(marker[-1][len("STARTUP_PROBE "):])
+            if heavy:
+                results.append(CheckResult(name, False, f"{elapsed:.2f}s, imports {', '.join(heavy)}",
+                                           "Move these imports inside the functions that need them"))
+            elif elapsed > budget:
+                results.append(CheckResult(name, False, f"{elapsed:.2f}s (budget: {budget:.1f}s)", ""))
+            else:
+                results.append(CheckResult(name, True, f"{elapsed:.2f}s (budget: {budget:.1f}s)", ""))
+        
+        print_result(results[-1])
+    
+    return results
+
+
 def check_meridian_import() -> CheckResult:
     """Check import of Meridian and its modules"""
     print_header("MERIDIAN MODULE CHECK")
@@ -459,8 +523,32 @@ def generate_summary(all_results: Dict[str, List[CheckResult]]):
         return 1
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Check the ROIxplain environment (packages, files, Meridian, startup time)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Full environment check
+  python scripts/setup_check.py
+
+  # Only the startup-time guard (exit code 1 if a listing command is too slow)
+  python scripts/setup_check.py --startup --budget 1.5
+        """
+    )
+    parser.add_argument("--startup", action="store_true", help="Only run the startup-time check")
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS,
+                        help=f"Startup budget per command in seconds. Default: {STARTUP_BUDGET_SECONDS}")
+    return parser.parse_args()
+
+
 def main():
     """Main entrypoint function"""
+    args = parse_args()
+    if args.startup:
+        results = check_startup_time(args.budget)
+        sys.exit(0 if all(r.status for r in results) else 1)
+    
     print(f"\n{Colors.BOLD}{Colors.BLUE}")
     print("╔" + "═" * 68 + "╗")
     print("║" + " " * 15 + "ROIXPLAIN ENVIRONMENT CHECK" + " " * 15 + "║")
@@ -479,6 +567,7 @@ def main():
     all_results["Configurations"] = check_config_files()
     all_results["Data"] = check_data_files()
     all_results["Scripts"] = check_scripts()
+    all_results["Startup"] = check_startup_time(args.budget)
     
     meridian_result = check_meridian_import()
     print_result(meridian_result)
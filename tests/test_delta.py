@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from fingerprint import fingerprint_frame, data_hash_from_fingerprint
+from delta import assess_delta, history_fingerprint_frame
+
+MODEL_CONFIG = {
+    "columns": {"time": "time", "kpi": "kpi", "geo": "geo", "media": ["tv"], "media_spend": ["tv_spend"]},
+    "kpi_type": "revenue",
+    "sampling": {"n_keep": 100},
+}
+
+
+def _frame(weeks=20):
+    rng = np.random.default_rng(0)
+    n = 52 * 2
+    df = pd.DataFrame({
+        "time": np.repeat(pd.date_range("2024-01-07", periods=52, freq="W"), 2),
+        "geo": ["north", "south"] * 52,
+        "kpi": rng.random(n) * 1000,
+        "tv": rng.random(n),
+        "tv_spend": rng.random(n) * 100,
+    })
+    return df.head(weeks * 2).copy()
+
+
+def _model():
+    """(fingerprint, data_hash) of a model trained on the first 20 weeks"""
+    fingerprint = fingerprint_frame(_frame(), time_col="time", geo_col="geo")
+    return fingerprint, data_hash_from_fingerprint(fingerprint, MODEL_CONFIG)
+
+
+def _assess(new_df, model_config=MODEL_CONFIG):
+    old_fingerprint, data_hash = _model()
+    history = history_fingerprint_frame(new_df.reset_index(drop=True), old_fingerprint)
+    return assess_delta(old_fingerprint, history, data_hash, model_config)
+
+
+def test_same_data_is_a_cache_hit():
+    delta = _assess(_frame())
+    assert delta["decision"] == "cache_hit"
+    assert not delta["reordered"] and not any(delta["blocks"].values())
+
+
+def test_appended_weeks_are_incremental():
+    delta = _assess(_frame(weeks=24))
+    assert delta["decision"] == "incremental"
+    assert delta["appended"]["rows"] == 8
+
+
+def test_restated_block_is_full():
+    df = _frame(weeks=24)
+    df.loc[5, "kpi"] += 1.0  # south, 3rd week of January 2024
+    delta = _assess(df)
+    assert delta["decision"] == "full"
+    assert delta["blocks"]["modified"] == ["south|2024-01"]
+    assert delta["restated_geos"] == ["south"] and delta["restated_periods"] == ["2024-01"]
+
+
+def test_rows_reordered_across_blocks_is_full():
+    df = _frame()
+    # Swap the two geos of the first week: every (geo, month) block keeps its rows in order
+    df = df.iloc[[1, 0] + list(range(2, len(df)))]
+    delta = _assess(df)
+    assert delta["decision"] == "full"
+    assert delta["reordered"] and not any(delta["blocks"].values())
+    assert delta["reason"] == "history rows reordered"
+
+
+def test_configuration_change_is_full():
+    delta = _assess(_frame(weeks=24), {**MODEL_CONFIG, "kpi_type": "non_revenue"})
+    assert delta["decision"] == "full"
+    assert delta["reason"] == "configuration changed"
@@ -0,0 +1,110 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from fingerprint import (
+    fingerprint_frame, fingerprint_csv, data_hash_from_fingerprint, compute_data_hash, legacy_data_hashes,
+)
+
+MODEL_CONFIG = {
+    "columns": {"time": "time", "kpi": "kpi", "geo": "geo", "media": ["tv", "search"],
+                "media_spend": ["tv_spend", "search_spend"]},
+    "kpi_type": "revenue",
+    "model": {"max_lag": 8},
+    "sampling": {"n_chains": 2, "n_keep": 100},
+}
+
+
+def _frame(weeks=20, geos=("north", "south"), max_weeks=52):
+    """The first `weeks` weeks of one dataset: a shorter frame is a prefix of a longer one"""
+    rng = np.random.default_rng(0)
+    n = max_weeks * len(geos)
+    df = pd.DataFrame({
+        "time": np.repeat(pd.date_range("2024-01-07", periods=max_weeks, freq="W"), len(geos)),
+        "geo": list(geos) * max_weeks,
+        "kpi": rng.random(n) * 1000,
+        "tv": rng.random(n),
+        "search": rng.random(n),
+        "tv_spend": rng.random(n) * 100,
+        "search_spend": rng.random(n) * 100,
+    })
+    return df.head(weeks * len(geos)).copy()
+
+
+def _hash(df, model_config=MODEL_CONFIG):
+    return compute_data_hash(df, {"model_config": model_config})
+
+
+def test_row_order_changes_the_digest():
+    df = _frame()
+    swapped = df.iloc[[1, 0] + list(range(2, len(df)))].reset_index(drop=True)
+
+    assert fingerprint_frame(df)["digest"] != fingerprint_frame(swapped)["digest"]
+    assert _hash(df) != _hash(swapped)
+    # The same rows in the same order hash the same, whatever the index
+    assert _hash(df) == _hash(df.set_index(df.index + 100))
+
+
+def test_csv_stream_matches_frame(tmp_path):
+    path = tmp_path / "data.csv"
+    _frame().to_csv(path, index=False)
+    df = pd.read_csv(path, parse_dates=["time"])
+
+    assert fingerprint_csv(str(path), chunk_rows=7, time_col="time", geo_col="geo") == \
+        fingerprint_frame(df, time_col="time", geo_col="geo")
+
+
+def test_data_hash_covers_feature_priors():
+    fingerprint = fingerprint_frame(_frame(), time_col="time")
+    with_features = {**MODEL_CONFIG, "features": {"tv": {"roi_prior": [0.5, 1.0]}}}
+
+    assert data_hash_from_fingerprint(fingerprint, MODEL_CONFIG) != data_hash_from_fingerprint(fingerprint, with_features)
+    assert data_hash_from_fingerprint(fingerprint, with_features) == data_hash_from_fingerprint(
+        fingerprint, {**MODEL_CONFIG, "features": {"tv": {"roi_prior": [0.5, 1.0]}}})
+
+
+def test_prefix_of_extended_data_hashes_like_the_original():
+    # find_extended_model: the rows of the new data up to a model's last date hash to its data_hash
+    original = _frame(weeks=20)
+    extended = _frame(weeks=26)
+    end = original["time"].max()
+    prefix = extended[extended["time"] <= end].reset_index(drop=True)
+
+    assert _hash(prefix) == _hash(original)
+    assert _hash(extended) != _hash(original)
+
+    restated = prefix.copy()
+    restated.loc[3, "kpi"] += 1.0
+    assert _hash(restated) != _hash(original)
+
+
+def _baseline_data_hash(df, model_config):
+    """compute_data_hash as it was before fingerprints (metadata.yaml of older model folders)"""
+    columns = model_config["columns"]
+    data_info = {
+        "shape": df.shape,
+        "columns": sorted(df.columns.tolist()),
+        "time_col": columns["time"],
+        "kpi_col": columns["kpi"],
+        "geo_col": columns.get("geo"),
+        "media_cols": sorted(columns["media"]),
+        "media_spend_cols": sorted(columns["media_spend"]),
+        "date_range": {"start": str(df[columns["time"]].min()), "end": str(df[columns["time"]].max())},
+        "data_hash": pd.util.hash_pandas_object(df).sum(),
+    }
+    model_info = {
+        "kpi_type": model_config["kpi_type"],
+        "model_params": model_config.get("model", {}),
+        "sampling": model_config.get("sampling", {}),
+    }
+    return hashlib.sha256((str(data_info) + str(model_info)).encode()).hexdigest()[:16]
+
+
+def test_legacy_hashes_match_a_baseline_folder():
+    df = _frame()
+    recorded = _baseline_data_hash(df, MODEL_CONFIG)
+
+    assert recorded in legacy_data_hashes(df, MODEL_CONFIG)
+    assert recorded not in legacy_data_hashes(_frame(weeks=21), MODEL_CONFIG)
+    assert recorded not in legacy_data_hashes(df, {**MODEL_CONFIG, "kpi_type": "non_revenue"})
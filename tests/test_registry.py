@@ -0,0 +1,37 @@
+import sqlite3
+
+import registry
+
+
+def _register(tmp_path, folder, start, end):
+    metadata = {"data_hash": folder, "date_range": {"start": start, "end": end}}
+    registry.register_model(str(tmp_path / "models" / folder), metadata, registry_file=str(tmp_path / "registry.sqlite"))
+
+
+def _folders(tmp_path, **filters):
+    models = registry.query_models(models_dir=str(tmp_path / "models"), registry_file=str(tmp_path / "registry.sqlite"),
+                                   **filters)
+    return sorted(m["folder"] for m in models)
+
+
+def test_date_filters_include_the_boundary_day(tmp_path):
+    _register(tmp_path, "2025-01-01_00-00-00", "2018-01-07 00:00:00", "2020-12-27 00:00:00")
+    _register(tmp_path, "2025-01-02_00-00-00", "2018-01-14 00:00:00", "2020-12-20 00:00:00")
+
+    assert _folders(tmp_path, date_from="2018-01-07") == ["2025-01-01_00-00-00"]
+    assert _folders(tmp_path, date_to="2020-12-27") == ["2025-01-01_00-00-00"]
+    assert _folders(tmp_path, date_from="2018-01-14", date_to="2020-12-20") == [
+        "2025-01-01_00-00-00", "2025-01-02_00-00-00"]
+
+
+def test_version_1_timestamps_are_migrated(tmp_path):
+    registry_file = str(tmp_path / "registry.sqlite")
+    conn = sqlite3.connect(registry_file)
+    conn.executescript(registry._SCHEMA)
+    conn.execute("INSERT INTO models (folder, date_start, date_end, metadata) VALUES (?, ?, ?, '{}')",
+                 ("2025-01-01_00-00-00", "2018-01-07 00:00:00", "2020-12-27 00:00:00"))
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    assert _folders(tmp_path, date_from="2018-01-07", date_to="2020-12-27") == ["2025-01-01_00-00-00"]
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+import sampling
+
+
+def _write_segment(output_dir, segment, n_draws, n_chains=2):
+    sampling._save_npz(sampling._segment_path(output_dir, segment), {
+        "state/x": np.full((n_draws, n_chains), float(segment)),
+        "trace/step_size": np.ones((n_draws, n_chains)),
+    })
+
+
+def test_unrecorded_segment_is_discarded(tmp_path):
+    output_dir = str(tmp_path)
+    (tmp_path / sampling.CHECKPOINT_DIR).mkdir()
+    # Killed after writing segment 1, before the progress file recorded it
+    _write_segment(output_dir, 0, 10)
+    _write_segment(output_dir, 1, 10)
+
+    sampling._discard_stale_segments(output_dir, n_segments=1)
+    states, trace = sampling._load_segments(output_dir, n_segments=1)
+
+    assert states["x"].shape == (10, 2)
+    assert not (tmp_path / sampling.CHECKPOINT_DIR / "segment_0001.npz").exists()
+
+
+def test_resume_after_kill_between_segment_and_progress(tmp_path, monkeypatch):
+    constants = pytest.importorskip("meridian.constants")
+    output_dir = str(tmp_path)
+    n_chains, n_burnin, n_keep, segment_size = 2, 5, 20, 10
+    settings = {"n_chains": n_chains, "n_adapt": 3, "n_burnin": n_burnin, "n_keep": n_keep,
+                "checkpoint_every": segment_size}
+
+    def fake_segment(mmm, n_chains, n_adapt, n_draws, current_state, init_step_size, seed):
+        states = {"x": np.random.rand(n_draws, n_chains)}
+        trace = {constants.STEP_SIZE: np.ones((n_draws, n_chains))}
+        return states, trace
+
+    kept = {}
+
+    def fake_inference_data(mmm, states, trace, n_chains, n_keep):
+        kept["x"] = states["x"]
+        return None
+
+    class FakeModel:
+        class inference_data:
+            @staticmethod
+            def extend(*args, **kwargs):
+                pass
+
+    monkeypatch.setattr(sampling, "_run_segment", fake_segment)
+    monkeypatch.setattr(sampling, "_to_inference_data", fake_inference_data)
+
+    # Kill the run right after the first segment file is written
+    write_progress = sampling._write_progress
+    calls = {"n": 0}
+
+    def killed_write_progress(output_dir, progress):
+        calls["n"] += 1
+        if calls["n"] == 2:
+            raise KeyboardInterrupt
+        write_progress(output_dir, progress)
+
+    monkeypatch.setattr(sampling, "_write_progress", killed_write_progress)
+    with pytest.raises(KeyboardInterrupt):
+        sampling.sample_posterior_in_segments(FakeModel(), settings, output_dir)
+
+    monkeypatch.setattr(sampling, "_write_progress", write_progress)
+    summary = sampling.sample_posterior_in_segments(FakeModel(), settings, output_dir)
+
+    assert summary["n_keep"] == n_keep
+    assert kept["x"].shape == (n_keep, n_chains)
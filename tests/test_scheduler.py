@@ -0,0 +1,36 @@
+from scheduler import pick_jobs
+
+
+def _job(job_id, priority, cpus, memory_gb=1.0):
+    return {"id": job_id, "priority": priority, "cpus": cpus, "memory_gb": memory_gb}
+
+
+def test_small_jobs_backfill_around_a_large_job():
+    running = [_job(1, 0, 4)]
+    queued = [_job(2, 10, 8), _job(3, 0, 2), _job(4, 0, 2)]
+
+    # 12 free cores: the large job starts, the small ones fill what it leaves
+    assert [j["id"] for j in pick_jobs(queued, running, max_cpus=16, max_memory_gb=64)] == [2, 3, 4]
+
+
+def test_large_high_priority_job_is_not_starved_by_small_jobs():
+    big = _job(1, 10, 12)
+    small = [_job(job_id, 0, 2) for job_id in range(2, 12)]
+    running = [_job(100 + i, 0, 2) for i in range(4)]  # 8 of 16 cores busy: the large job does not fit
+
+    # Its 12 cores are reserved: no small job starts in the 8 free ones, or as cores free up
+    for n_running in [4, 3]:
+        assert pick_jobs([big] + small, running[:n_running], max_cpus=16, max_memory_gb=64) == []
+    # Once enough running jobs finished, the large job starts first
+    assert [j["id"] for j in pick_jobs([big] + small, running[:2], max_cpus=16, max_memory_gb=64)] == [1]
+    assert [j["id"] for j in pick_jobs([big] + small, running[:1], max_cpus=16, max_memory_gb=64)] == [1, 2]
+
+
+def test_reservation_covers_memory():
+    big = _job(1, 10, 4, memory_gb=48)
+    small = [_job(2, 0, 2, memory_gb=4)]
+
+    # Cores are free but the system has 40 GB available: the small job would eat into the 48 GB
+    assert pick_jobs([big] + small, [], max_cpus=16, max_memory_gb=64, system_available_gb=40) == []
+    assert [j["id"] for j in pick_jobs([big] + small, [], max_cpus=16, max_memory_gb=64,
+                                       system_available_gb=60)] == [1, 2]